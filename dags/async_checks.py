@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Asynchronous execution of the SCV check queries
+Submits check queries without waiting and polls every in-flight query from one asyncio loop
+"""
+
+import argparse
+import asyncio
+import itertools
+import sqlite3
+import sys
+import threading
+import time
+
+from metric_cache import query_version
+from query_metrics import record_query
+from snowflake_pool import BorrowedConnection
+from source_checks import finish_checks
+
+# Seconds between status polls of in-flight queries
+POLL_INTERVAL_SECONDS = 5
+
+def submit_checks(pool, names, checks, cache=None):
+    """
+    Submit each check's query with execute_async and return without waiting.
+
+    Returns (submitted, cached). submitted maps each name to its query id,
+    metric cache version and submission time, and is JSON-serializable so
+    it can travel through a deferral. Checks still fresh in the metric
+    cache go into cached as finished results instead of being submitted.
+    Cache versions are read on the connection already held, so the pool
+    is never asked for a second one.
+    """
+    submitted, cached = {}, {}
+    with pool.connection() as connection:
+        borrowed = BorrowedConnection(pool, connection)
+        for name in names:
+            check = checks[name]
+            version = query_version(borrowed, check['tables']) if cache is not None else None
+            if version is not None:
+                found, row = cache.get(check['query'], version)
+                if found:
+                    cached[name] = {
+                        'name': name,
+                        'required': check['required'],
+                        'row': dict(zip(check['columns'], row)) if row is not None else None,
+                        'error': None,
+                        'elapsed': 0.0,
+                    }
+                    continue
+            cursor = connection.cursor()
+            try:
+                cursor.execute_async(check['query'])
+                submitted[name] = {'query_id': cursor.sfqid, 'version': version, 'submitted_at': time.time()}
+            finally:
+                cursor.close()
+    return submitted, cached
+
+def query_state(connection, query_id):
+    """Return 'running', 'error' or 'done' for a submitted query"""
+    status = connection.get_query_status(query_id)
+    if connection.is_still_running(status):
+        return 'running'
+    if connection.is_an_error(status):
+        return 'error'
+    return 'done'
+
+async def wait_for_queries(connection, query_ids, poll_interval=POLL_INTERVAL_SECONDS, timeout=None):
+    """
+    Poll every query until none is running and return {query_id: state}.
+
+    All in-flight queries are polled together each round, so one loop
+    waits on any number of queries without holding a thread per query.
+    Raises TimeoutError once ``timeout`` seconds have passed.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    pending = list(query_ids)
+    states = {}
+    while True:
+        polled = await asyncio.gather(*(
+            loop.run_in_executor(None, query_state, connection, query_id) for query_id in pending
+        ))
+        for query_id, state in zip(pending, polled):
+            if state != 'running':
+                states[query_id] = state
+        pending = [query_id for query_id in pending if query_id not in states]
+        if not pending:
+            return states
+        if deadline is not None and loop.time() >= deadline:
+            raise TimeoutError(f"{len(pending)} queries still running after {timeout}s")
+        await asyncio.sleep(poll_interval)
+
+def collect_results(pool, submitted, states, checks, cache=None):
+    """
+    Fetch the rows of finished queries into run_check-style results.
+
+    Rows are stored in the metric cache under the version captured at
+    submission, and every query is recorded in the query metrics with its
+    submit-to-finish time.
+    """
+    results = {}
+    with pool.connection() as connection:
+        for name, submission in submitted.items():
+            check = checks[name]
+            query_id = submission['query_id']
+            elapsed = time.time() - submission['submitted_at']
+            result = {'name': name, 'required': check['required'], 'row': None, 'error': None, 'elapsed': elapsed}
+            cursor = connection.cursor()
+            try:
+                state = states.get(query_id)
+                if state not in ('done', 'error'):
+                    raise RuntimeError(f"Query {query_id} did not finish (state {state})")
+                # Fetching a failed query raises its own error
+                cursor.get_results_from_sfqid(query_id)
+                if state == 'error':
+                    raise RuntimeError(f"Query {query_id} failed")
+                row = cursor.fetchone()
+                result['row'] = dict(zip(check['columns'], row)) if row is not None else None
+                if cache is not None and submission['version'] is not None:
+                    cache.put(check['query'], submission['version'], row)
+            except Exception as e:
+                result['error'] = e
+            finally:
+                cursor.close()
+            record_query(
+                check['query'], elapsed, rows=0 if result['row'] is None else 1,
+                query_id=query_id, error=result['error'], label=name,
+            )
+            results[name] = result
+    return results
+
+def run_checks_async(pool, names, checks, cache=None, poll_interval=POLL_INTERVAL_SECONDS, timeout=None):
+    """
+    Run checks by submitting them all and polling from one asyncio loop.
+
+    A drop-in for run_source_checks: same results and the same raise on a
+    failed required check, without a thread blocked per running query.
+    """
+    start = time.perf_counter()
+    submitted, results = submit_checks(pool, list(names), checks, cache)
+    if submitted:
+        with pool.connection() as connection:
+            states = asyncio.run(wait_for_queries(
+                connection, [submission['query_id'] for submission in submitted.values()], poll_interval, timeout,
+            ))
+        results.update(collect_results(pool, submitted, states, checks, cache))
+    return finish_checks(results, start, 'Async checks')
+
+class FakeAsyncCursor:
+    """DB-API cursor over sqlite with the Snowflake connector's async calls"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sfqid = None
+        self._rows = []
+
+    def execute(self, query):
+        self.sfqid = self.connection.start(query)
+        self.connection.wait(self.sfqid)
+        self.get_results_from_sfqid(self.sfqid)
+
+    def execute_async(self, query):
+        self.sfqid = self.connection.start(query)
+
+    def get_results_from_sfqid(self, query_id):
+        self.connection.wait(query_id)
+        rows, error = self.connection.driver.results[query_id]
+        if error is not None:
+            raise error
+        self._rows = list(rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+class FakeAsyncDriver:
+    """
+    Stand-in for Snowflake's asynchronous query API.
+
+    Queries run against one shared sqlite database after ``latency``
+    seconds on a background timer, and their results are kept by query id
+    so any connection can poll or fetch them, as with Snowflake.
+    """
+
+    def __init__(self, latency=1.0, setup_sql=''):
+        self.latency = latency
+        self.database = sqlite3.connect(':memory:', check_same_thread=False)
+        self.database.executescript(setup_sql)
+        self.results = {}
+        self.finished = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def connect(self):
+        return FakeAsyncConnection(self)
+
+class FakeAsyncConnection:
+    """Connection handed out by FakeAsyncDriver"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def cursor(self):
+        return FakeAsyncCursor(self)
+
+    def start(self, query):
+        driver = self.driver
+        with driver._lock:
+            query_id = f'fake-{next(driver._ids)}'
+            driver.finished[query_id] = threading.Event()
+
+        def run():
+            try:
+                with driver._lock:
+                    rows, error = driver.database.execute(query).fetchall(), None
+            except Exception as e:
+                rows, error = None, e
+            driver.results[query_id] = (rows, error)
+            driver.finished[query_id].set()
+
+        threading.Timer(driver.latency, run).start()
+        return query_id
+
+    def wait(self, query_id):
+        self.driver.finished[query_id].wait()
+
+    def get_query_status(self, query_id):
+        if not self.driver.finished[query_id].is_set():
+            return 'RUNNING'
+        return 'FAILED_WITH_ERROR' if self.driver.results[query_id][1] is not None else 'SUCCESS'
+
+    def is_still_running(self, status):
+        return status == 'RUNNING'
+
+    def is_an_error(self, status):
+        return status == 'FAILED_WITH_ERROR'
+
+    def close(self):
+        pass
+
+def demo_checks(count):
+    """Build ``count`` independent checks against the demo table"""
+    return {
+        f'check_{i}': {
+            'query': f"SELECT COUNT(*), SUM(value) FROM demo WHERE id % {count} = {i}",
+            'tables': [],
+            'columns': ['record_count', 'value_sum'],
+            'required': True,
+        }
+        for i in range(count)
+    }
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Compare threaded and async check execution on a fake async driver")
+    parser.add_argument('--queries', type=int, default=20, help="Number of check queries")
+    parser.add_argument('--latency', type=float, default=1.0, help="Simulated warehouse seconds per query")
+    parser.add_argument('--workers', type=int, default=4, help="Threads for the threaded run")
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="Seconds between status polls")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    import query_metrics
+    from snowflake_pool import ConnectionPool
+    from source_checks import run_source_checks
+
+    args = parse_args(argv)
+    # Keep the demo's fake queries out of the query metrics
+    query_metrics.SINKS = ['none']
+    driver = FakeAsyncDriver(args.latency, """
+        CREATE TABLE demo (id INTEGER, value REAL);
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < 9999)
+        INSERT INTO demo SELECT i, i * 0.5 FROM n;
+    """)
+    checks = demo_checks(args.queries)
+    pool = ConnectionPool(driver.connect, max_size=args.workers)
+
+    # Threaded: every running query blocks one of the workers, as in run_source_checks
+    start = time.perf_counter()
+    threaded = run_source_checks(pool, max_workers=args.workers, checks=checks)
+    threaded_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = run_checks_async(pool, checks, checks, poll_interval=args.poll_interval)
+    async_seconds = time.perf_counter() - start
+
+    print(f"⏱️  {args.queries} queries of {args.latency:.1f}s each")
+    print(f"  Threaded ({args.workers} workers): {threaded_seconds:.2f}s")
+    print(f"  Async (one polling loop): {async_seconds:.2f}s")
+    if {name: result['row'] for name, result in results.items()} != {name: result['row'] for name, result in threaded.items()}:
+        print("❌ Async results differ from the threaded results")
+        sys.exit(1)
+    print("✅ Async results match the threaded results")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Artifact cache for the SCV dbt tasks
+Keeps dbt_packages and the parse artifacts on the shared volume so each dbt task restores them instead of re-resolving and re-parsing
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+from metric_cache import CACHE_DIR
+
+# Cache lives on the shared state volume so every worker sees the same entries
+ARTIFACT_CACHE_DIR = os.environ.get('SCV_DBT_CACHE_DIR', os.path.join(CACHE_DIR, 'dbt_cache'))
+PACKAGES_CACHE_DIR = os.path.join(ARTIFACT_CACHE_DIR, 'packages')
+PARSE_CACHE_DIR = os.path.join(ARTIFACT_CACHE_DIR, 'parse')
+
+# Entries kept per kind; older ones are evicted after each save
+MAX_ENTRIES = 5
+
+# Written into a restored directory so an unchanged one is not copied again
+KEY_MARKER = '.scv_cache_key'
+
+# Artifacts dbt parse leaves in target/: partial_parse.msgpack lets later
+# dbt processes reparse only changed files, the manifest feeds lineage_analysis
+PARSE_ARTIFACTS = ('partial_parse.msgpack', 'manifest.json')
+
+# Project files read by dbt parse, besides the resource paths of dbt_project.yml
+PROJECT_FILES = ('dbt_project.yml', 'packages.yml', 'package-lock.yml', 'dependencies.yml', 'selectors.yml')
+DEFAULT_RESOURCE_PATHS = {
+    'model-paths': ['models'],
+    'analysis-paths': ['analyses'],
+    'test-paths': ['tests'],
+    'seed-paths': ['seeds'],
+    'macro-paths': ['macros'],
+    'snapshot-paths': ['snapshots'],
+}
+
+def hash_files(digest, root, paths):
+    """Add each file's relative path and content to digest, in sorted order"""
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, root).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+
+def packages_key(project_dir):
+    """
+    Return the cache key of dbt_packages: a hash of the package lock file.
+
+    Falls back to packages.yml for projects without a lock file, and
+    returns None for projects without packages.
+    """
+    for name in ('package-lock.yml', 'packages.yml', 'dependencies.yml'):
+        path = os.path.join(project_dir, name)
+        if os.path.exists(path):
+            digest = hashlib.sha256()
+            hash_files(digest, project_dir, [path])
+            return digest.hexdigest()
+    return None
+
+def resource_paths(project_dir):
+    """Return the resource directories configured in dbt_project.yml"""
+    paths = dict(DEFAULT_RESOURCE_PATHS)
+    try:
+        import yaml
+        with open(os.path.join(project_dir, 'dbt_project.yml')) as f:
+            config = yaml.safe_load(f) or {}
+        paths.update({key: config[key] for key in DEFAULT_RESOURCE_PATHS if config.get(key)})
+    except (ImportError, OSError):
+        pass
+    return sorted({directory for directories in paths.values() for directory in directories})
+
+def dbt_version():
+    """Return the installed dbt-core version, which partial parse files are tied to"""
+    try:
+        from importlib.metadata import version
+        return version('dbt-core')
+    except Exception:
+        return None
+
+def project_key(project_dir, profiles_dir=None):
+    """
+    Return the cache key of the parse artifacts.
+
+    Hashes every file under the resource paths plus the project, package
+    and selector files, the profile (target names feed schema configs),
+    the dbt version and the packages key, so any change that could alter
+    the manifest yields a new key.
+    """
+    files = [os.path.join(project_dir, name) for name in PROJECT_FILES]
+    for directory in resource_paths(project_dir):
+        for root, dirnames, filenames in os.walk(os.path.join(project_dir, directory)):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            files.extend(os.path.join(root, name) for name in filenames if not name.startswith('.'))
+
+    digest = hashlib.sha256()
+    hash_files(digest, project_dir, [path for path in files if os.path.isfile(path)])
+    if profiles_dir:
+        profile = os.path.join(profiles_dir, 'profiles.yml')
+        if os.path.isfile(profile):
+            hash_files(digest, profiles_dir, [profile])
+    digest.update(json.dumps({
+        'dbt_version': dbt_version(),
+        'packages': packages_key(project_dir),
+        'target': os.environ.get('DBT_TARGET'),
+    }, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def read_marker(directory):
+    try:
+        with open(os.path.join(directory, KEY_MARKER)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def store_entry(cache_dir, key, fill):
+    """
+    Publish a cache entry under cache_dir/key.
+
+    fill(path) writes the entry into a private temporary directory that is
+    renamed into place, so concurrent tasks never see a partial entry; if
+    another task published the key first, its entry is kept.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    final = os.path.join(cache_dir, key)
+    if os.path.isdir(final):
+        return final
+    temporary = os.path.join(cache_dir, f'.{key}.{os.getpid()}.tmp')
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    try:
+        fill(temporary)
+        with open(os.path.join(temporary, KEY_MARKER), 'w') as f:
+            f.write(key)
+        os.rename(temporary, final)
+    except OSError:
+        shutil.rmtree(temporary, ignore_errors=True)
+        if not os.path.isdir(final):
+            raise
+    evict(cache_dir)
+    return final
+
+def evict(cache_dir, max_entries=MAX_ENTRIES):
+    """Remove all but the max_entries most recently used entries"""
+    entries = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(cache_dir, name))
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[max_entries:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def touch(path):
+    """Mark an entry as used, for eviction"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def replace_directory(source, target):
+    """Copy source over target, swapping it in with a rename"""
+    temporary = f'{target}.{os.getpid()}.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    shutil.copytree(source, temporary, symlinks=True)
+    previous = f'{target}.{os.getpid()}.old'
+    if os.path.exists(target):
+        os.rename(target, previous)
+    os.rename(temporary, target)
+    shutil.rmtree(previous, ignore_errors=True)
+
+def copy_file(source, target):
+    """Copy a file and rename it into place, so readers never see it half written"""
+    temporary = f'{target}.{os.getpid()}.tmp'
+    shutil.copyfile(source, temporary)
+    os.replace(temporary, target)
+
+def restore_packages(project_dir, packages_dir='dbt_packages'):
+    """
+    Restore dbt_packages from the cache entry of the current lock file.
+
+    Returns True on a hit, when dbt deps can be skipped. A project whose
+    dbt_packages already carries the key is left untouched.
+    """
+    key = packages_key(project_dir)
+    if key is None:
+        return True
+    target = os.path.join(project_dir, packages_dir)
+    entry = os.path.join(PACKAGES_CACHE_DIR, key)
+    if read_marker(target) == key:
+        touch(entry)
+        return True
+    if not os.path.isdir(entry):
+        return False
+    replace_directory(entry, target)
+    touch(entry)
+    return True
+
+def save_packages(project_dir, packages_dir='dbt_packages'):
+    """Store the dbt_packages installed by dbt deps under the lock file's key"""
+    key = packages_key(project_dir)
+    source = os.path.join(project_dir, packages_dir)
+    if key is None or not os.path.isdir(source):
+        return None
+
+    def fill(path):
+        shutil.rmtree(path)
+        shutil.copytree(source, path, symlinks=True)
+    entry = store_entry(PACKAGES_CACHE_DIR, key, fill)
+    # Later restores into this project find the key and skip the copy
+    with open(os.path.join(source, KEY_MARKER), 'w') as f:
+        f.write(key)
+    return entry
+
+def latest_entry(cache_dir):
+    """Return the most recently used entry of a cache, or None"""
+    if not os.path.isdir(cache_dir):
+        return None
+    entries = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(cache_dir, name))
+    ]
+    return max(entries, key=os.path.getmtime) if entries else None
+
+def restore_parse(project_dir, profiles_dir=None, target_dir='target'):
+    """
+    Restore the parse artifacts of the current project into target/.
+
+    Returns 'hit' when an entry matches the project key: the manifest is
+    current and dbt parse can be skipped. On a miss the most recent entry's
+    partial_parse.msgpack is still restored and 'warm' returned, since dbt
+    validates it and reparses only the files that changed; 'cold' means
+    the cache is empty.
+    """
+    key = project_key(project_dir, profiles_dir)
+    target = os.path.join(project_dir, target_dir)
+    entry = os.path.join(PARSE_CACHE_DIR, key)
+    if read_marker(target) == key and all(os.path.exists(os.path.join(target, name)) for name in PARSE_ARTIFACTS):
+        touch(entry)
+        return 'hit'
+
+    status, names = 'hit', PARSE_ARTIFACTS
+    if not os.path.isdir(entry):
+        entry = latest_entry(PARSE_CACHE_DIR)
+        if entry is None:
+            return 'cold'
+        status, names = 'warm', ('partial_parse.msgpack',)
+
+    os.makedirs(target, exist_ok=True)
+    for name in names:
+        if os.path.exists(os.path.join(entry, name)):
+            copy_file(os.path.join(entry, name), os.path.join(target, name))
+    if status == 'hit':
+        with open(os.path.join(target, KEY_MARKER), 'w') as f:
+            f.write(key)
+        touch(entry)
+    return status
+
+def save_parse(project_dir, profiles_dir=None, target_dir='target'):
+    """Store the artifacts of a finished dbt parse under the project key"""
+    key = project_key(project_dir, profiles_dir)
+    target = os.path.join(project_dir, target_dir)
+    if not all(os.path.exists(os.path.join(target, name)) for name in PARSE_ARTIFACTS):
+        return None
+
+    def fill(path):
+        for name in PARSE_ARTIFACTS:
+            shutil.copyfile(os.path.join(target, name), os.path.join(path, name))
+    entry = store_entry(PARSE_CACHE_DIR, key, fill)
+    with open(os.path.join(target, KEY_MARKER), 'w') as f:
+        f.write(key)
+    return entry
+
+def startup_seconds(project_dir, started, finished, target_dir='target'):
+    """
+    Return (total, startup) seconds of one dbt invocation.
+
+    Startup is the wall time not spent executing nodes: the elapsed_time
+    of a run_results.json written by this invocation is subtracted from
+    the total, and commands that write none (deps, parse) are all startup.
+    """
+    total = finished - started
+    path = os.path.join(project_dir, target_dir, 'run_results.json')
+    try:
+        if os.path.getmtime(path) >= started:
+            with open(path) as f:
+                elapsed = json.load(f).get('elapsed_time') or 0.0
+            return total, max(total - elapsed, 0.0)
+    except (OSError, ValueError):
+        pass
+    return total, total
+
+def report_startup(project_dir, command, started, cache_status=None, target_dir='target'):
+    """Print and record the startup overhead of one dbt invocation as a query metric"""
+    from query_metrics import record_query
+
+    total, startup = startup_seconds(project_dir, started, time.time(), target_dir)
+    cache_note = f" (artifact cache {cache_status})" if cache_status else ""
+    print(f"⏱️  dbt {command} startup: {startup:.1f}s of {total:.1f}s{cache_note}")
+    record_query(f"dbt {command} startup", startup, source='dbt_startup', label=f'{command}_startup')
+    return startup
+
+def cache_status():
+    """Return the size and age of every cache entry"""
+    entries = {}
+    for kind, cache_dir in (('packages', PACKAGES_CACHE_DIR), ('parse', PARSE_CACHE_DIR)):
+        entries[kind] = []
+        if not os.path.isdir(cache_dir):
+            continue
+        for name in sorted(os.listdir(cache_dir)):
+            path = os.path.join(cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(root, filename))
+                for root, _, filenames in os.walk(path) for filename in filenames
+            )
+            entries[kind].append({'key': name, 'bytes': size, 'age_seconds': time.time() - os.path.getmtime(path)})
+    return entries
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--project-dir', default='.', help="dbt project directory")
+    common.add_argument('--profiles-dir', default=os.environ.get('DBT_PROFILES_DIR'),
+                        help="Directory of the profiles.yml hashed into the parse key")
+    common.add_argument('--target-path', default=os.environ.get('DBT_TARGET_PATH', 'target'),
+                        help="dbt target directory, relative to the project, holding the parse artifacts")
+
+    parser = argparse.ArgumentParser(description="Restore and save cached dbt packages and parse artifacts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('restore-packages', parents=[common],
+                          help="Restore dbt_packages; exits 1 when dbt deps must run")
+    subparsers.add_parser('save-packages', parents=[common], help="Cache dbt_packages after dbt deps")
+    subparsers.add_parser('restore-parse', parents=[common],
+                          help="Restore the parse artifacts; exits 1 when dbt parse must run")
+    subparsers.add_parser('save-parse', parents=[common], help="Cache the parse artifacts after dbt parse")
+    report_parser = subparsers.add_parser('report-startup', parents=[common],
+                                          help="Record the startup overhead of a dbt invocation")
+    report_parser.add_argument('--command', dest='dbt_command', required=True, help="dbt command that ran")
+    report_parser.add_argument('--started', type=float, required=True, help="Epoch seconds the task step started")
+    report_parser.add_argument('--cache-status', help="Artifact cache result to show alongside")
+    subparsers.add_parser('status', parents=[common], help="List the cache entries")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    project_dir = os.path.abspath(args.project_dir)
+
+    if args.command == 'restore-packages':
+        if restore_packages(project_dir):
+            print("📦 dbt packages restored from the artifact cache")
+            return 0
+        print("📦 No cached dbt packages for this lock file - dbt deps must run")
+        return 1
+    if args.command == 'save-packages':
+        entry = save_packages(project_dir)
+        print(f"📦 Cached dbt packages at {entry}" if entry else "⚠️ No dbt packages to cache")
+        return 0
+    if args.command == 'restore-parse':
+        status = restore_parse(project_dir, args.profiles_dir, args.target_path)
+        print({
+            'hit': "🗂️  Parse artifacts restored from the artifact cache",
+            'warm': "🗂️  Project changed since the cached parse - restored the latest partial parse file",
+            'cold': "🗂️  No cached parse artifacts",
+        }[status])
+        return 0 if status == 'hit' else 1
+    if args.command == 'save-parse':
+        entry = save_parse(project_dir, args.profiles_dir, args.target_path)
+        print(f"🗂️  Cached parse artifacts at {entry}" if entry else "⚠️ No parse artifacts in target/ to cache")
+        return 0
+    if args.command == 'report-startup':
+        report_startup(project_dir, args.dbt_command, args.started, args.cache_status, args.target_path)
+        return 0
+
+    for kind, entries in cache_status().items():
+        print(f"{kind}: {len(entries)} entries")
+        for entry in entries:
+            print(f"  {entry['key'][:12]}  {entry['bytes'] / 1024:.0f} KB  used {entry['age_seconds'] / 3600:.1f}h ago")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
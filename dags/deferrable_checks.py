@@ -0,0 +1,125 @@
+"""
+Deferrable Airflow operator for the SCV check queries
+Submits the checks asynchronously and frees the worker slot while the triggerer polls Snowflake
+"""
+
+import asyncio
+import logging
+import time
+
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+from async_checks import POLL_INTERVAL_SECONDS, collect_results, submit_checks, wait_for_queries
+from metric_cache import MetricCache
+from query_metrics import export_query_history
+from snowflake_pool import DEFAULT_CONN_ID, get_pool
+from source_checks import CHECK_MODE, finish_checks, run_check
+
+class SnowflakeQueriesTrigger(BaseTrigger):
+    """
+    Trigger that waits in the triggerer for submitted Snowflake queries.
+
+    Every query is polled from the triggerer's event loop over one pooled
+    connection; the event carries each query's final state.
+    """
+
+    def __init__(self, query_ids, conn_id=DEFAULT_CONN_ID, poll_interval=POLL_INTERVAL_SECONDS):
+        super().__init__()
+        self.query_ids = list(query_ids)
+        self.conn_id = conn_id
+        self.poll_interval = poll_interval
+
+    def serialize(self):
+        return ('deferrable_checks.SnowflakeQueriesTrigger', {
+            'query_ids': self.query_ids,
+            'conn_id': self.conn_id,
+            'poll_interval': self.poll_interval,
+        })
+
+    async def run(self):
+        pool = get_pool(self.conn_id)
+        acquire = asyncio.get_running_loop().run_in_executor(None, pool.acquire)
+        try:
+            connection = await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The executor thread still acquires; hand the connection back then
+            acquire.add_done_callback(lambda done: done.exception() or pool.release(done.result()))
+            raise
+        # A trigger timeout or cancellation raises CancelledError, which is not
+        # an Exception; the triggerer is long-lived, so the pool slot must still
+        # be returned
+        try:
+            states = await wait_for_queries(connection, self.query_ids, self.poll_interval)
+            event = TriggerEvent({'status': 'done', 'states': states})
+        except Exception as e:
+            event = TriggerEvent({'status': 'error', 'message': str(e)})
+        finally:
+            pool.release(connection)
+        yield event
+
+class DeferrableChecksOperator(BaseOperator):
+    """
+    Run source or model checks without holding a worker slot while they run.
+
+    ``execute`` submits every check not fresh in the metric cache and defers
+    to SnowflakeQueriesTrigger. On resume the rows are fetched and the
+    results, shaped like run_source_checks results, are passed to
+    ``result_callable`` - the same validation the synchronous tasks run.
+
+    Only the full-scan checks are deferrable: the metadata check mode's
+    freshness, watermark and profiling steps run in the worker, so the
+    operator refuses to be built unless SCV_CHECK_MODE is 'scan'.
+    """
+
+    def __init__(self, *, names, checks, result_callable, conn_id=DEFAULT_CONN_ID,
+                 poll_interval=POLL_INTERVAL_SECONDS, **kwargs):
+        if CHECK_MODE != 'scan':
+            raise AirflowException(
+                f"SCV_CHECK_EXECUTION=deferrable runs the full-scan checks, but SCV_CHECK_MODE is "
+                f"'{CHECK_MODE}'; set SCV_CHECK_MODE=scan or use SCV_CHECK_EXECUTION=sync or async"
+            )
+        super().__init__(**kwargs)
+        self.names = list(names)
+        self.checks = checks
+        self.result_callable = result_callable
+        self.conn_id = conn_id
+        self.poll_interval = poll_interval
+
+    def execute(self, context):
+        pool = get_pool(self.conn_id)
+        submitted, cached = submit_checks(pool, self.names, self.checks, MetricCache())
+        if not submitted:
+            return self.finish(pool, cached)
+        self.log.info(f"Submitted {len(submitted)} check queries; deferring until they finish")
+        self.defer(
+            trigger=SnowflakeQueriesTrigger(
+                [submission['query_id'] for submission in submitted.values()], self.conn_id, self.poll_interval,
+            ),
+            method_name='execute_complete',
+            kwargs={'submitted': submitted},
+            timeout=self.execution_timeout,
+        )
+
+    def execute_complete(self, context, event, submitted):
+        if event['status'] != 'done':
+            raise AirflowException(f"Waiting for check queries failed: {event.get('message')}")
+        pool = get_pool(self.conn_id)
+        metric_cache = MetricCache()
+        results = collect_results(pool, submitted, event['states'], self.checks, metric_cache)
+        for name in self.names:
+            if name not in results:
+                # Served from the metric cache at submission; read again, or rerun if it expired
+                results[name] = run_check(pool, name, self.checks[name], metric_cache)
+        return self.finish(pool, results)
+
+    def finish(self, pool, results):
+        logger = logging.getLogger(__name__)
+        # Wall time of a deferred run is roughly its slowest query
+        start = time.perf_counter() - max(result['elapsed'] for result in results.values())
+        results = finish_checks(results, start, 'Deferred checks')
+        outcome = self.result_callable(results)
+        pool.log_stats(logger)
+        export_query_history(pool, logger)
+        return outcome
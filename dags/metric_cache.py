@@ -0,0 +1,227 @@
+"""
+Shared result cache for SCV health metric queries
+Lets the monitoring and pipeline DAGs reuse fresh metric rows instead of rescanning tables
+"""
+
+from contextlib import closing
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+# Cache lives on the shared state volume so both DAGs see the same entries
+CACHE_DIR = os.environ.get('SCV_STATE_DIR', '/opt/airflow/dbt/state')
+CACHE_PATH = os.path.join(CACHE_DIR, 'metric_cache.sqlite')
+
+# Entries older than this are recomputed even when the table version is unchanged
+DEFAULT_TTL_SECONDS = int(os.environ.get('SCV_METRIC_CACHE_TTL', 6 * 60 * 60))
+MAX_ENTRIES = 500
+
+# Queries reading the clock return different rows on an unchanged table as
+# time passes (e.g. hours_since_update, recent_record_count), so their cache
+# key also carries the current UTC hour or date
+CLOCK_FUNCTIONS = (
+    (re.compile(r'\b(CURRENT_TIMESTAMP|LOCALTIMESTAMP|SYSDATE|GETDATE|CURRENT_TIME)\b', re.IGNORECASE), '%Y-%m-%dT%H'),
+    (re.compile(r'\bCURRENT_DATE\b', re.IGNORECASE), '%Y-%m-%d'),
+)
+
+def normalize_query(query):
+    """Collapse whitespace so formatting differences share a cache entry"""
+    return re.sub(r'\s+', ' ', query).strip()
+
+def clock_period(query, now=None):
+    """Return the UTC hour or date a clock-reading query's result holds for, or '' for other queries"""
+    for pattern, period in CLOCK_FUNCTIONS:
+        if pattern.search(query):
+            return time.strftime(period, time.gmtime(now))
+    return ''
+
+def identifier_name(part):
+    """
+    Return an identifier as information_schema stores it.
+
+    Unquoted identifiers are stored upper-cased; quoted ones keep their
+    case, e.g. "forecast_day" stays forecast_day.
+    """
+    if len(part) >= 2 and part.startswith('"') and part.endswith('"'):
+        return part[1:-1].replace('""', '"')
+    return part.upper()
+
+def split_table_name(table):
+    """Split 'db.schema.table' or 'schema.table' into (database, schema, table)"""
+    parts = table.split('.')
+    if len(parts) == 3:
+        return parts[0], parts[1], parts[2]
+    return None, parts[-2], parts[-1]
+
+def table_metadata(pool, tables):
+    """
+    Return {table: {'row_count', 'last_altered'}} from information_schema.
+
+    One metadata query is issued per database. Tables whose metadata cannot
+    be read get no entry; views are returned with a NULL row_count.
+    """
+    logger = logging.getLogger(__name__)
+    by_database = {}
+    for table in tables:
+        database, schema, name = split_table_name(table)
+        by_database.setdefault(database, []).append((table, schema, name))
+
+    metadata = {}
+    for database, entries in by_database.items():
+        information_schema = f'{database}.information_schema.tables' if database else 'information_schema.tables'
+        filters = ' OR '.join(
+            f"(table_schema = '{identifier_name(schema)}' AND table_name = '{identifier_name(name)}')"
+            for _, schema, name in entries
+        )
+        query = f"""
+    SELECT table_schema, table_name, row_count, last_altered
+    FROM {information_schema}
+    WHERE {filters}
+    """
+        try:
+            rows = pool.get_records(query)
+        except Exception as e:
+            logger.warning(f"Could not read table metadata from {information_schema}: {e}")
+            continue
+
+        found = {
+            (row[0], row[1]): {'row_count': row[2], 'last_altered': row[3]}
+            for row in rows
+        }
+        for table, schema, name in entries:
+            entry = found.get((identifier_name(schema), identifier_name(name)))
+            if entry is not None:
+                metadata[table] = entry
+    return metadata
+
+def table_versions(pool, tables):
+    """Return {table: version} built from information_schema row counts and last_altered"""
+    return {
+        table: f"{entry['row_count']}:{entry['last_altered']}"
+        for table, entry in table_metadata(pool, tables).items()
+    }
+
+class MetricCache:
+    """
+    SQLite-backed TTL cache for metric query results.
+
+    Entries are keyed by the normalized query text plus a table-version
+    string, so a table that changed since the entry was written misses
+    even inside the TTL. The least recently used entries are evicted once
+    the cache holds more than ``max_entries`` rows.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS metric_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    query TEXT,
+                    result BLOB,
+                    created_at REAL,
+                    accessed_at REAL
+                )
+            """)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    @staticmethod
+    def key(query, version=''):
+        """Return the cache key for a query and table version (plus the clock period for clock-reading queries)"""
+        key = f"{normalize_query(query)}\0{version}\0{clock_period(query)}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get(self, query, version='', ttl_seconds=None):
+        """Return (True, result) for a fresh entry, otherwise (False, None)"""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        cache_key = self.key(query, version)
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            row = db.execute(
+                'SELECT result, created_at FROM metric_cache WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+            fresh = row is not None and now - row[1] <= ttl_seconds
+            if fresh:
+                db.execute('UPDATE metric_cache SET accessed_at = ? WHERE cache_key = ?', (now, cache_key))
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (True, pickle.loads(row[0])) if fresh else (False, None)
+
+    def put(self, query, version, result):
+        """Store a result and evict the least recently used entries beyond max_entries"""
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                'INSERT OR REPLACE INTO metric_cache VALUES (?, ?, ?, ?, ?)',
+                (self.key(query, version), normalize_query(query), pickle.dumps(result), now, now),
+            )
+            db.execute(
+                """
+                DELETE FROM metric_cache WHERE cache_key IN (
+                    SELECT cache_key FROM metric_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def get_or_compute(self, query, compute, version='', ttl_seconds=None):
+        """Return a fresh cached result or compute, store and return a new one"""
+        found, result = self.get(query, version, ttl_seconds)
+        if found:
+            return result
+        result = compute()
+        self.put(query, version, result)
+        return result
+
+    def log_stats(self, logger=None):
+        """Log cache hit/miss counts"""
+        logger = logger or logging.getLogger(__name__)
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        logger.info(f"Metric cache - Hits: {self.hits}, Misses: {self.misses}, Hit Rate: {hit_rate:.0%}")
+
+def query_version(pool, tables):
+    """
+    Return the cache version string for a query reading ``tables``.
+
+    Returns None unless every table has a version: a cached row could then
+    predate a rebuild, so the query must run uncached.
+    """
+    versions = table_versions(pool, tables)
+    if any(table not in versions for table in tables):
+        return None
+    return '|'.join(f"{table}={versions[table]}" for table in sorted(tables))
+
+def cached_get_first(pool, cache, query, tables, ttl_seconds=None):
+    """
+    Run pool.get_first through the metric cache.
+
+    ``tables`` lists the fully qualified tables the query reads; their
+    information_schema versions become part of the cache key (see
+    query_version).
+    """
+    version = query_version(pool, tables)
+    if version is None:
+        return pool.get_first(query)
+    return cache.get_or_compute(query, lambda: pool.get_first(query), version, ttl_seconds)
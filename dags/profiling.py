@@ -0,0 +1,255 @@
+"""
+Approximate profiling of SCV tables for the health checks
+Computes distinct counts and coverage ratios at a selectable fidelity and reports each estimate with its error
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+import time
+
+from metric_cache import cached_get_first
+from query_metrics import query_label
+from source_checks import MAX_CHECK_WORKERS, finish_checks
+
+# 'exact' runs COUNT(DISTINCT) over every row, 'approx' uses HyperLogLog
+# (APPROX_COUNT_DISTINCT) with exact counts, and 'sample' reads a Bernoulli
+# sample of the rows for counts and ratios
+FIDELITIES = ('exact', 'approx', 'sample')
+DEFAULT_FIDELITY = os.environ.get('SCV_PROFILE_FIDELITY', 'approx')
+DEFAULT_SAMPLE_PCT = float(os.environ.get('SCV_PROFILE_SAMPLE_PCT', 1))
+
+# Reported errors are half-widths of a ~95% interval
+CONFIDENCE_Z = 1.96
+
+# Average relative error of Snowflake's HyperLogLog estimates
+HLL_RELATIVE_ERROR = 0.0162
+
+# Metrics are (kind, expression) with kind count, count_if or distinct;
+# ratios are (numerator, denominator, is_proportion). A proportion counts a
+# subset of its denominator's rows, so its sampling error is binomial.
+PROFILES = {
+    'D365_CUSTOMERS': {
+        'table': 'your-database.raw.D365_CUSTOMERS',
+        'metrics': {
+            'record_count': ('count', None),
+            'unique_customers': ('distinct', 'customer_id'),
+            'unique_postal_codes': ('distinct', 'postal_code'),
+        },
+        'ratios': {},
+    },
+    'EXCEL_DATA': {
+        'table': 'your-database.raw.EXCEL_DATA',
+        'metrics': {
+            'record_count': ('count', None),
+            'records_with_postal': ('count_if', 'postal_code IS NOT NULL'),
+            'records_with_region': ('count_if', 'region IS NOT NULL'),
+        },
+        'ratios': {
+            'postal_completeness': ('records_with_postal', 'record_count', True),
+            'region_completeness': ('records_with_region', 'record_count', True),
+        },
+    },
+    'WEATHER_DATA': {
+        'table': 'WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"',
+        'where': 'date_valid_std >= CURRENT_DATE()',
+        'metrics': {
+            'record_count': ('count', None),
+            'unique_locations': ('distinct', 'postal_code'),
+        },
+        'ratios': {},
+    },
+    'silver_customer_weather': {
+        'table': 'raw_SILVER_DEV.silver_customer_weather',
+        'metrics': {
+            'total_records': ('count', None),
+            'unique_customers': ('distinct', 'customer_id'),
+            'records_with_weather': ('count_if', 'avg_temperature_air_2m_f IS NOT NULL'),
+        },
+        'ratios': {
+            'weather_coverage': ('records_with_weather', 'total_records', True),
+        },
+    },
+}
+
+def aggregate_sql(kind, expression, fidelity):
+    """Return the SQL aggregate for one metric at a fidelity"""
+    if kind == 'count':
+        return 'COUNT(*)'
+    if kind == 'count_if':
+        return f'COUNT_IF({expression})'
+    if fidelity == 'exact':
+        return f'COUNT(DISTINCT {expression})'
+    return f'APPROX_COUNT_DISTINCT({expression})'
+
+def profile_query(profile, fidelity=DEFAULT_FIDELITY, sample_pct=DEFAULT_SAMPLE_PCT, table=None):
+    """
+    Render the profiling query and return (query, columns).
+
+    Everything is computed in one statement. When sampling, distinct counts
+    cannot be scaled up from a row sample, so they come from HyperLogLog
+    over a separate unsampled scan, which reads only the profiled columns.
+    """
+    if fidelity not in FIDELITIES:
+        raise ValueError(f"Unknown profiling fidelity: {fidelity}")
+    table = table or profile['table']
+    where = f"\n    WHERE {profile['where']}" if profile.get('where') else ''
+    sampled = fidelity == 'sample'
+
+    row_metrics = []
+    distinct_metrics = []
+    for name, (kind, expression) in profile['metrics'].items():
+        target = distinct_metrics if sampled and kind == 'distinct' else row_metrics
+        target.append(f"{aggregate_sql(kind, expression, fidelity)} as {name}")
+    columns = ['scanned_rows'] + [
+        name for name, (kind, _) in profile['metrics'].items() if not (sampled and kind == 'distinct')
+    ] + [name for name, (kind, _) in profile['metrics'].items() if sampled and kind == 'distinct']
+
+    sample = f" SAMPLE ({sample_pct})" if sampled else ''
+    query = f"""
+    SELECT
+        {', '.join(['COUNT(*) as scanned_rows'] + row_metrics)}
+    FROM {table}{sample}{where}
+    """
+    if distinct_metrics:
+        query = f"""
+    SELECT sampled.*, distinct_counts.*
+    FROM ({query}) sampled
+    CROSS JOIN (
+        SELECT {', '.join(distinct_metrics)}
+        FROM {table}{where}
+    ) distinct_counts
+    """
+    return query, columns
+
+def estimate_metrics(profile, values, fidelity, sample_pct, hll_error=HLL_RELATIVE_ERROR):
+    """
+    Turn raw aggregates into {name: {'value', 'error'}} estimates.
+
+    Sampled counts are scaled by the sampling rate with a binomial error;
+    HyperLogLog counts carry hll_error; exact values carry none.
+    Ratio errors are binomial for sampled proportions and otherwise
+    propagated from the numerator and denominator. A ratio over an empty
+    sample has an infinite error.
+    """
+    rate = sample_pct / 100 if fidelity == 'sample' else 1.0
+    scanned_rows = values['scanned_rows'] or 0
+    metrics = {}
+    for name, (kind, _) in profile['metrics'].items():
+        raw = values[name] or 0
+        if kind == 'distinct':
+            error = 0.0 if fidelity == 'exact' else CONFIDENCE_Z * hll_error * raw
+            metrics[name] = {'value': raw, 'error': error}
+        else:
+            error = CONFIDENCE_Z * math.sqrt(raw * (1 - rate)) / rate
+            metrics[name] = {'value': raw / rate, 'error': error}
+
+    for name, (numerator, denominator, is_proportion) in profile['ratios'].items():
+        top, bottom = metrics[numerator], metrics[denominator]
+        if not bottom['value']:
+            metrics[name] = {'value': 0.0, 'error': math.inf if rate < 1 else 0.0}
+            continue
+        value = top['value'] / bottom['value']
+        if is_proportion and rate < 1:
+            sample_size = values[denominator] if values[denominator] is not None else scanned_rows
+            error = (
+                CONFIDENCE_Z * math.sqrt(value * (1 - value) * (1 - rate) / sample_size)
+                if sample_size else math.inf
+            )
+        else:
+            relative = math.hypot(
+                top['error'] / top['value'] if top['value'] else 0.0,
+                bottom['error'] / bottom['value'],
+            )
+            error = value * relative
+        metrics[name] = {'value': value, 'error': error}
+    return metrics
+
+def profile_table(pool, name, fidelity=DEFAULT_FIDELITY, sample_pct=DEFAULT_SAMPLE_PCT, cache=None,
+                  profiles=PROFILES, table=None, hll_error=HLL_RELATIVE_ERROR):
+    """
+    Profile one table and return its estimates.
+
+    Returns {'fidelity', 'sample_pct', 'scanned_rows', 'metrics'}. With a
+    metric cache the aggregates are reused while the table is unchanged.
+    table and hll_error let other engines profile their own copy.
+    """
+    profile = profiles[name]
+    query, columns = profile_query(profile, fidelity, sample_pct, table)
+    if cache is not None:
+        row = cached_get_first(pool, cache, query, [table or profile['table']])
+    else:
+        row = pool.get_first(query)
+    values = dict(zip(columns, row))
+    return {
+        'fidelity': fidelity,
+        'sample_pct': sample_pct if fidelity == 'sample' else None,
+        'scanned_rows': values['scanned_rows'],
+        'metrics': estimate_metrics(profile, values, fidelity, sample_pct, hll_error),
+    }
+
+def run_profile(pool, name, fidelity, sample_pct, cache):
+    """Profile one table and capture the outcome like run_check"""
+    start = time.perf_counter()
+    result = {'name': name, 'required': False, 'row': None, 'error': None}
+    try:
+        with query_label(f'profile_{name}'):
+            result['row'] = profile_table(pool, name, fidelity, sample_pct, cache)
+    except Exception as e:
+        result['error'] = e
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+def run_profiles(pool, names=None, fidelity=DEFAULT_FIDELITY, sample_pct=DEFAULT_SAMPLE_PCT, cache=None,
+                 max_workers=MAX_CHECK_WORKERS):
+    """
+    Profile tables concurrently over the shared connection pool.
+
+    Returns {name: result} like run_source_checks, with each profile as the
+    row. Profiles feed monitoring, so a failed profile is logged, not raised.
+    """
+    names = list(names or PROFILES)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+        futures = [
+            executor.submit(run_profile, pool, name, fidelity, sample_pct, cache)
+            for name in names
+        ]
+        results = {future.result()['name']: future.result() for future in futures}
+    return finish_checks(results, start, f'Profiles ({fidelity})')
+
+def evaluate_minimum(metric, minimum):
+    """
+    Compare an estimate with a lower threshold, allowing for its error.
+
+    Returns 'pass' when the whole interval is at or above the threshold,
+    'fail' when it is entirely below and 'uncertain' when it straddles it.
+    """
+    if metric['value'] - metric['error'] >= minimum:
+        return 'pass'
+    if metric['value'] + metric['error'] < minimum:
+        return 'fail'
+    return 'uncertain'
+
+def check_minimum(pool, name, metric, minimum, profile=None, fidelity=DEFAULT_FIDELITY,
+                  sample_pct=DEFAULT_SAMPLE_PCT, cache=None):
+    """
+    Check a profiled metric against a minimum, escalating to an exact profile
+    when the approximate interval straddles the threshold.
+
+    Returns (estimate, status) where status is 'pass' or 'fail'.
+    """
+    if profile is None:
+        profile = profile_table(pool, name, fidelity, sample_pct, cache)
+    estimate = profile['metrics'][metric]
+    status = evaluate_minimum(estimate, minimum)
+    if status == 'uncertain':
+        estimate = profile_table(pool, name, 'exact', cache=cache)['metrics'][metric]
+        status = evaluate_minimum(estimate, minimum)
+    return estimate, status
+
+def format_estimate(metric, percent=False):
+    """Format an estimate as 'value ± error'"""
+    if percent:
+        return f"{metric['value']:.2%} ± {metric['error']:.2%}"
+    return f"{metric['value']:,.0f} ± {metric['error']:,.0f}"
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Query-level performance metrics for the SCV DAGs
+Records every warehouse query with its task, latency and rows, and exports them as OpenMetrics text or StatsD
+"""
+
+import argparse
+import atexit
+from contextlib import contextmanager
+import fcntl
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+from metric_cache import CACHE_DIR
+
+# The file sink needs no services: a JSON-lines query log plus an OpenMetrics
+# text file that a node_exporter textfile collector or Prometheus can scrape
+METRICS_DIR = os.environ.get('SCV_METRICS_DIR', os.path.join(CACHE_DIR, 'metrics'))
+QUERY_LOG_PATH = os.path.join(METRICS_DIR, 'queries.jsonl')
+STATE_PATH = os.path.join(METRICS_DIR, 'query_metrics.json')
+OPENMETRICS_PATH = os.path.join(METRICS_DIR, 'query_metrics.prom')
+MAX_QUERY_LOG_BYTES = 50 * 1024 * 1024
+
+# Comma-separated sinks: 'file', 'statsd' or 'none'
+SINKS = [sink.strip() for sink in os.environ.get('SCV_QUERY_METRICS_SINKS', 'file').split(',') if sink.strip()]
+STATSD_HOST = os.environ.get('SCV_STATSD_HOST', 'localhost')
+STATSD_PORT = int(os.environ.get('SCV_STATSD_PORT', 8125))
+STATSD_PREFIX = os.environ.get('SCV_STATSD_PREFIX', 'scv')
+
+# Latency histogram buckets in seconds, up to the DAGs' 2-hour execution_timeout
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+# Queries slower than this are logged as warnings when they finish
+SLOW_QUERY_SECONDS = float(os.environ.get('SCV_SLOW_QUERY_SECONDS', 30 * 60))
+
+# Per-query statistics read back from Snowflake's query history. Warehouse
+# credits are not attributed per query there; cloud services credits are.
+QUERY_HISTORY_COLUMNS = ('bytes_scanned', 'partitions_scanned', 'partitions_total', 'credits_used_cloud_services')
+HISTORY_LABEL = 'query_history'
+
+# Queries from the connection pool are exported in batches, since every file
+# export rewrites the state under a lock: at the end of a task by
+# export_query_history, once this many are waiting, or at exit
+EXPORT_BATCH_SIZE = 100
+
+_context = threading.local()
+_pending = []  # query records awaiting query-history statistics
+_unexported = []  # pool query records awaiting export
+_pending_lock = threading.Lock()
+
+def task_labels():
+    """Return the Airflow dag and task running this process, from its context variables"""
+    return {
+        'dag': os.environ.get('AIRFLOW_CTX_DAG_ID', 'local'),
+        'task': os.environ.get('AIRFLOW_CTX_TASK_ID', 'local'),
+    }
+
+@contextmanager
+def query_label(label):
+    """Attribute the queries issued by this thread inside the block to a check or step"""
+    previous = getattr(_context, 'label', None)
+    _context.label = label
+    try:
+        yield
+    finally:
+        _context.label = previous
+
+def record_query(query, seconds, rows=None, query_id=None, error=None, source='dag', label=None,
+                 export_now=True):
+    """
+    Record one finished warehouse query and export it to the configured sinks.
+
+    With export_now=False the record is only returned, for callers that
+    export a batch at once. Records with a query id are kept until
+    export_query_history adds their scan statistics.
+    """
+    record = {
+        'kind': 'query',
+        'time': time.time(),
+        **task_labels(),
+        'label': label or getattr(_context, 'label', None) or 'unlabelled',
+        'source': source,
+        'query_id': query_id,
+        'seconds': seconds,
+        'rows': rows,
+        'error': None if error is None else type(error).__name__,
+        'query': re.sub(r'\s+', ' ', query).strip()[:500],
+    }
+    if seconds > SLOW_QUERY_SECONDS:
+        logging.getLogger(__name__).warning(
+            f"Slow query in {record['task']} ({record['label']}): {seconds:.0f}s, query id {query_id}"
+        )
+    if query_id and record['label'] != HISTORY_LABEL:
+        with _pending_lock:
+            _pending.append(record)
+    if export_now:
+        export([record])
+    return record
+
+def record_pool_query(query, seconds, rows=None, query_id=None, error=None):
+    """
+    The connection pool's on_query hook: record a query for a batched export.
+
+    Records are exported by flush_queries once EXPORT_BATCH_SIZE are waiting,
+    at the end of the task or at exit.
+    """
+    record = record_query(query, seconds, rows, query_id, error, export_now=False)
+    with _pending_lock:
+        _unexported.append(record)
+        full = len(_unexported) >= EXPORT_BATCH_SIZE
+    if full:
+        flush_queries()
+    return record
+
+def flush_queries():
+    """Export the pool query records still waiting, in one batch"""
+    with _pending_lock:
+        records = list(_unexported)
+        _unexported.clear()
+    if records:
+        export(records)
+    return records
+
+atexit.register(flush_queries)
+
+def export(records):
+    """Send records to every configured sink; metrics never fail a task"""
+    for sink in SINKS:
+        if sink == 'none':
+            continue
+        try:
+            SINK_WRITERS[sink](records)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not export query metrics to {sink}: {e}")
+
+def series_key(record):
+    return json.dumps([record['dag'], record['task'], record['label'], record['source']])
+
+def update_state(state, record):
+    """Fold one record into the cumulative per-series counters"""
+    series = state.setdefault('series', {}).setdefault(series_key(record), {
+        'labels': {key: record[key] for key in ('dag', 'task', 'label', 'source')},
+        'buckets': [0] * len(LATENCY_BUCKETS),
+        'count': 0,
+        'sum': 0.0,
+        'rows': 0,
+        'errors': 0,
+        **{column: 0 for column in QUERY_HISTORY_COLUMNS},
+    })
+    if record['kind'] == 'history':
+        for column in QUERY_HISTORY_COLUMNS:
+            series[column] += record.get(column) or 0
+        return
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if record['seconds'] <= bound:
+            series['buckets'][i] += 1
+    series['count'] += 1
+    series['sum'] += record['seconds']
+    series['rows'] += record['rows'] or 0
+    series['errors'] += 1 if record['error'] else 0
+
+def format_labels(labels, **extra):
+    items = {**labels, **extra}
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"') for key, value in items.items()}
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped.items()) + '}'
+
+def render_openmetrics(state):
+    """Render the cumulative state as OpenMetrics text"""
+    series = list(state.get('series', {}).values())
+    lines = [
+        '# TYPE scv_query_duration_seconds histogram',
+        '# UNIT scv_query_duration_seconds seconds',
+        '# HELP scv_query_duration_seconds Wall time of warehouse queries issued by the SCV DAGs and dbt',
+    ]
+    for entry in series:
+        for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+            lines.append(f"scv_query_duration_seconds_bucket{format_labels(entry['labels'], le=bound)} {count}")
+        lines.append(f"scv_query_duration_seconds_bucket{format_labels(entry['labels'], le='+Inf')} {entry['count']}")
+        lines.append(f"scv_query_duration_seconds_sum{format_labels(entry['labels'])} {entry['sum']}")
+        lines.append(f"scv_query_duration_seconds_count{format_labels(entry['labels'])} {entry['count']}")
+
+    counters = [
+        ('scv_query_rows', 'rows', 'Rows returned or affected by warehouse queries'),
+        ('scv_query_errors', 'errors', 'Warehouse queries that raised an error'),
+        ('scv_query_bytes_scanned', 'bytes_scanned', 'Bytes scanned, from Snowflake query history'),
+        ('scv_query_partitions_scanned', 'partitions_scanned', 'Micro-partitions scanned, from Snowflake query history'),
+        ('scv_query_partitions', 'partitions_total', 'Micro-partitions in the scanned tables, from Snowflake query history'),
+        ('scv_query_cloud_services_credits', 'credits_used_cloud_services', 'Cloud services credits, from Snowflake query history'),
+    ]
+    for name, field, help_text in counters:
+        lines.append(f'# TYPE {name} counter')
+        lines.append(f'# HELP {name} {help_text}')
+        for entry in series:
+            lines.append(f"{name}_total{format_labels(entry['labels'])} {entry[field]}")
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+def write_atomic(path, text):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+def write_file(records):
+    """Append records to the query log and rewrite the OpenMetrics file under a lock"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(f'{STATE_PATH}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(QUERY_LOG_PATH) and os.path.getsize(QUERY_LOG_PATH) > MAX_QUERY_LOG_BYTES:
+            os.replace(QUERY_LOG_PATH, f'{QUERY_LOG_PATH}.1')
+        with open(QUERY_LOG_PATH, 'a') as log:
+            for record in records:
+                log.write(json.dumps(record, default=str) + '\n')
+
+        state = {}
+        if os.path.exists(STATE_PATH):
+            with open(STATE_PATH) as f:
+                state = json.load(f)
+        for record in records:
+            update_state(state, record)
+        write_atomic(STATE_PATH, json.dumps(state))
+        write_atomic(OPENMETRICS_PATH, render_openmetrics(state))
+
+def statsd_name(*parts):
+    return '.'.join(re.sub(r'[^A-Za-z0-9_-]+', '_', str(part)) for part in parts)
+
+def write_statsd(records):
+    """Send records as StatsD timers and counters over UDP"""
+    lines = []
+    for record in records:
+        base = statsd_name(STATSD_PREFIX, 'query', record['dag'], record['task'], record['label'])
+        if record['kind'] == 'history':
+            lines.extend(
+                f"{base}.{column}:{record[column]}|c"
+                for column in QUERY_HISTORY_COLUMNS if record.get(column) is not None
+            )
+            continue
+        lines.append(f"{base}.duration:{record['seconds'] * 1000:.1f}|ms")
+        if record['rows'] is not None:
+            lines.append(f"{base}.rows:{record['rows']}|c")
+        if record['error']:
+            lines.append(f"{base}.errors:1|c")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for line in lines:
+            sock.sendto(line.encode('utf-8'), (STATSD_HOST, STATSD_PORT))
+
+SINK_WRITERS = {
+    'file': write_file,
+    'statsd': write_statsd,
+}
+
+def export_query_history(pool, logger=None):
+    """
+    Add bytes scanned, partitions and credits from Snowflake query history
+    to the queries recorded so far, with one history lookup.
+
+    Call at the end of a task. Queries missing from the history (another
+    user's session, or history not yet visible) are left without statistics.
+    """
+    logger = logger or logging.getLogger(__name__)
+    flush_queries()
+    with _pending_lock:
+        records = list(_pending)
+        _pending.clear()
+    if not records or SINKS == ['none']:
+        return []
+
+    by_id = {record['query_id']: record for record in records}
+    ids = ', '.join(f"'{query_id}'" for query_id in by_id)
+    oldest = min(record['time'] for record in records)
+    query = f"""
+    SELECT query_id, {', '.join(QUERY_HISTORY_COLUMNS)}
+    FROM TABLE(information_schema.query_history(
+        END_TIME_RANGE_START => TO_TIMESTAMP_LTZ({int(oldest) - 60}),
+        RESULT_LIMIT => 10000
+    ))
+    WHERE query_id IN ({ids})
+    """
+    try:
+        with query_label(HISTORY_LABEL):
+            rows = pool.get_records(query)
+    except Exception as e:
+        logger.warning(f"Could not read query history: {e}")
+        return []
+
+    history = []
+    for row in rows:
+        record = by_id[row[0]]
+        history.append({
+            'kind': 'history',
+            'time': time.time(),
+            **{key: record[key] for key in ('dag', 'task', 'label', 'source', 'query_id')},
+            **dict(zip(QUERY_HISTORY_COLUMNS, row[1:])),
+        })
+    export(history)
+    logger.info(f"Query metrics - {len(records)} queries recorded, {len(history)} with query history")
+    return history
+
+def record_dbt_results(path):
+    """
+    Record every node in a dbt run_results.json as a query, in one export.
+
+    dbt issues its own warehouse queries, so its artifact supplies the wall
+    time, rows affected and Snowflake query id of each model, seed or test.
+    """
+    with open(path) as f:
+        run_results = json.load(f)
+    command = (run_results.get('args') or {}).get('which', 'dbt')
+    records = []
+    for result in run_results.get('results', []):
+        response = result.get('adapter_response') or {}
+        records.append(record_query(
+            query=f"dbt {command} {result['unique_id']}",
+            seconds=result.get('execution_time') or 0.0,
+            rows=response.get('rows_affected'),
+            query_id=response.get('query_id'),
+            error=RuntimeError(result.get('message')) if result.get('status') in ('error', 'fail') else None,
+            source='dbt',
+            label=result['unique_id'].split('.')[-1],
+            export_now=False,
+        ))
+    export(records)
+    return records
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Export SCV query metrics")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    dbt_parser = subparsers.add_parser('dbt-results', help="Record the nodes of a dbt run_results.json")
+    dbt_parser.add_argument('path', help="Path to run_results.json")
+    dbt_parser.add_argument('--query-history', action='store_true',
+                            help="Also read scan statistics from Snowflake query history")
+    dbt_parser.add_argument('--since', type=float,
+                            help="Epoch seconds the dbt invocation started; an older file is left unrecorded")
+
+    subparsers.add_parser('render', help="Print the current OpenMetrics text")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    if args.command == 'render':
+        state = {}
+        if os.path.exists(STATE_PATH):
+            with open(STATE_PATH) as f:
+                state = json.load(f)
+        print(render_openmetrics(state), end='')
+        return
+
+    if not os.path.exists(args.path):
+        print(f"⚠️ No dbt results at {args.path} - nothing to record")
+        return
+    # dbt failing before it writes results leaves an earlier invocation's file
+    if args.since is not None and os.path.getmtime(args.path) < args.since:
+        print(f"⚠️ {args.path} predates this dbt invocation - not recording it again")
+        return
+    records = record_dbt_results(args.path)
+    print(f"📊 Recorded {len(records)} dbt nodes from {args.path}")
+    if args.query_history:
+        from snowflake_pool import get_pool
+        export_query_history(get_pool())
+
+if __name__ == "__main__":
+    main()
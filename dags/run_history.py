@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Model runtime history for the SCV pipeline
+Keeps every dbt node's execution time and rows across runs and flags statistically significant slowdowns
+"""
+
+import argparse
+from contextlib import closing
+from datetime import datetime
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+from metric_cache import CACHE_DIR
+
+HISTORY_PATH = os.environ.get('SCV_RUN_HISTORY_PATH', os.path.join(CACHE_DIR, 'run_history.sqlite'))
+
+# Node results older than this are dropped on ingest
+RETENTION_DAYS = 180
+
+# A node's baseline is its last BASELINE_RUNS executions of the same kind
+# (command, full refresh or not) before the run being checked; nodes with
+# fewer than MIN_BASELINE_RUNS earlier executions are not judged.
+BASELINE_RUNS = 20
+MIN_BASELINE_RUNS = 5
+
+# A run is a regression when it is at least MIN_SLOWDOWN slower than the
+# baseline median, by more than MIN_SLOWDOWN_SECONDS, and its robust z-score
+# (distance from the median in scaled MADs) exceeds Z_THRESHOLD. The spread
+# is floored at MIN_SPREAD of the median so perfectly stable baselines do not
+# turn every few percent of jitter into an infinite z-score.
+MIN_SLOWDOWN = 0.2
+MIN_SLOWDOWN_SECONDS = 5.0
+Z_THRESHOLD = 3.5
+MIN_SPREAD = 0.05
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed timings
+
+# Statuses of nodes that did not execute and so say nothing about runtime
+NOT_EXECUTED = ('skipped', 'error', 'runtime error')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invocations (
+    invocation_id TEXT PRIMARY KEY,
+    command TEXT,
+    run_kind TEXT,
+    git_revision TEXT,
+    dag_id TEXT,
+    task_id TEXT,
+    dag_run_id TEXT,
+    generated_at REAL,
+    elapsed_time REAL
+);
+CREATE TABLE IF NOT EXISTS node_results (
+    invocation_id TEXT,
+    unique_id TEXT,
+    resource_type TEXT,
+    run_kind TEXT,
+    git_revision TEXT,
+    status TEXT,
+    execution_time REAL,
+    rows_affected INTEGER,
+    completed_at REAL,
+    PRIMARY KEY (invocation_id, unique_id)
+);
+CREATE INDEX IF NOT EXISTS node_results_by_node ON node_results (unique_id, run_kind, completed_at);
+CREATE INDEX IF NOT EXISTS node_results_by_revision ON node_results (unique_id, git_revision);
+CREATE INDEX IF NOT EXISTS invocations_by_dag_run ON invocations (dag_run_id);
+"""
+
+def connect(path=HISTORY_PATH):
+    """Open the history database, creating its tables on first use"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(SCHEMA)
+    return db
+
+def git_revision(project_dir='.'):
+    """Return the deployed git revision: SCV_GIT_REVISION, else the checkout's HEAD, else 'unknown'"""
+    revision = os.environ.get('SCV_GIT_REVISION')
+    if revision:
+        return revision
+    try:
+        result = subprocess.run(
+            ['git', '-C', project_dir, 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    return result.stdout.strip() if result.returncode == 0 and result.stdout.strip() else 'unknown'
+
+def parse_timestamp(value):
+    """Return epoch seconds for a dbt ISO timestamp, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def run_kind(args):
+    """Return the kind of a dbt invocation; only runs of the same kind share a baseline"""
+    command = args.get('which', 'dbt')
+    return f"{command} --full-refresh" if args.get('full_refresh') else command
+
+def completed_at(result, default):
+    """Return when a node finished executing, from its execute timing"""
+    for timing in result.get('timing') or []:
+        if timing.get('name') == 'execute':
+            return parse_timestamp(timing.get('completed_at')) or default
+    return default
+
+def result_rows(result):
+    """Return a node's rows: rows affected for models and seeds, failing rows for tests"""
+    if result['unique_id'].startswith('test.'):
+        return result.get('failures')
+    return (result.get('adapter_response') or {}).get('rows_affected')
+
+def ingest_run_results(path, history_path=HISTORY_PATH, revision=None):
+    """
+    Store every node of a dbt run_results.json in the history.
+
+    Invocations are keyed by dbt's invocation_id, so ingesting the same
+    artifact twice (e.g. a stale file after dbt failed to start) is a no-op:
+    rows already stored, including the dag run that produced them, are
+    kept. Returns the number of node results newly stored.
+    """
+    with open(path) as f:
+        run_results = json.load(f)
+    metadata = run_results.get('metadata') or {}
+    args = run_results.get('args') or {}
+    invocation_id = metadata.get('invocation_id') or f"{path}:{os.path.getmtime(path)}"
+    generated_at = parse_timestamp(metadata.get('generated_at')) or os.path.getmtime(path)
+    revision = revision or git_revision()
+    kind = run_kind(args)
+
+    nodes = [
+        (
+            invocation_id,
+            result['unique_id'],
+            result['unique_id'].split('.')[0],
+            kind,
+            revision,
+            result.get('status'),
+            result.get('execution_time') or 0.0,
+            result_rows(result),
+            completed_at(result, generated_at),
+        )
+        for result in run_results.get('results', [])
+    ]
+    with closing(connect(history_path)) as db, db:
+        db.execute(
+            'INSERT OR IGNORE INTO invocations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                invocation_id, args.get('which', 'dbt'), kind, revision,
+                os.environ.get('AIRFLOW_CTX_DAG_ID'), os.environ.get('AIRFLOW_CTX_TASK_ID'),
+                os.environ.get('AIRFLOW_CTX_DAG_RUN_ID'), generated_at, run_results.get('elapsed_time'),
+            ),
+        )
+        stored = db.executemany('INSERT OR IGNORE INTO node_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', nodes).rowcount
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        db.execute('DELETE FROM node_results WHERE completed_at < ?', (cutoff,))
+        db.execute('DELETE FROM invocations WHERE generated_at < ?', (cutoff,))
+    return stored
+
+def target_invocations(db, dag_run_id=None, invocation_ids=None):
+    """Return the invocations to check: those given, those of an Airflow dag run, else the latest one"""
+    if invocation_ids:
+        return list(invocation_ids)
+    if dag_run_id:
+        rows = db.execute('SELECT invocation_id FROM invocations WHERE dag_run_id = ?', (dag_run_id,)).fetchall()
+    else:
+        rows = db.execute('SELECT invocation_id FROM invocations ORDER BY generated_at DESC LIMIT 1').fetchall()
+    return [row[0] for row in rows]
+
+def baseline(db, unique_id, kind, before):
+    """Return the (execution_time, rows, git_revision) of a node's last BASELINE_RUNS executions before a time"""
+    placeholders = ', '.join('?' for _ in NOT_EXECUTED)
+    return db.execute(
+        f"""
+        SELECT execution_time, rows_affected, git_revision FROM node_results
+        WHERE unique_id = ? AND run_kind = ? AND completed_at < ? AND status NOT IN ({placeholders})
+        ORDER BY completed_at DESC LIMIT ?
+        """,
+        (unique_id, kind, before, *NOT_EXECUTED, BASELINE_RUNS),
+    ).fetchall()
+
+def check_node(seconds, rows, revision, history):
+    """
+    Compare one execution with its baseline.
+
+    Returns None when the baseline is too short, else a dict with the
+    baseline median, slowdown, robust z-score and whether it regressed.
+    """
+    if len(history) < MIN_BASELINE_RUNS:
+        return None
+    times = [row[0] for row in history]
+    median = statistics.median(times)
+    mad = statistics.median(abs(t - median) for t in times)
+    spread = max(MAD_SCALE * mad, MIN_SPREAD * median, 1e-9)
+    z_score = (seconds - median) / spread
+    slowdown = (seconds - median) / median if median > 0 else 0.0
+    base_rows = [row[1] for row in history if row[1] is not None]
+    base_revisions = {row[2] for row in history}
+    return {
+        'seconds': seconds,
+        'baseline_seconds': median,
+        'baseline_runs': len(times),
+        'slowdown': slowdown,
+        'z_score': z_score,
+        'rows': rows,
+        'baseline_rows': statistics.median(base_rows) if base_rows else None,
+        'git_revision': revision,
+        'new_revision': revision not in base_revisions,
+        'baseline_revision': history[0][2],
+        'regressed': (
+            slowdown >= MIN_SLOWDOWN
+            and seconds - median > MIN_SLOWDOWN_SECONDS
+            and z_score > Z_THRESHOLD
+        ),
+    }
+
+def detect_regressions(history_path=HISTORY_PATH, dag_run_id=None, invocation_ids=None):
+    """
+    Check the nodes of a dag run (or the latest invocation) against their rolling baselines.
+
+    Returns {'invocations', 'checked', 'regressions'} where each regression
+    is a check_node dict with the node's unique_id and run kind.
+    """
+    placeholders_skip = ', '.join('?' for _ in NOT_EXECUTED)
+    with closing(connect(history_path)) as db:
+        invocations = target_invocations(db, dag_run_id, invocation_ids)
+        checked = 0
+        regressions = []
+        for invocation_id in invocations:
+            nodes = db.execute(
+                f"""
+                SELECT unique_id, run_kind, git_revision, execution_time, rows_affected, completed_at
+                FROM node_results WHERE invocation_id = ? AND status NOT IN ({placeholders_skip})
+                """,
+                (invocation_id, *NOT_EXECUTED),
+            ).fetchall()
+            for unique_id, kind, revision, seconds, rows, finished in nodes:
+                result = check_node(seconds, rows, revision, baseline(db, unique_id, kind, finished))
+                if result is None:
+                    continue
+                checked += 1
+                if result['regressed']:
+                    regressions.append({'unique_id': unique_id, 'run_kind': kind, **result})
+    regressions.sort(key=lambda r: r['seconds'] - r['baseline_seconds'], reverse=True)
+    return {'invocations': invocations, 'checked': checked, 'regressions': regressions}
+
+def format_report(report):
+    """Return the regression report as text lines for logs and notifications"""
+    if not report['invocations']:
+        return ["Runtime history: no dbt runs recorded"]
+    lines = [
+        f"Runtime history: {len(report['regressions'])} regression(s) in {report['checked']} node(s) "
+        f"with a baseline across {len(report['invocations'])} dbt run(s)"
+    ]
+    for r in report['regressions']:
+        line = (
+            f"  {r['unique_id']} ({r['run_kind']}): {r['seconds']:.1f}s vs median {r['baseline_seconds']:.1f}s "
+            f"over {r['baseline_runs']} runs, {r['slowdown']:+.0%}, z={r['z_score']:.1f}"
+        )
+        if r['rows'] is not None and r['baseline_rows']:
+            line += f", rows {r['rows']:,} vs {r['baseline_rows']:,.0f}"
+        if r['new_revision']:
+            line += f", first runs at {r['git_revision']} (baseline at {r['baseline_revision']})"
+        lines.append(line)
+    return lines
+
+def revision_summary(unique_id, history_path=HISTORY_PATH):
+    """Return per-revision execution statistics for a node, most recent revision first"""
+    with closing(connect(history_path)) as db:
+        rows = db.execute(
+            """
+            SELECT git_revision, run_kind, execution_time, rows_affected, completed_at FROM node_results
+            WHERE unique_id = ? OR unique_id LIKE ? ORDER BY completed_at
+            """,
+            (unique_id, f"%.{unique_id}"),
+        ).fetchall()
+    summary = {}
+    for revision, kind, seconds, rows, finished in rows:
+        entry = summary.setdefault((revision, kind), {'times': [], 'rows': [], 'last_run': finished})
+        entry['times'].append(seconds)
+        if rows is not None:
+            entry['rows'].append(rows)
+        entry['last_run'] = finished
+    return [
+        {
+            'git_revision': revision,
+            'run_kind': kind,
+            'runs': len(entry['times']),
+            'median_seconds': statistics.median(entry['times']),
+            'max_seconds': max(entry['times']),
+            'median_rows': statistics.median(entry['rows']) if entry['rows'] else None,
+            'last_run': datetime.fromtimestamp(entry['last_run']).isoformat(timespec='seconds'),
+        }
+        for (revision, kind), entry in sorted(summary.items(), key=lambda item: item[1]['last_run'], reverse=True)
+    ]
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="SCV model runtime history and regression detection")
+    parser.add_argument('--history', default=HISTORY_PATH, help="History database path")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Store the nodes of a dbt run_results.json")
+    ingest_parser.add_argument('path', help="Path to run_results.json")
+    ingest_parser.add_argument('--revision', help="Git revision of the run (default: detected)")
+
+    report_parser = subparsers.add_parser('report', help="Check a dag run or the latest dbt run for slowdowns")
+    report_parser.add_argument('--dag-run-id', default=os.environ.get('AIRFLOW_CTX_DAG_RUN_ID'),
+                               help="Airflow dag run to check (default: the latest dbt run)")
+    report_parser.add_argument('--invocation', nargs='+', help="dbt invocation ids to check")
+    report_parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    report_parser.add_argument('--fail-on-regression', action='store_true',
+                               help="Exit with status 1 when a regression is found")
+
+    history_parser = subparsers.add_parser('history', help="Show a node's runtimes per git revision")
+    history_parser.add_argument('node', help="Model name or unique_id")
+    history_parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    if args.command == 'ingest':
+        if not os.path.exists(args.path):
+            print(f"⚠️ No dbt results at {args.path} - nothing to store")
+            return 0
+        count = ingest_run_results(args.path, args.history, args.revision)
+        print(f"🗄️ Stored {count} node results from {args.path} in {args.history}")
+        return 0
+
+    if args.command == 'report':
+        report = detect_regressions(args.history, args.dag_run_id, args.invocation)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print('\n'.join(format_report(report)))
+        return 1 if args.fail_on_regression and report['regressions'] else 0
+
+    summary = revision_summary(args.node, args.history)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    elif not summary:
+        print(f"⚠️ No runs recorded for {args.node}")
+    else:
+        print(f"⏱️ {args.node} by git revision (most recent first)")
+        for entry in summary:
+            rows = f"{entry['median_rows']:,.0f}" if entry['median_rows'] is not None else '-'
+            print(f"  {entry['git_revision']:<12} {entry['run_kind']:<20} {entry['runs']:>4} runs  "
+                  f"median {entry['median_seconds']:8.1f}s  max {entry['max_seconds']:8.1f}s  "
+                  f"rows {rows:>12}  last {entry['last_run']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
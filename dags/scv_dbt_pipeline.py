@@ -9,15 +9,94 @@ from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
 from airflow.operators.dummy import DummyOperator
 from airflow.providers.snowflake.operators.snowflake import SnowflakeOperator
-from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+from airflow.utils.task_group import TaskGroup
 from airflow.utils.trigger_rule import TriggerRule
 import logging
 import os
 import sys
 
+from deferrable_checks import DeferrableChecksOperator
+from metric_cache import MetricCache
+from profiling import check_minimum, evaluate_minimum, format_estimate, profile_table
+from query_metrics import export_query_history
+from snowflake_pool import get_pool
+from source_checks import CHECK_EXECUTION, CHECK_MODE, MODEL_CHECKS, SOURCE_CHECKS, run_freshness_checks, run_source_checks
+from watermarks import WatermarkStore
+
 # Add dbt path to Python path
 sys.path.append('/opt/airflow/dbt')
 
+DBT_PROJECT_DIR = '/opt/airflow/dbt/scv'
+
+# Manifest of the last successful deployment, used to rebuild only changed models
+DBT_STATE_DIR = '/opt/airflow/dbt/state'
+
+# 'project' runs dbt run / dbt test once for the whole project; 'per_model'
+# expands the manifest into one run task (plus its tests) per model
+DBT_TASK_MODE = os.environ.get('SCV_DBT_TASK_MODE', 'project')
+
+# Templated dbt run flag for the full_refresh DAG param
+FULL_REFRESH_FLAG = '{{ " --full-refresh" if params.full_refresh else "" }}'
+
+# Airflow pool capping concurrent per-model tasks against the warehouse;
+# create it with as many slots as the dbt profile has threads
+DBT_POOL = os.environ.get('SCV_DBT_POOL', 'dbt_snowflake')
+
+# Fused data quality test that first runs on a dq_sample_pct sample, failing
+# fast before its full scan
+DQ_TEST = 'test_data_quality'
+DQ_SAMPLE_VARS = "--vars '{dq_sample_pct: {{ params.dq_sample_pct }}}'"
+
+sys.path.append(DBT_PROJECT_DIR)
+
+# Model checks behind validate_pipeline_output's scan mode
+OUTPUT_CHECKS = ['gold_customer_kpis', 'silver_customer_weather']
+
+# Fewest changed silver customers the metadata-mode weather coverage check
+# is computed over; smaller deltas make the 70% threshold noisy, so silver
+# is profiled instead
+MIN_COVERAGE_CUSTOMERS = 1000
+
+DBT_PROFILES_DIR = '/opt/airflow/.dbt'
+
+# Bash functions around the artifact cache on the shared volume: dbt_cache
+# calls dbt_artifact_cache.py for the project, and dbt_cached restores the
+# cached partial parse file before running dbt so each process reparses
+# only what changed, then reports the invocation's startup overhead. With
+# packages and parse artifacts cached, no dbt task needs network access.
+# Both work in $DBT_TARGET_PATH (target/ by default), which per-model tasks
+# point at a directory of their own.
+DBT_CACHE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dbt_artifact_cache.py')
+DBT_CACHED = f"""
+export DBT_SEND_ANONYMOUS_USAGE_STATS=False
+dbt_cache() {{
+    local command=$1
+    shift
+    python {DBT_CACHE_SCRIPT} $command --project-dir {DBT_PROJECT_DIR} --profiles-dir {DBT_PROFILES_DIR} "$@"
+}}
+dbt_cached() {{
+    local started=$(date +%s.%N) cache_status status
+    dbt_cache restore-parse && cache_status=hit || cache_status=miss
+    dbt "$@" && status=0 || status=$?
+    dbt_cache report-startup --command "$1" --started $started --cache-status $cache_status || true
+    return $status
+}}"""
+
+# Bash function that runs dbt, then records the run_results.json in its target
+# path (wall time, rows and query id per node) as query metrics and in the
+# runtime history while keeping dbt's exit status. A file older than the
+# invocation (dbt failed before writing one) is not counted again.
+QUERY_METRICS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_metrics.py')
+RUN_HISTORY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_history.py')
+DBT_RECORDED = f"""{DBT_CACHED}
+dbt_recorded() {{
+    local started=$(date +%s.%N) run_results="${{DBT_TARGET_PATH:-target}}/run_results.json"
+    dbt_cached "$@" && status=0 || status=$?
+    python {QUERY_METRICS_SCRIPT} dbt-results "$run_results" --since $started --query-history || true
+    python {RUN_HISTORY_SCRIPT} ingest "$run_results" || true
+    return $status
+}}"""
+
 # Default arguments for the DAG
 default_args = {
     'owner': 'data-engineering',
@@ -40,6 +119,15 @@ dag = DAG(
     max_active_runs=1,
     tags=['dbt', 'scv', 'customer', 'weather', 'data-pipeline'],
     doc_md=__doc__,
+    params={
+        # Set to true when triggering to rebuild every model regardless of changes
+        'full_run': False,
+        # Set to true to rebuild incremental models from scratch (dbt --full-refresh)
+        'full_refresh': False,
+        # Percent of rows the fused data quality test checks first, failing fast
+        # before the full scan; 0 skips the sample pass
+        'dq_sample_pct': 1,
+    },
 )
 
 # Task IDs for easy reference
@@ -48,10 +136,13 @@ TASK_IDS = {
     'validate_sources': 'validate_data_sources',
     'dbt_deps': 'install_dbt_dependencies',
     'dbt_seed': 'load_seed_data',
+    'select_models': 'select_changed_models',
     'dbt_run': 'run_dbt_models',
     'dbt_test': 'run_dbt_tests',
+    'dbt_models': 'dbt_models',
     'dbt_docs': 'generate_dbt_docs',
     'validate_output': 'validate_pipeline_output',
+    'save_state': 'save_deployed_state',
     'notify_success': 'notify_success',
     'notify_failure': 'notify_failure',
     'end': 'end_pipeline',
@@ -68,54 +159,76 @@ def validate_data_sources():
     logger.info("Starting data source validation...")
     
     # Snowflake connection
-    snowflake_hook = SnowflakeHook(snowflake_conn_id='snowflake_default')
+    snowflake_pool = get_pool('snowflake_default')
+    metric_cache = MetricCache()
     
-    # Check D365 customers data
-    d365_check_query = """
-    SELECT 
-        COUNT(*) as record_count,
-        MAX(updated_at) as latest_update,
-        CURRENT_TIMESTAMP() as check_time
-    FROM your-database.raw.D365_CUSTOMERS
-    WHERE updated_at >= DATEADD(day, -1, CURRENT_DATE())
-    """
+    if CHECK_MODE == 'metadata':
+        # D365 is recent when its updated_at watermark reaches yesterday, which
+        # the delta above the stored watermark answers without a full scan
+        store = WatermarkStore('scv_dbt_pipeline')
+        freshness = run_freshness_checks(snowflake_pool, store, names=['D365_CUSTOMERS', 'EXCEL_DATA', 'WEATHER_DATA'])
+        legacy_profile = profile_table(snowflake_pool, 'EXCEL_DATA', cache=metric_cache)
+        d365_row = freshness['D365_CUSTOMERS']['row']
+        weather_row = freshness['WEATHER_DATA']['row']
+        
+        logger.info(f"D365 Customers ({d365_row['mode']}) - Records: {d365_row['record_count']}, New: {d365_row['new_rows']}, Latest Update: {d365_row['watermark']}")
+        logger.info(f"Legacy Data ({legacy_profile['fidelity']}) - Total: {format_estimate(legacy_profile['metrics']['record_count'])}, With Postal: {format_estimate(legacy_profile['metrics']['postal_completeness'], percent=True)}, With Region: {format_estimate(legacy_profile['metrics']['region_completeness'], percent=True)}")
+        if weather_row is not None:
+            logger.info(f"Weather Data ({weather_row['mode']}) - Records: {weather_row['record_count']}, Latest Date: {weather_row['watermark']}")
+        
+        recent_since = datetime.combine(datetime.now().date() - timedelta(days=1), datetime.min.time())
+        latest_update = d365_row['watermark']
+        if latest_update is not None:
+            latest_update = datetime.fromisoformat(str(latest_update))
+            if latest_update.tzinfo is not None:
+                # Compare in the worker's local time, like recent_since
+                latest_update = latest_update.astimezone().replace(tzinfo=None)
+        if latest_update is None or latest_update < recent_since:
+            raise ValueError("No recent D365 customer data found")
+        
+        # 90% should have postal codes; an estimate whose error straddles the
+        # threshold is rechecked exactly before warning
+        completeness, status = check_minimum(
+            snowflake_pool, 'EXCEL_DATA', 'postal_completeness', 0.9, profile=legacy_profile, cache=metric_cache
+        )
+        if status == 'fail':
+            logger.warning(f"Many legacy records missing postal codes: {format_estimate(completeness, percent=True)} complete")
+        
+        logger.info("Data source validation completed successfully")
+        metric_cache.log_stats(logger)
+        snowflake_pool.log_stats(logger)
+        export_query_history(snowflake_pool, logger)
+        return True
     
-    d365_result = snowflake_hook.get_first(d365_check_query)
-    logger.info(f"D365 Customers - Count: {d365_result[0]}, Latest Update: {d365_result[1]}")
+    # D365, legacy and weather checks run concurrently, one scan per table,
+    # reusing rows the monitoring DAG computed while the tables are unchanged
+    results = run_source_checks(snowflake_pool, cache=metric_cache)
+    check_source_results(results)
     
-    # Check legacy Excel data
-    legacy_check_query = """
-    SELECT 
-        COUNT(*) as record_count,
-        COUNT(CASE WHEN postal_code IS NOT NULL THEN 1 END) as records_with_postal,
-        COUNT(CASE WHEN region IS NOT NULL THEN 1 END) as records_with_region
-    FROM your-database.raw.EXCEL_DATA
+    metric_cache.log_stats(logger)
+    snowflake_pool.log_stats(logger)
+    export_query_history(snowflake_pool, logger)
+    return True
+
+def check_source_results(results):
     """
-    
-    legacy_result = snowflake_hook.get_first(legacy_check_query)
-    logger.info(f"Legacy Data - Total: {legacy_result[0]}, With Postal: {legacy_result[1]}, With Region: {legacy_result[2]}")
-    
-    # Check weather data
-    weather_check_query = """
-    SELECT 
-        COUNT(*) as record_count,
-        MAX(date_valid_std) as latest_weather_date,
-        COUNT(DISTINCT postal_code) as unique_locations
-    FROM WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"
-    WHERE date_valid_std >= CURRENT_DATE()
+    Apply the data source validation criteria to the source check results
     """
+    logger = logging.getLogger(__name__)
+    d365_result = results['D365_CUSTOMERS']['row']
+    legacy_result = results['EXCEL_DATA']['row']
+    weather_result = results['WEATHER_DATA']['row']
     
-    try:
-        weather_result = snowflake_hook.get_first(weather_check_query)
-        logger.info(f"Weather Data - Count: {weather_result[0]}, Latest Date: {weather_result[1]}, Locations: {weather_result[2]}")
-    except Exception as e:
-        logger.warning(f"Weather data check failed: {e}")
+    logger.info(f"D365 Customers - Count: {d365_result['recent_record_count']}, Latest Update: {d365_result['latest_update']}")
+    logger.info(f"Legacy Data - Total: {legacy_result['record_count']}, With Postal: {legacy_result['records_with_postal']}, With Region: {legacy_result['records_with_region']}")
+    if weather_result is not None:
+        logger.info(f"Weather Data - Count: {weather_result['record_count']}, Latest Date: {weather_result['latest_weather_date']}, Locations: {weather_result['unique_locations']}")
     
     # Validation criteria
-    if d365_result[0] == 0:
+    if d365_result['recent_record_count'] == 0:
         raise ValueError("No recent D365 customer data found")
     
-    if legacy_result[1] < legacy_result[0] * 0.9:  # 90% should have postal codes
+    if legacy_result['records_with_postal'] < legacy_result['record_count'] * 0.9:  # 90% should have postal codes
         logger.warning("Many legacy records missing postal codes")
     
     logger.info("Data source validation completed successfully")
@@ -130,44 +243,94 @@ def validate_pipeline_output():
     logger = logging.getLogger(__name__)
     logger.info("Starting pipeline output validation...")
     
-    snowflake_hook = SnowflakeHook(snowflake_conn_id='snowflake_default')
+    snowflake_pool = get_pool('snowflake_default')
+    metric_cache = MetricCache()
     
-    # Check gold layer completeness
-    gold_check_query = """
-    SELECT 
-        COUNT(*) as total_regions,
-        SUM(total_customers) as total_customers,
-        AVG(avg_temp_f) as avg_temperature,
-        AVG(avg_rain_chance_pct) as avg_rain_chance
-    FROM raw_GOLD_DEV.gold_customer_kpis
-    """
+    if CHECK_MODE != 'metadata':
+        # Gold and silver checks run concurrently; rows are reused from the metric
+        # cache only while the tables are unchanged since the rebuild
+        results = run_source_checks(snowflake_pool, names=OUTPUT_CHECKS, checks=MODEL_CHECKS, cache=metric_cache)
+        check_output_results(results)
+        metric_cache.log_stats(logger)
+        snowflake_pool.log_stats(logger)
+        export_query_history(snowflake_pool, logger)
+        return True
     
-    gold_result = snowflake_hook.get_first(gold_check_query)
-    logger.info(f"Gold Layer - Regions: {gold_result[0]}, Customers: {gold_result[1]}, Avg Temp: {gold_result[2]}, Avg Rain: {gold_result[3]}")
+    # Weather coverage is measured exactly over the silver rows merged by this
+    # run; without a delta (first run, missing metadata) or with fewer than
+    # MIN_COVERAGE_CUSTOMERS changed customers, silver is profiled at the
+    # configured fidelity instead of scanned exactly. Gold is a few rows per
+    # region and always scanned.
+    store = WatermarkStore('scv_dbt_pipeline')
+    silver_delta = run_freshness_checks(snowflake_pool, store, names=['silver_customer_weather'])['silver_customer_weather']['row']
+    gold_result = run_source_checks(
+        snowflake_pool, names=['gold_customer_kpis'], checks=MODEL_CHECKS, cache=metric_cache
+    )['gold_customer_kpis']['row']
     
-    # Check silver layer completeness
-    silver_check_query = """
-    SELECT 
-        COUNT(*) as total_records,
-        COUNT(DISTINCT customer_id) as unique_customers,
-        COUNT(CASE WHEN avg_temperature_air_2m_f IS NOT NULL THEN 1 END) as records_with_weather
-    FROM raw_SILVER_DEV.silver_customer_weather
-    """
+    if silver_delta['mode'] == 'delta' and (silver_delta['changed_customers'] or 0) >= MIN_COVERAGE_CUSTOMERS:
+        logger.info(f"Silver Layer (delta) - Records: {silver_delta['record_count']}, Changed: {silver_delta['new_rows']}, Changed Customers: {silver_delta['changed_customers']}, With Weather: {silver_delta['changed_with_weather']}")
+        coverage = {'value': silver_delta['changed_with_weather'] / silver_delta['changed_customers'], 'error': 0.0}
+        coverage_status = evaluate_minimum(coverage, 0.7)
+    else:
+        silver_profile = profile_table(snowflake_pool, 'silver_customer_weather', cache=metric_cache)
+        metrics = silver_profile['metrics']
+        logger.info(f"Silver Layer ({silver_profile['fidelity']}) - Records: {format_estimate(metrics['total_records'])}, Customers: {format_estimate(metrics['unique_customers'])}, With Weather: {format_estimate(metrics['records_with_weather'])}")
+        # An estimate whose error straddles the threshold is rechecked exactly
+        coverage, coverage_status = check_minimum(
+            snowflake_pool, 'silver_customer_weather', 'weather_coverage', 0.7, profile=silver_profile, cache=metric_cache
+        )
     
-    silver_result = snowflake_hook.get_first(silver_check_query)
-    logger.info(f"Silver Layer - Records: {silver_result[0]}, Customers: {silver_result[1]}, With Weather: {silver_result[2]}")
+    check_output_quality(gold_result, coverage, coverage_status)
+    metric_cache.log_stats(logger)
+    snowflake_pool.log_stats(logger)
+    export_query_history(snowflake_pool, logger)
+    return True
+
+def check_output_results(results):
+    """
+    Apply the output quality criteria to the gold and silver check results
+    """
+    logger = logging.getLogger(__name__)
+    silver_result = results['silver_customer_weather']['row']
+    logger.info(f"Silver Layer - Records: {silver_result['total_records']}, Customers: {silver_result['unique_customers']}, With Weather: {silver_result['records_with_weather']}")
+    coverage = {'value': silver_result['records_with_weather'] / silver_result['unique_customers'] if silver_result['unique_customers'] > 0 else 0, 'error': 0.0}
+    return check_output_quality(results['gold_customer_kpis']['row'], coverage, evaluate_minimum(coverage, 0.7))
+
+def check_output_quality(gold_result, coverage, coverage_status):
+    """
+    Log the gold layer and fail on an empty gold layer or warn on low weather coverage
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Gold Layer - Regions: {gold_result['total_regions']}, Customers: {gold_result['total_customers']}, Avg Temp: {gold_result['avg_temperature']}, Avg Rain: {gold_result['avg_rain_chance']}")
     
     # Quality checks
-    if gold_result[1] == 0:
+    if gold_result['total_customers'] == 0:
         raise ValueError("No customers found in gold layer")
     
-    weather_coverage = silver_result[2] / silver_result[1] if silver_result[1] > 0 else 0
-    if weather_coverage < 0.7:  # At least 70% should have weather data
-        logger.warning(f"Low weather data coverage: {weather_coverage:.2%}")
+    if coverage_status == 'fail':  # At least 70% should have weather data
+        logger.warning(f"Low weather data coverage: {format_estimate(coverage, percent=True)}")
     
     logger.info("Pipeline output validation completed successfully")
     return True
 
+def log_runtime_regressions(logger):
+    """
+    Log this dag run's dbt nodes that ran significantly slower than their history.
+
+    Returns the regression report so notifications can include it.
+    """
+    from run_history import detect_regressions, format_report
+
+    try:
+        report = detect_regressions(dag_run_id=os.environ.get('AIRFLOW_CTX_DAG_RUN_ID'))
+    except Exception as e:
+        logger.warning(f"Could not check runtime history: {e}")
+        return None
+    log = logger.warning if report['regressions'] else logger.info
+    for line in format_report(report):
+        log(line)
+    return report
+
 def notify_success(context):
     """
     Send success notification
@@ -175,6 +338,7 @@ def notify_success(context):
     import logging
     logger = logging.getLogger(__name__)
     logger.info("SCV Pipeline completed successfully!")
+    log_runtime_regressions(logger)
     # Add your notification logic here (Slack, email, etc.)
     return True
 
@@ -185,56 +349,280 @@ def notify_failure(context):
     import logging
     logger = logging.getLogger(__name__)
     logger.error("SCV Pipeline failed!")
+    log_runtime_regressions(logger)
     # Add your notification logic here (Slack, email, etc.)
     return True
 
+def load_model_graph():
+    """
+    Load the lineage graph for per-model task generation.
+
+    Goes through lineage_analysis.load_graph, which serves the compact
+    lineage cache only while its fingerprint matches the current manifest
+    and rebuilds it otherwise, so the task graph never comes from a stale
+    cache. Returns None when there is no manifest.
+    """
+    from lineage_analysis import load_graph
+
+    manifest_path = os.path.join(DBT_PROJECT_DIR, 'target', 'manifest.json')
+    if os.path.exists(manifest_path):
+        return load_graph(manifest_path)
+    logging.getLogger(__name__).warning("No dbt manifest found - using project-level dbt tasks")
+    return None
+
+# Preamble of per-model dbt tasks. Tasks in DBT_POOL run in parallel in one
+# project, so each gets its own target path: their run_results.json,
+# manifest.json and partial_parse.msgpack never overwrite each other
+DBT_TASK_TARGET = f"""{DBT_RECORDED}
+cd {DBT_PROJECT_DIR}
+export DBT_TARGET_PATH="target/{{{{ ti.task_id }}}}\""""
+
+def dbt_model_command(verb, model_name, selectors, extra_args=''):
+    """
+    Build the bash command for one per-model dbt invocation.
+
+    The command honours the changed-model selection pushed by
+    select_changed_models, so unchanged models finish immediately.
+    """
+    return f"""{DBT_TASK_TARGET}
+SELECTION="{{{{ ti.xcom_pull(task_ids='{TASK_IDS['select_models']}') }}}}"
+if [ "$SELECTION" = "all" ] || [[ " $SELECTION " == *" {model_name} "* ]]; then
+    dbt_recorded {verb} --profiles-dir {DBT_PROFILES_DIR} --target-path "$DBT_TARGET_PATH" --select {' '.join(selectors)}{FULL_REFRESH_FLAG if verb == 'run' else ''}{extra_args}
+else
+    echo "{model_name} unchanged since the last deployment - skipping dbt {verb}"
+fi
+"""
+
+def build_model_tasks(graph):
+    """
+    Expand the dbt graph into one run task and one test task per model.
+
+    Each test is attached to the last of its parent models in build order,
+    so a model's test task runs right after it and waits for every model
+    the tests touch. Downstream models wait for their parents' tests, as
+    in dbt build, and every task runs in DBT_POOL. As in project mode, the
+    fused data quality test first runs on a dq_sample_pct sample: a
+    sample_ task runs once its models are built and the test task holding
+    the full scan waits for it. Tests without a parent model (the source
+    tests) run in one test_sources task ahead of the models reading those
+    sources; like dbt test in project mode, it ignores the selection.
+    """
+    models = graph.models()
+    order = {uid: i for i, uid in enumerate(graph.topological_order(models))}
+
+    tests_by_model = {uid: [] for uid in models}
+    source_tests = []
+    for test in graph.of_type('test'):
+        parents = [dep for dep in graph.model_parents(test) if dep in order]
+        if parents:
+            tests_by_model[max(parents, key=order.get)].append(test)
+        else:
+            source_tests.append(test)
+
+    with TaskGroup(group_id=TASK_IDS['dbt_models'], dag=dag) as group:
+        run_tasks, done_tasks = {}, {}
+        source_test_task = None
+        if source_tests:
+            source_test_task = BashOperator(
+                task_id='test_sources',
+                bash_command=f"""{DBT_TASK_TARGET}
+dbt_recorded test --profiles-dir {DBT_PROFILES_DIR} --target-path "$DBT_TARGET_PATH" --select {' '.join(sorted(graph.nodes[test]['name'] for test in source_tests))}
+""",
+                pool=DBT_POOL,
+                dag=dag,
+            )
+        tested_sources = {dep for test in source_tests for dep in graph.parents.get(test, [])}
+        for uid in sorted(models, key=order.get):
+            name = graph.nodes[uid]['name']
+            run_tasks[uid] = BashOperator(
+                task_id=f'run_{name}',
+                bash_command=dbt_model_command('run', name, [name]),
+                pool=DBT_POOL,
+                dag=dag,
+            )
+            done_tasks[uid] = run_tasks[uid]
+
+            tests = tests_by_model[uid]
+            if tests:
+                done_tasks[uid] = BashOperator(
+                    task_id=f'test_{name}',
+                    bash_command=dbt_model_command(
+                        'test', name, sorted(graph.nodes[test]['name'] for test in tests),
+                    ),
+                    pool=DBT_POOL,
+                    dag=dag,
+                )
+                run_tasks[uid] >> done_tasks[uid]
+                for test in tests:
+                    for parent in graph.model_parents(test):
+                        if parent != uid and parent in run_tasks:
+                            run_tasks[parent] >> done_tasks[uid]
+
+                if any(graph.nodes[test]['name'] == DQ_TEST for test in tests):
+                    sample_command = dbt_model_command('test', name, [DQ_TEST], f" {DQ_SAMPLE_VARS}")
+                    sample_task = BashOperator(
+                        task_id=f'sample_{DQ_TEST}',
+                        bash_command=(
+                            f"{{% if params.dq_sample_pct %}}{sample_command}"
+                            f"{{% else %}}echo 'dq_sample_pct is 0 - skipping the sample pass'{{% endif %}}"
+                        ),
+                        pool=DBT_POOL,
+                        dag=dag,
+                    )
+                    run_tasks[uid] >> sample_task >> done_tasks[uid]
+                    for test in tests:
+                        if graph.nodes[test]['name'] == DQ_TEST:
+                            for parent in graph.model_parents(test):
+                                if parent in run_tasks:
+                                    run_tasks[parent] >> sample_task
+
+        for uid in models:
+            for parent in graph.model_parents(uid):
+                if parent in done_tasks:
+                    done_tasks[parent] >> run_tasks[uid]
+            if source_test_task is not None and tested_sources.intersection(graph.parents.get(uid, [])):
+                source_test_task >> run_tasks[uid]
+    return group
+
 # Task definitions
 start_task = DummyOperator(
     task_id=TASK_IDS['start'],
     dag=dag,
 )
 
-validate_sources_task = PythonOperator(
-    task_id=TASK_IDS['validate_sources'],
-    python_callable=validate_data_sources,
-    dag=dag,
-)
+if CHECK_EXECUTION == 'deferrable':
+    # The full source scans wait in the triggerer instead of a worker slot;
+    # their rows go through the same validation as the sync task
+    validate_sources_task = DeferrableChecksOperator(
+        task_id=TASK_IDS['validate_sources'],
+        names=list(SOURCE_CHECKS),
+        checks=SOURCE_CHECKS,
+        result_callable=check_source_results,
+        dag=dag,
+    )
+else:
+    validate_sources_task = PythonOperator(
+        task_id=TASK_IDS['validate_sources'],
+        python_callable=validate_data_sources,
+        dag=dag,
+    )
 
+# dbt deps only runs when package-lock.yml changed since the cached packages
 dbt_deps_task = BashOperator(
     task_id=TASK_IDS['dbt_deps'],
-    bash_command='cd /opt/airflow/dbt/scv && dbt deps',
+    bash_command=f"""
+set -e{DBT_CACHED}
+cd {DBT_PROJECT_DIR}
+started=$(date +%s.%N)
+if dbt_cache restore-packages; then
+    cache_status=hit
+else
+    cache_status=miss
+    dbt deps
+    dbt_cache save-packages || true
+fi
+dbt_cache report-startup --command deps --started $started --cache-status $cache_status || true
+""",
     dag=dag,
 )
 
 dbt_seed_task = BashOperator(
     task_id=TASK_IDS['dbt_seed'],
-    bash_command='cd /opt/airflow/dbt/scv && dbt seed',
+    bash_command=f'{DBT_RECORDED}\ncd /opt/airflow/dbt/scv && dbt_recorded seed',
     dag=dag,
 )
 
-dbt_run_task = BashOperator(
-    task_id=TASK_IDS['dbt_run'],
-    bash_command='cd /opt/airflow/dbt/scv && dbt run --profiles-dir /opt/airflow/.dbt',
+# Parse the project, unless its parse artifacts are cached, and diff it
+# against the deployed manifest; the last line of output (pushed to XCom) is
+# 'all', 'none' or a --select list. A full refresh rebuilds every model, so
+# it ignores the selection.
+select_models_task = BashOperator(
+    task_id=TASK_IDS['select_models'],
+    bash_command=f"""
+set -e{DBT_CACHED}
+cd {DBT_PROJECT_DIR}
+started=$(date +%s.%N)
+if dbt_cache restore-parse; then
+    cache_status=hit
+else
+    cache_status=miss
+    dbt parse --profiles-dir {DBT_PROFILES_DIR}
+    dbt_cache save-parse || true
+fi
+dbt_cache report-startup --command parse --started $started --cache-status $cache_status || true
+python lineage_analysis.py select-changed --state {DBT_STATE_DIR}/manifest.json \\
+    --refresh incremental {{{{ "--full" if params.full_run or params.full_refresh else "" }}}}
+""",
+    do_xcom_push=True,
     dag=dag,
 )
 
-dbt_test_task = BashOperator(
-    task_id=TASK_IDS['dbt_test'],
-    bash_command='cd /opt/airflow/dbt/scv && dbt test --profiles-dir /opt/airflow/.dbt',
-    trigger_rule=TriggerRule.ALL_SUCCESS,
-    dag=dag,
-)
+model_graph = load_model_graph() if DBT_TASK_MODE == 'per_model' else None
+
+if model_graph is not None:
+    dbt_models_group = build_model_tasks(model_graph)
+    dbt_build_tasks = [dbt_models_group]
+else:
+    dbt_run_task = BashOperator(
+        task_id=TASK_IDS['dbt_run'],
+        bash_command=f"""{DBT_RECORDED}
+cd {DBT_PROJECT_DIR}
+SELECTION="{{{{ ti.xcom_pull(task_ids='{TASK_IDS['select_models']}') }}}}"
+if [ "$SELECTION" = "none" ]; then
+    echo "No models changed since the last deployment - skipping dbt run"
+elif [ "$SELECTION" = "all" ]; then
+    dbt_recorded run --profiles-dir {DBT_PROFILES_DIR}{FULL_REFRESH_FLAG}
+else
+    dbt_recorded run --profiles-dir {DBT_PROFILES_DIR} $SELECTION{FULL_REFRESH_FLAG}
+fi
+""",
+        dag=dag,
+    )
+
+    dbt_test_task = BashOperator(
+        task_id=TASK_IDS['dbt_test'],
+        bash_command=f"""
+set -e{DBT_RECORDED}
+cd {DBT_PROJECT_DIR}
+{{% if params.dq_sample_pct %}}
+# Fail fast: error-severity checks failing on the sample stop the task here
+dbt_recorded test --profiles-dir {DBT_PROFILES_DIR} --select {DQ_TEST} {DQ_SAMPLE_VARS}
+{{% endif %}}
+dbt_recorded test --profiles-dir {DBT_PROFILES_DIR}
+""",
+        trigger_rule=TriggerRule.ALL_SUCCESS,
+        dag=dag,
+    )
+    dbt_run_task >> dbt_test_task
+    dbt_build_tasks = [dbt_run_task, dbt_test_task]
 
 dbt_docs_task = BashOperator(
     task_id=TASK_IDS['dbt_docs'],
-    bash_command='cd /opt/airflow/dbt/scv && dbt docs generate --profiles-dir /opt/airflow/.dbt',
+    bash_command=f'{DBT_CACHED}\ncd {DBT_PROJECT_DIR} && dbt_cached docs generate --profiles-dir {DBT_PROFILES_DIR}',
     trigger_rule=TriggerRule.ALL_SUCCESS,
     dag=dag,
 )
 
-validate_output_task = PythonOperator(
-    task_id=TASK_IDS['validate_output'],
-    python_callable=validate_pipeline_output,
+if CHECK_EXECUTION == 'deferrable':
+    validate_output_task = DeferrableChecksOperator(
+        task_id=TASK_IDS['validate_output'],
+        names=OUTPUT_CHECKS,
+        checks=MODEL_CHECKS,
+        result_callable=check_output_results,
+        trigger_rule=TriggerRule.ALL_SUCCESS,
+        dag=dag,
+    )
+else:
+    validate_output_task = PythonOperator(
+        task_id=TASK_IDS['validate_output'],
+        python_callable=validate_pipeline_output,
+        trigger_rule=TriggerRule.ALL_SUCCESS,
+        dag=dag,
+    )
+
+save_state_task = BashOperator(
+    task_id=TASK_IDS['save_state'],
+    bash_command=f'mkdir -p {DBT_STATE_DIR} && cp {DBT_PROJECT_DIR}/target/manifest.json {DBT_STATE_DIR}/manifest.json',
     trigger_rule=TriggerRule.ALL_SUCCESS,
     dag=dag,
 )
@@ -260,11 +648,11 @@ end_task = DummyOperator(
 )
 
 # Task dependencies
-start_task >> validate_sources_task >> dbt_deps_task >> dbt_seed_task >> dbt_run_task >> dbt_test_task
+start_task >> validate_sources_task >> dbt_deps_task >> dbt_seed_task >> select_models_task >> dbt_build_tasks[0]
 
-dbt_test_task >> [dbt_docs_task, validate_output_task]
+dbt_build_tasks[-1] >> [dbt_docs_task, validate_output_task]
 dbt_docs_task >> validate_output_task
-validate_output_task >> notify_success_task >> end_task
+validate_output_task >> save_state_task >> notify_success_task >> end_task
 
 # Failure path
-[dbt_run_task, dbt_test_task, validate_output_task] >> notify_failure_task >> end_task 
\ No newline at end of file
+[select_models_task, *dbt_build_tasks, validate_output_task] >> notify_failure_task >> end_task
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Shared Snowflake connection pool for the SCV DAGs
+Reuses authenticated sessions across task callables within a worker process
+"""
+
+from contextlib import contextmanager
+import logging
+import os
+import threading
+import time
+
+from query_metrics import record_pool_query
+
+DEFAULT_CONN_ID = 'snowflake_default'
+
+# Pool sizing and housekeeping defaults
+MAX_POOL_SIZE = 4
+MAX_IDLE_SECONDS = 300
+HEALTH_CHECK_INTERVAL = 60
+HEALTH_CHECK_QUERY = 'SELECT 1'
+
+# DB-API exception classes that mean the session itself is unusable
+CONNECTION_ERRORS = ('OperationalError', 'InterfaceError')
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    ``connect`` is any zero-argument callable returning a DB-API connection,
+    so the pool can be exercised locally with sqlite3 or another stand-in
+    driver. Idle connections older than ``max_idle_seconds`` are closed,
+    connections idle longer than ``health_check_interval`` are pinged
+    before reuse, and at most ``max_size`` connections are open at once.
+    Handshake and query time are tracked separately in ``stats()``, and
+    ``on_query(query, seconds, rows, query_id, error)`` is called after
+    every query run through ``execute``.
+    """
+
+    def __init__(self, connect, max_size=MAX_POOL_SIZE, max_idle_seconds=MAX_IDLE_SECONDS,
+                 health_check_interval=HEALTH_CHECK_INTERVAL, health_check_query=HEALTH_CHECK_QUERY,
+                 on_query=None):
+        self.connect = connect
+        self.on_query = on_query
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+
+        self._idle = []  # (connection, released_at)
+        self._open = 0
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+        self._stats = {
+            'handshakes': 0,
+            'handshake_seconds': 0.0,
+            'queries': 0,
+            'query_seconds': 0.0,
+            'reused': 0,
+            'evicted': 0,
+            'health_check_failures': 0,
+        }
+
+    def _record(self, key, value=1):
+        with self._condition:
+            self._stats[key] += value
+
+    def _reset_after_fork(self):
+        # Connections opened by a parent process must not be shared with a forked child
+        if os.getpid() != self._pid:
+            self._idle = []
+            self._open = 0
+            self._pid = os.getpid()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.health_check_query)
+            cursor.fetchone()
+            return True
+        except Exception:
+            self._record('health_check_failures')
+            return False
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def _new_connection(self):
+        start = time.perf_counter()
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        self._record('handshakes')
+        self._record('handshake_seconds', time.perf_counter() - start)
+        return connection
+
+    def acquire(self, timeout=None):
+        """Return a healthy connection, opening one if the pool has room"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                self._reset_after_fork()
+                now = time.monotonic()
+                while self._idle:
+                    connection, released_at = self._idle.pop()
+                    idle_for = now - released_at
+                    if idle_for > self.max_idle_seconds:
+                        self._open -= 1
+                        self._stats['evicted'] += 1
+                        self._close(connection)
+                        continue
+                    break
+                else:
+                    connection, idle_for = None, 0.0
+                    if self._open < self.max_size:
+                        self._open += 1
+                    else:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError("Timed out waiting for a pooled connection")
+                        self._condition.wait(remaining)
+                        continue
+
+            if connection is None:
+                return self._new_connection()
+            if idle_for > self.health_check_interval and not self._healthy(connection):
+                self.discard(connection)
+                continue
+            self._record('reused')
+            return connection
+
+    def release(self, connection):
+        """Return a connection to the pool"""
+        with self._condition:
+            if os.getpid() != self._pid:
+                return
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Close a broken connection and free its slot"""
+        self._close(connection)
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager that borrows a connection and returns it afterwards.
+
+        The connection is discarded instead of returned when the block
+        raises a DB-API OperationalError or InterfaceError; ordinary SQL
+        errors leave the session usable.
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except Exception as e:
+            if type(e).__name__ in CONNECTION_ERRORS:
+                self.discard(connection)
+            else:
+                self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def execute(self, query, fetch='one', connection=None):
+        """
+        Run a query and return fetchone() or fetchall().
+
+        The query runs on a pooled connection, or on ``connection`` when the
+        caller already holds one borrowed from this pool.
+        """
+        if connection is None:
+            with self.connection() as connection:
+                return self.execute(query, fetch, connection)
+
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        result, error = None, None
+        try:
+            cursor.execute(query)
+            result = cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            # Snowflake cursors expose the query id as sfqid
+            query_id = getattr(cursor, 'sfqid', None)
+            cursor.close()
+            self._record('queries')
+            self._record('query_seconds', elapsed)
+            if self.on_query is not None:
+                rows = (1 if result is not None else 0) if fetch == 'one' else len(result or [])
+                self.on_query(query, elapsed, rows, query_id, error)
+        return result
+
+    def get_first(self, query):
+        """Drop-in replacement for SnowflakeHook.get_first"""
+        return self.execute(query, fetch='one')
+
+    def get_records(self, query):
+        """Drop-in replacement for SnowflakeHook.get_records"""
+        return self.execute(query, fetch='all')
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Return a snapshot of pool metrics"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+        return stats
+
+    def log_stats(self, logger=None):
+        """Log handshake time against query time"""
+        logger = logger or logging.getLogger(__name__)
+        stats = self.stats()
+        logger.info(
+            f"Connection pool - Handshakes: {stats['handshakes']} ({stats['handshake_seconds']:.2f}s), "
+            f"Queries: {stats['queries']} ({stats['query_seconds']:.2f}s), "
+            f"Reused: {stats['reused']}, Evicted: {stats['evicted']}, Open: {stats['open']}"
+        )
+
+class BorrowedConnection:
+    """
+    get_first/get_records on one connection already borrowed from a pool.
+
+    Lets code holding a connection call pool-based helpers without asking
+    the pool for a second one, which would wait forever once the pool is
+    full (e.g. with max_size=1).
+    """
+
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.connection = connection
+
+    def get_first(self, query):
+        return self.pool.execute(query, 'one', self.connection)
+
+    def get_records(self, query):
+        return self.pool.execute(query, 'all', self.connection)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(conn_id=DEFAULT_CONN_ID, **kwargs):
+    """Return the process-wide pool for an Airflow Snowflake connection id"""
+    with _pools_lock:
+        if conn_id not in _pools:
+            def connect():
+                from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+                return SnowflakeHook(snowflake_conn_id=conn_id).get_conn()
+
+            kwargs.setdefault('on_query', record_pool_query)
+            _pools[conn_id] = ConnectionPool(connect, **kwargs)
+        return _pools[conn_id]
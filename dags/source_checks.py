@@ -0,0 +1,313 @@
+"""
+Shared source validation checks for the SCV DAGs
+Runs one fused query per source table concurrently and reports per-check timing
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import time
+
+from metric_cache import cached_get_first, table_metadata
+from query_metrics import query_label
+
+# 'metadata' reads volumes and last-altered times from information_schema and
+# scans only rows above the persisted watermarks; 'scan' runs the full checks
+CHECK_MODE = os.environ.get('SCV_CHECK_MODE', 'metadata')
+
+# 'sync' runs each check query on a pooled thread; 'async' submits them all and
+# polls from one asyncio loop (async_checks); 'deferrable' also swaps the check
+# tasks for operators that release their worker slot while queries run, and
+# requires the 'scan' check mode since only the full scans can be deferred
+CHECK_EXECUTION = os.environ.get('SCV_CHECK_EXECUTION', 'sync')
+
+# One query per source table. Every metric either DAG needs from a table is
+# computed in the same scan with conditional aggregation, so the pipeline's
+# validate_data_sources and the monitoring DAG's check_data_source_health
+# share a single definition per table.
+SOURCE_CHECKS = {
+    'D365_CUSTOMERS': {
+        'query': """
+    SELECT
+        COUNT(*) as record_count,
+        COUNT(CASE WHEN updated_at >= DATEADD(day, -1, CURRENT_DATE()) THEN 1 END) as recent_record_count,
+        MAX(updated_at) as latest_update,
+        DATEDIFF('hour', MAX(updated_at), CURRENT_TIMESTAMP()) as hours_since_update,
+        CURRENT_TIMESTAMP() as check_time
+    FROM your-database.raw.D365_CUSTOMERS
+    """,
+        'tables': ['your-database.raw.D365_CUSTOMERS'],
+        'columns': ['record_count', 'recent_record_count', 'latest_update', 'hours_since_update', 'check_time'],
+        'required': True,
+    },
+    'EXCEL_DATA': {
+        'query': """
+    SELECT
+        COUNT(*) as record_count,
+        COUNT(CASE WHEN postal_code IS NOT NULL THEN 1 END) as records_with_postal,
+        COUNT(CASE WHEN region IS NOT NULL THEN 1 END) as records_with_region,
+        ROUND(COUNT(CASE WHEN postal_code IS NOT NULL THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0), 2) as completeness_pct
+    FROM your-database.raw.EXCEL_DATA
+    """,
+        'tables': ['your-database.raw.EXCEL_DATA'],
+        'columns': ['record_count', 'records_with_postal', 'records_with_region', 'completeness_pct'],
+        'required': True,
+    },
+    'WEATHER_DATA': {
+        'query': """
+    SELECT
+        COUNT(*) as record_count,
+        MAX(date_valid_std) as latest_weather_date,
+        COUNT(DISTINCT postal_code) as unique_locations
+    FROM WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"
+    WHERE date_valid_std >= CURRENT_DATE()
+    """,
+        'tables': ['WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"'],
+        'columns': ['record_count', 'latest_weather_date', 'unique_locations'],
+        'required': False,
+    },
+}
+
+# Modeled-table checks shared by validate_pipeline_output and the monitoring
+# DAG's check_model_status, fused the same way as the source checks
+MODEL_CHECKS = {
+    'bronze_customers': {
+        'query': """
+    SELECT
+        COUNT(*) as record_count
+    FROM raw_BRONZE_DEV.bronze_customers
+    """,
+        # bronze_customers is a view, so its own metadata never changes with the data
+        'tables': ['raw_BRONZE_DEV.bronze_customers', 'your-database.raw.D365_CUSTOMERS'],
+        'columns': ['record_count'],
+        'required': True,
+    },
+    'silver_customer_weather': {
+        'query': """
+    SELECT
+        COUNT(*) as total_records,
+        COUNT(DISTINCT customer_id) as unique_customers,
+        COUNT(CASE WHEN avg_temperature_air_2m_f IS NOT NULL THEN 1 END) as records_with_weather
+    FROM raw_SILVER_DEV.silver_customer_weather
+    """,
+        'tables': ['raw_SILVER_DEV.silver_customer_weather'],
+        'columns': ['total_records', 'unique_customers', 'records_with_weather'],
+        'required': True,
+    },
+    'gold_customer_kpis': {
+        'query': """
+    SELECT
+        COUNT(*) as total_regions,
+        SUM(total_customers) as total_customers,
+        AVG(avg_temp_f) as avg_temperature,
+        AVG(avg_rain_chance_pct) as avg_rain_chance
+    FROM raw_GOLD_DEV.gold_customer_kpis
+    """,
+        'tables': ['raw_GOLD_DEV.gold_customer_kpis'],
+        'columns': ['total_regions', 'total_customers', 'avg_temperature', 'avg_rain_chance'],
+        'required': True,
+    },
+}
+
+# Freshness and volume checks for the metadata check mode. Row counts come
+# from information_schema; watermark_column is the monotonic column used to
+# read only the rows added since the previous check, and delta_metrics are
+# extra aggregates computed over those rows. Tables without metadata (views
+# such as bronze_customers) fall back to a full COUNT(*) scan.
+FRESHNESS_CHECKS = {
+    'D365_CUSTOMERS': {
+        'table': 'your-database.raw.D365_CUSTOMERS',
+        'watermark_column': 'updated_at',
+        'required': True,
+    },
+    'EXCEL_DATA': {
+        'table': 'your-database.raw.EXCEL_DATA',
+        'watermark_column': None,
+        'required': True,
+    },
+    'WEATHER_DATA': {
+        'table': 'WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"',
+        'watermark_column': 'date_valid_std',
+        'required': False,
+    },
+    'bronze_customers': {
+        'table': 'raw_BRONZE_DEV.bronze_customers',
+        'watermark_column': None,
+        'required': True,
+    },
+    'silver_customer_weather': {
+        'table': 'raw_SILVER_DEV.silver_customer_weather',
+        'watermark_column': '_dbt_loaded_at',
+        'delta_metrics': {
+            'changed_customers': 'COUNT(DISTINCT customer_id)',
+            'changed_with_weather': 'COUNT(CASE WHEN avg_temperature_air_2m_f IS NOT NULL THEN 1 END)',
+        },
+        'required': True,
+    },
+    'gold_customer_kpis': {
+        'table': 'raw_GOLD_DEV.gold_customer_kpis',
+        'watermark_column': '_dbt_loaded_at',
+        'required': True,
+    },
+}
+
+# Upper bound on concurrent check queries per task
+MAX_CHECK_WORKERS = 4
+
+def run_check(pool, name, check, cache=None):
+    """
+    Run one check on a pooled connection and capture the outcome.
+
+    Failures are returned rather than raised so one bad source does not
+    hide the results of the others. With a metric cache the row is reused
+    while the checked tables are unchanged and the entry is within its TTL.
+    """
+    start = time.perf_counter()
+    result = {'name': name, 'required': check['required'], 'row': None, 'error': None}
+    try:
+        with query_label(name):
+            if cache is not None:
+                row = cached_get_first(pool, cache, check['query'], check['tables'])
+            else:
+                row = pool.get_first(check['query'])
+        result['row'] = dict(zip(check['columns'], row)) if row is not None else None
+    except Exception as e:
+        result['error'] = e
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+def run_source_checks(pool, names=None, max_workers=MAX_CHECK_WORKERS, checks=SOURCE_CHECKS, cache=None):
+    """
+    Run checks concurrently over the shared connection pool.
+
+    Returns {name: result} where each result carries the metric row (as a
+    dict), the error if the check failed and its elapsed seconds. Raises
+    the first error of a required check after every check has finished.
+    """
+    names = list(names or checks)
+    if CHECK_EXECUTION != 'sync':
+        # Imported here because async_checks builds on this module
+        from async_checks import run_checks_async
+        return run_checks_async(pool, names, checks, cache)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+        futures = [
+            executor.submit(run_check, pool, name, checks[name], cache)
+            for name in names
+        ]
+        results = {future.result()['name']: future.result() for future in futures}
+
+    return finish_checks(results, start, 'Source checks')
+
+def finish_checks(results, start, label):
+    """Log per-check timings and raise the first error of a required check"""
+    logger = logging.getLogger(__name__)
+    for name, result in results.items():
+        if result['error'] is None:
+            logger.info(f"{name} check completed in {result['elapsed']:.2f}s")
+        else:
+            logger.warning(f"{name} check failed after {result['elapsed']:.2f}s: {result['error']}")
+    logger.info(f"{label} completed in {time.perf_counter() - start:.2f}s")
+
+    for result in results.values():
+        if result['required'] and result['error'] is not None:
+            raise result['error']
+    return results
+
+def freshness_row(pool, check, metadata, previous):
+    """
+    Build one freshness row and the state to persist for the next check.
+
+    The row carries record_count, last_altered, the current watermark,
+    new_rows since the previous check (None without a baseline), any
+    delta_metrics and the mode used: 'metadata' when nothing was scanned,
+    'delta' when only rows above the stored watermark were read and 'scan'
+    when missing metadata forced a full scan. Rows written late with a
+    watermark value below the stored one are not counted as new.
+    """
+    table = check['table']
+    column = check.get('watermark_column')
+    delta_metrics = check.get('delta_metrics', {})
+    previous = previous or {}
+    row = {name: None for name in delta_metrics}
+    row['watermark'] = previous.get('watermark')
+
+    if metadata is None or metadata['row_count'] is None:
+        selects = ['COUNT(*) as record_count'] + ([f'MAX({column}) as watermark'] if column else [])
+        values = pool.get_first(f"SELECT {', '.join(selects)} FROM {table}")
+        row.update(dict(zip(['record_count', 'watermark'], values)))
+        row['last_altered'] = None
+        row['mode'] = 'scan'
+    else:
+        row['record_count'] = metadata['row_count']
+        row['last_altered'] = metadata['last_altered']
+        row['mode'] = 'metadata'
+        changed = previous.get('last_altered') != str(metadata['last_altered'])
+        if column and changed and previous.get('watermark') is not None:
+            selects = ['COUNT(*) as new_rows', f'MAX({column}) as watermark'] + [
+                f'{expression} as {name}' for name, expression in delta_metrics.items()
+            ]
+            values = pool.get_first(
+                f"SELECT {', '.join(selects)} FROM {table} WHERE {column} > '{previous['watermark']}'"
+            )
+            delta = dict(zip(['new_rows', 'watermark'] + list(delta_metrics), values))
+            row.update({key: value for key, value in delta.items() if value is not None})
+            row['mode'] = 'delta'
+        elif column and changed:
+            # First check of this table: MAX is answered from partition metadata
+            row['watermark'] = pool.get_first(f"SELECT MAX({column}) FROM {table}")[0]
+            row['mode'] = 'delta'
+        elif not changed:
+            row.update({'new_rows': 0, **{name: 0 for name in delta_metrics}})
+
+    if 'new_rows' not in row:
+        # Volume delta for tables without a watermark column
+        baseline = previous.get('row_count')
+        row['new_rows'] = row['record_count'] - baseline if baseline is not None else None
+
+    state = {
+        'row_count': row['record_count'],
+        'last_altered': None if row['last_altered'] is None else str(row['last_altered']),
+        'watermark': None if row['watermark'] is None else str(row['watermark']),
+    }
+    return row, state
+
+def run_freshness_check(pool, name, check, store, metadata):
+    """Run one freshness check, persist its state and capture the outcome"""
+    start = time.perf_counter()
+    result = {'name': name, 'required': check['required'], 'row': None, 'error': None}
+    try:
+        with query_label(name):
+            row, state = freshness_row(pool, check, metadata, store.get(check['table']))
+        store.put(check['table'], state)
+        result['row'] = row
+    except Exception as e:
+        result['error'] = e
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+def run_freshness_checks(pool, store, names=None, max_workers=MAX_CHECK_WORKERS, checks=FRESHNESS_CHECKS):
+    """
+    Run metadata-first freshness and volume checks concurrently.
+
+    Table metadata is read with one information_schema query per database
+    before any table is touched. Returns {name: result} like
+    run_source_checks, with freshness rows, and persists each table's
+    row count, last_altered and watermark in the WatermarkStore.
+    """
+    names = list(names or checks)
+    start = time.perf_counter()
+    with query_label('table_metadata'):
+        metadata = table_metadata(pool, [checks[name]['table'] for name in names])
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+        futures = [
+            executor.submit(
+                run_freshness_check, pool, name, checks[name], store, metadata.get(checks[name]['table'])
+            )
+            for name in names
+        ]
+        results = {future.result()['name']: future.result() for future in futures}
+
+    return finish_checks(results, start, 'Freshness checks')
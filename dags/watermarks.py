@@ -0,0 +1,64 @@
+"""
+Persisted table watermarks for the SCV freshness checks
+Remembers the last metadata and high-water mark seen per table so checks only read new rows
+"""
+
+from contextlib import closing
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metric_cache import CACHE_PATH
+
+class WatermarkStore:
+    """
+    SQLite-backed store of the last state seen per (scope, table).
+
+    A state is a dict such as {'row_count', 'last_altered', 'watermark'}.
+    Scopes keep callers apart, so the pipeline advancing a watermark does
+    not hide new rows from the monitoring DAG and vice versa. The store
+    shares the metric cache's SQLite file on the state volume.
+    """
+
+    def __init__(self, scope, path=CACHE_PATH):
+        self.scope = scope
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS table_watermarks (
+                    scope TEXT,
+                    table_name TEXT,
+                    state TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (scope, table_name)
+                )
+            """)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def get(self, table):
+        """Return the last saved state for a table, or None"""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                'SELECT state FROM table_watermarks WHERE scope = ? AND table_name = ?',
+                (self.scope, table),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, table, state):
+        """Save the state for a table, replacing the previous one"""
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute(
+                'INSERT OR REPLACE INTO table_watermarks VALUES (?, ?, ?, ?)',
+                (self.scope, table, json.dumps(state, default=str), time.time()),
+            )
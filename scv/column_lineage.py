@@ -0,0 +1,1108 @@
+#!/usr/bin/env python3
+"""
+SCV Column-Level Lineage
+Derives column-to-column lineage from the compiled SQL in the dbt manifest, with parsed SQL cached per node
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from lineage_analysis import MANIFEST_PATH, LineageGraph, file_sha256, iter_manifest_section
+
+# Parse results are cached per node, keyed by a hash of the compiled SQL and
+# the parser version, in a SQLite file next to the manifest
+PARSE_CACHE_FILENAME = "column_lineage_cache.sqlite"
+PARSER_VERSION = 1
+# Entries no node has used for this long are removed
+PARSE_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Queryable column graph written next to the manifest by the build command.
+# It carries the manifest fingerprint and parser version it was built from;
+# queries load it while both match and rebuild it otherwise
+GRAPH_FILENAME = "column_lineage.json"
+
+# Cache misses are parsed in a process pool once there are enough of them to
+# pay for starting the workers
+MAX_WORKERS = os.cpu_count() or 4
+PARALLEL_MIN_NODES = 32
+
+# Resource types whose columns are tracked; models and snapshots have SQL
+SQL_RESOURCE_TYPES = ('model', 'snapshot')
+COLUMN_RESOURCE_TYPES = ('model', 'snapshot', 'seed', 'source')
+
+# Column name used for the columns of a relation whose columns are unknown
+UNKNOWN_COLUMN = '*'
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|--[^\n]*|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|\$\$.*?\$\$)
+  | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op>::|\|\||<=|>=|<>|!=|=>|->|[(),.;*+\-/%=<>\[\]:{}~^&|!?@#])
+""", re.S | re.X)
+
+# Words that are never column references inside an expression
+KEYWORDS = frozenset("""
+    select from where and or not null is in case when then else end as distinct true false
+    between like ilike rlike regexp similar escape over partition by order asc desc nulls first
+    last rows range groups unbounded preceding following current row interval exists any all
+    some within filter ignore respect with on using join inner left right full outer cross natural
+    lateral union intersect except minus group having qualify limit offset fetch next only top
+    window collate at local localtime localtimestamp current_date current_time current_timestamp
+    current_user session_user both leading trailing for recursive semi anti asof
+""".split())
+
+# Words that end the select list or a clause of a select
+CLAUSE_WORDS = frozenset(
+    'from where group having qualify window order limit offset fetch union intersect except minus'.split()
+)
+SET_OPERATORS = frozenset('union intersect except minus'.split())
+JOIN_PREFIXES = frozenset('inner left right full outer cross natural asof semi anti'.split())
+JOIN_WORDS = JOIN_PREFIXES | {'join', 'lateral'}
+# Words after a FROM item that cannot be its alias
+NOT_ALIAS_WORDS = CLAUSE_WORDS | JOIN_WORDS | frozenset(
+    'on using as at before sample tablesample pivot unpivot match_recognize changes'.split()
+)
+
+# Functions whose first argument is a date part keyword, not a column
+DATE_PART_FUNCTIONS = frozenset(
+    'dateadd datediff date_trunc date_part timeadd timediff timestampadd timestampdiff '
+    'time_slice extract last_day'.split()
+)
+
+class SqlParseError(Exception):
+    pass
+
+def tokenize(sql):
+    """Split SQL into (kind, value, start, end) tokens; words and identifiers are lower-cased"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'space':
+            continue
+        text = match.group()
+        if kind == 'quoted':
+            kind, text = 'ident', text[1:-1].replace('""', '"').lower()
+        elif kind == 'word':
+            text = text.lower()
+        tokens.append((kind, text, match.start(), match.end()))
+    return tokens
+
+def is_name(token):
+    return token[0] in ('word', 'ident')
+
+def is_op(token, value):
+    return token[0] == 'op' and token[1] == value
+
+def is_word(token, *values):
+    return token[0] == 'word' and token[1] in values
+
+def matching_paren(tokens, start):
+    """Return the index of the ')' closing the '(' at tokens[start]"""
+    depth = 0
+    for i in range(start, len(tokens)):
+        if is_op(tokens[i], '('):
+            depth += 1
+        elif is_op(tokens[i], ')'):
+            depth -= 1
+            if depth == 0:
+                return i
+    raise SqlParseError(f"Unbalanced parenthesis at offset {tokens[start][2]}")
+
+class QueryParser:
+    """
+    Recursive-descent reader for the SELECT statements dbt compiles.
+
+    It understands CTEs, set operations, joins, derived tables and scalar
+    subqueries well enough to record, for every scope (CTE, subquery or the
+    final select), the relations it reads and each output column's
+    column references. Filters, grouping and ordering are skipped: they
+    decide which rows appear, not where a column's values come from.
+    """
+
+    def __init__(self, sql, tokens=None, scopes=None):
+        self.sql = sql
+        self.tokens = tokenize(sql) if tokens is None else tokens
+        self.pos = 0
+        self.scopes = {} if scopes is None else scopes
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else ('eof', '', len(self.sql), len(self.sql))
+
+    def accept_word(self, *values):
+        if is_word(self.peek(), *values):
+            self.pos += 1
+            return True
+        return False
+
+    def accept_op(self, value):
+        if is_op(self.peek(), value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_op(self, value):
+        if not self.accept_op(value):
+            raise SqlParseError(f"Expected '{value}' at offset {self.peek()[2]}, found '{self.peek()[1]}'")
+
+    def expect_word(self, value):
+        if not self.accept_word(value):
+            raise SqlParseError(f"Expected {value.upper()} at offset {self.peek()[2]}, found '{self.peek()[1]}'")
+
+    def identifier(self):
+        token = self.peek()
+        if not is_name(token):
+            raise SqlParseError(f"Expected an identifier at offset {token[2]}, found '{token[1]}'")
+        self.pos += 1
+        return token[1]
+
+    def identifier_list(self):
+        self.expect_op('(')
+        names = [self.identifier()]
+        while self.accept_op(','):
+            names.append(self.identifier())
+        self.expect_op(')')
+        return names
+
+    def skip_balanced(self):
+        """Skip a parenthesized group starting at the current '('"""
+        self.pos = matching_paren(self.tokens, self.pos) + 1
+
+    def skip_until(self, stop_words):
+        """Skip tokens until a stop word at depth 0, an unmatched ')', ';' or the end"""
+        while True:
+            token = self.peek()
+            if token[0] == 'eof' or is_op(token, ')') or is_op(token, ';') or is_word(token, *stop_words):
+                return
+            if is_op(token, '('):
+                self.skip_balanced()
+            else:
+                self.pos += 1
+
+    def new_scope(self, name):
+        scope_name = name
+        suffix = 1
+        while scope_name in self.scopes:
+            suffix += 1
+            scope_name = f'{name}#{suffix}'
+        self.scopes[scope_name] = None
+        return scope_name
+
+    def statement(self):
+        """Parse the whole statement and return the name of its final scope"""
+        while self.accept_op(';'):
+            pass
+        final = self.new_scope('__final__')
+        self.query(final, {})
+        self.accept_op(';')
+        if self.peek()[0] != 'eof':
+            raise SqlParseError(f"Unexpected '{self.peek()[1]}' at offset {self.peek()[2]}")
+        return final
+
+    def query(self, scope_name, ctes):
+        """Parse [WITH ...] select [set operator select ...] into scope_name"""
+        ctes = dict(ctes)
+        if self.accept_word('with'):
+            self.accept_word('recursive')
+            while True:
+                cte_name = self.identifier()
+                columns = self.identifier_list() if is_op(self.peek(), '(') else None
+                self.expect_word('as')
+                self.expect_op('(')
+                cte_scope = self.new_scope(cte_name)
+                ctes[cte_name] = cte_scope
+                self.query(cte_scope, ctes)
+                if columns:
+                    self.scopes[cte_scope]['columns'] = columns
+                self.expect_op(')')
+                if not self.accept_op(','):
+                    break
+
+        branches = [self.select_core(ctes)]
+        while self.accept_word(*SET_OPERATORS):
+            self.accept_word('all', 'distinct')
+            if self.accept_word('by'):
+                self.accept_word('name')
+            branches.append(self.select_core(ctes))
+        # ORDER BY / LIMIT of the whole query
+        self.skip_until(())
+        self.scopes[scope_name] = {'branches': branches}
+
+    def select_core(self, ctes):
+        """Parse one SELECT (or a parenthesized query) into a branch"""
+        if is_op(self.peek(), '('):
+            self.pos += 1
+            scope_name = self.new_scope('__subquery__')
+            self.query(scope_name, ctes)
+            self.expect_op(')')
+            return {'sources': {scope_name: ['scope', scope_name]}, 'items': [{'star': '', 'exclude': []}]}
+
+        self.expect_word('select')
+        self.accept_word('distinct', 'all')
+        if self.accept_word('top'):
+            self.pos += 1
+        item_slices = self.select_list()
+        sources = {}
+        if self.accept_word('from'):
+            self.from_clause(sources, ctes)
+        # WHERE, GROUP BY, HAVING, QUALIFY and WINDOW only filter and group rows
+        self.skip_until(SET_OPERATORS | {'order', 'limit', 'offset', 'fetch'})
+        items = [self.select_item(start, end, ctes) for start, end in item_slices]
+        return {'sources': sources, 'items': items}
+
+    def select_list(self):
+        """Return the (start, end) token slices of the select items"""
+        slices = []
+        start = self.pos
+        while True:
+            token = self.peek()
+            at_end = token[0] == 'eof' or is_op(token, ')') or is_op(token, ';')
+            # SELECT * EXCEPT (...) is an exclusion list, not a set operator
+            star_except = is_word(token, 'except') and is_op(self.peek(-1), '*') and is_op(self.peek(1), '(')
+            if at_end or (is_word(token, *CLAUSE_WORDS) and not star_except):
+                slices.append((start, self.pos))
+                return [item for item in slices if item[1] > item[0]]
+            if is_op(token, '('):
+                self.skip_balanced()
+            elif is_op(token, ','):
+                slices.append((start, self.pos))
+                self.pos += 1
+                start = self.pos
+            else:
+                self.pos += 1
+
+    def from_clause(self, sources, ctes):
+        """Parse FROM items and joins into sources"""
+        self.from_item(sources, ctes)
+        while True:
+            if self.accept_op(','):
+                self.from_item(sources, ctes)
+                continue
+            if not is_word(self.peek(), 'join', *JOIN_PREFIXES):
+                return
+            while self.accept_word(*JOIN_PREFIXES):
+                pass
+            self.expect_word('join')
+            self.from_item(sources, ctes)
+            if self.accept_word('on'):
+                self.skip_until(CLAUSE_WORDS | JOIN_PREFIXES | {'join'})
+            elif self.accept_word('using'):
+                self.skip_balanced()
+
+    def from_item(self, sources, ctes):
+        """Parse one table, CTE, derived table or table function with its alias"""
+        self.accept_word('lateral')
+        token = self.peek()
+        default_alias = None
+        if is_op(token, '('):
+            if is_word(self.peek(1), 'select', 'with') or is_op(self.peek(1), '('):
+                self.pos += 1
+                scope_name = self.new_scope('__subquery__')
+                self.query(scope_name, ctes)
+                self.expect_op(')')
+                source = ['scope', scope_name]
+            else:
+                # Parenthesized join: its tables become sources of this select
+                self.pos += 1
+                self.from_clause(sources, ctes)
+                self.expect_op(')')
+                return
+        elif is_word(token, 'table') and is_op(self.peek(1), '('):
+            self.pos += 1
+            self.skip_balanced()
+            source = ['function', None]
+        else:
+            parts = [self.identifier()]
+            while is_op(self.peek(), '.') and is_name(self.peek(1)):
+                self.pos += 1
+                parts.append(self.identifier())
+            if is_op(self.peek(), '('):
+                self.skip_balanced()
+                source = ['function', None]
+            elif len(parts) == 1 and parts[0] in ctes:
+                source = ['scope', ctes[parts[0]]]
+            else:
+                source = ['relation', '.'.join(parts)]
+            default_alias = parts[-1]
+
+        # Time travel and sampling clauses
+        while is_word(self.peek(), 'at', 'before', 'sample', 'tablesample', 'changes') and is_op(self.peek(1), '('):
+            self.pos += 1
+            self.skip_balanced()
+        alias = default_alias
+        if self.accept_word('as'):
+            alias = self.identifier()
+        elif is_name(self.peek()) and not is_word(self.peek(), *NOT_ALIAS_WORDS):
+            alias = self.identifier()
+        if alias is not None and is_op(self.peek(), '(') and is_name(self.peek(1)):
+            self.skip_balanced()
+        sources[alias or f'__source_{len(sources)}__'] = source
+
+    def select_item(self, start, end, ctes):
+        """Parse the select item tokens[start:end] into its name and column references"""
+        tokens = self.tokens[start:end]
+        if is_op(tokens[0], '*') or (
+            len(tokens) >= 3 and is_name(tokens[0]) and is_op(tokens[1], '.') and is_op(tokens[2], '*')
+        ):
+            qualifier = '' if is_op(tokens[0], '*') else tokens[0][1]
+            rest = tokens[1:] if qualifier == '' else tokens[3:]
+            exclude = []
+            if rest and is_word(rest[0], 'exclude', 'except'):
+                exclude = [token[1] for token in rest[1:] if is_name(token)]
+            return {'star': qualifier, 'exclude': exclude}
+
+        alias = None
+        if len(tokens) >= 3 and is_word(tokens[-2], 'as') and is_name(tokens[-1]):
+            alias, tokens = tokens[-1][1], tokens[:-2]
+        elif (
+            len(tokens) >= 2 and is_name(tokens[-1]) and not is_word(tokens[-1], *KEYWORDS)
+            and not is_op(tokens[-2], '.') and not is_op(tokens[-2], '::')
+            and (tokens[-2][0] in ('word', 'ident', 'string', 'number') or is_op(tokens[-2], ')'))
+            and not is_word(tokens[-2], *KEYWORDS - {'end', 'null', 'true', 'false'})
+        ):
+            alias, tokens = tokens[-1][1], tokens[:-1]
+
+        refs, subqueries = self.column_refs(tokens, ctes)
+        direct = len(refs) == 1 and not subqueries and all(is_name(t) or is_op(t, '.') for t in tokens)
+        if alias is None and direct:
+            alias = refs[0][1]
+        item = {'name': alias, 'refs': refs, 'subqueries': subqueries}
+        if not direct:
+            item['expr'] = re.sub(r'\s+', ' ', self.sql[tokens[0][2]:tokens[-1][3]]) if tokens else ''
+        return item
+
+    def column_refs(self, tokens, ctes):
+        """Return ([qualifier, column] references, scalar subquery scopes) of an expression"""
+        refs, subqueries = [], []
+        i, n = 0, len(tokens)
+        while i < n:
+            token = tokens[i]
+            if is_op(token, '(') and i + 1 < n and is_word(tokens[i + 1], 'select', 'with'):
+                close = i + matching_paren(tokens[i:], 0)
+                parser = QueryParser(self.sql, tokens[i + 1:close], self.scopes)
+                scope_name = parser.new_scope('__subquery__')
+                parser.query(scope_name, ctes)
+                subqueries.append(scope_name)
+                i = close + 1
+                continue
+            if is_op(token, '::') or (is_word(token, 'as') and i > 0):
+                # Type name of a cast
+                i += 2
+                if i < n and is_op(tokens[i], '('):
+                    i += matching_paren(tokens[i:], 0) + 1
+                continue
+            if is_op(token, ':') and i + 1 < n and is_name(tokens[i + 1]):
+                # Semi-structured path (variant:field)
+                i += 2
+                continue
+            if not is_name(token) or is_word(token, *KEYWORDS):
+                i += 1
+                continue
+
+            parts = [token[1]]
+            j = i
+            while j + 2 < n and is_op(tokens[j + 1], '.') and is_name(tokens[j + 2]):
+                parts.append(tokens[j + 2][1])
+                j += 2
+            following = tokens[j + 1] if j + 1 < n else ('eof', '', 0, 0)
+            if is_op(following, '('):
+                # Function call; some take a date part keyword as first argument
+                if parts[-1] in DATE_PART_FUNCTIONS and j + 2 < n and tokens[j + 2][0] == 'word':
+                    j += 2
+            elif not (is_op(following, '=>') or is_op(following, '->') or following[0] == 'string'):
+                # Not a named argument, lambda parameter or typed literal (DATE '2024-01-01')
+                refs.append([parts[-2] if len(parts) > 1 else None, parts[-1]])
+            i = j + 1
+        return refs, subqueries
+
+def parse_sql(sql):
+    """
+    Parse a compiled model's SQL into its scopes.
+
+    Returns {'final': scope name, 'scopes': {...}}, or {'error': message}
+    for SQL the parser does not understand. Module-level so it can run in
+    a process pool.
+    """
+    try:
+        parser = QueryParser(sql)
+        final = parser.statement()
+        return {'final': final, 'scopes': parser.scopes}
+    except (SqlParseError, IndexError, RecursionError) as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+def sql_hash(sql):
+    return hashlib.sha256(f'{PARSER_VERSION}\0{sql}'.encode('utf-8')).hexdigest()
+
+class ParseCache:
+    """SQLite cache of parse results keyed by compiled SQL hash"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parsed (sql_hash TEXT PRIMARY KEY, parsed BLOB NOT NULL, used_at REAL NOT NULL)"
+            )
+
+    def get_many(self, hashes):
+        """Return {hash: parsed} for the hashes in the cache, marking them used"""
+        found = {}
+        hashes = list(hashes)
+        now = time.time()
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = connection.execute(
+                    f"SELECT sql_hash, parsed FROM parsed WHERE sql_hash IN ({','.join('?' * len(chunk))})", chunk,
+                ).fetchall()
+                found.update((key, pickle.loads(parsed)) for key, parsed in rows)
+            connection.executemany("UPDATE parsed SET used_at = ? WHERE sql_hash = ?", [(now, key) for key in found])
+        return found
+
+    def put_many(self, entries):
+        """Store {hash: parsed} and drop entries unused for PARSE_CACHE_TTL_SECONDS"""
+        now = time.time()
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO parsed (sql_hash, parsed, used_at) VALUES (?, ?, ?)",
+                [(key, pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL), now) for key, parsed in entries.items()],
+            )
+            connection.execute("DELETE FROM parsed WHERE used_at < ?", (now - PARSE_CACHE_TTL_SECONDS,))
+
+def parse_nodes(sql_by_node, cache=None, max_workers=MAX_WORKERS):
+    """
+    Return ({unique_id: parsed}, stats) for {unique_id: compiled SQL}.
+
+    Nodes whose SQL hash is cached are never reparsed; the rest are parsed
+    in a process pool when there are at least PARALLEL_MIN_NODES of them.
+    """
+    hashes = {uid: sql_hash(sql) for uid, sql in sql_by_node.items()}
+    cached = cache.get_many(set(hashes.values())) if cache is not None else {}
+    misses = {}
+    for uid, key in hashes.items():
+        if key not in cached:
+            misses.setdefault(key, sql_by_node[uid])
+
+    start = time.perf_counter()
+    keys, sqls = list(misses), list(misses.values())
+    if max_workers > 1 and len(sqls) >= PARALLEL_MIN_NODES:
+        chunksize = max(1, len(sqls) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = dict(zip(keys, executor.map(parse_sql, sqls, chunksize=chunksize)))
+    else:
+        parsed = dict(zip(keys, map(parse_sql, sqls)))
+    parse_seconds = time.perf_counter() - start
+    if cache is not None and parsed:
+        cache.put_many(parsed)
+
+    results = {**cached, **parsed}
+    stats = {
+        'nodes': len(sql_by_node),
+        'cache_hits': sum(1 for key in hashes.values() if key in cached),
+        'parsed': len(parsed),
+        'parse_seconds': parse_seconds,
+    }
+    return {uid: results[key] for uid, key in hashes.items()}, stats
+
+def relation_key(name):
+    """Normalize a relation name to a tuple of lower-cased, unquoted parts"""
+    return tuple(part.strip('"`').lower() for part in re.findall(r'"(?:[^"]|"")*"|`[^`]*`|[^.]+', name or ''))
+
+def load_column_inputs(manifest_path):
+    """
+    Read the nodes and sources the column graph needs from a manifest.
+
+    Returns (lineage graph, {unique_id: compiled SQL}, {unique_id: documented
+    columns}, {relation key: unique_id}). Only compiled SQL is kept, so the
+    manifest must come from dbt compile, run or build rather than dbt parse.
+    """
+    graph = LineageGraph()
+    sql_by_node, documented, relations = {}, {}, {}
+
+    def register(uid, info):
+        name = info.get('relation_name')
+        if not name:
+            name = '.'.join(
+                part for part in (info.get('database'), info.get('schema'),
+                                  info.get('alias') or info.get('identifier') or info.get('name')) if part
+            )
+        key = relation_key(name)
+        # Also index the schema.table and table suffixes, unless ambiguous
+        for size in range(len(key), 0, -1):
+            suffix = key[-size:]
+            relations[suffix] = uid if relations.get(suffix, uid) == uid else None
+        columns = [column.lower() for column in (info.get('columns') or {})]
+        documented[uid] = columns or None
+
+    for uid, info in iter_manifest_section(manifest_path, 'sources'):
+        graph.sources[uid] = {'source_name': info.get('source_name'), 'name': info.get('name', uid)}
+        graph.add_node(uid, info.get('name', uid), 'source')
+        register(uid, info)
+    for uid, info in iter_manifest_section(manifest_path, 'nodes'):
+        resource_type = info.get('resource_type')
+        if resource_type not in COLUMN_RESOURCE_TYPES:
+            continue
+        graph.add_node(
+            uid, info.get('name', uid), resource_type,
+            (info.get('config') or {}).get('materialized'),
+            (info.get('depends_on') or {}).get('nodes') or [],
+        )
+        register(uid, info)
+        sql = info.get('compiled_code') or info.get('compiled_sql')
+        if resource_type in SQL_RESOURCE_TYPES and sql:
+            sql_by_node[uid] = sql
+    return graph, sql_by_node, documented, relations
+
+class ColumnResolver:
+    """
+    Resolves one node's parsed scopes into output columns and their lineage.
+
+    Each output column maps to {(upstream unique_id, column): transforms},
+    where transforms lists the expressions applied on the way, outermost
+    first; lineage passes through CTEs and subqueries to the relations
+    the node reads.
+    """
+
+    def __init__(self, uid, parsed, relation_columns):
+        self.uid = uid
+        self.scopes = parsed['scopes']
+        self.relation_columns = relation_columns
+        self.resolved = {}
+
+    def scope_columns(self, scope_name):
+        """Return [(column, lineage)] of a scope"""
+        if scope_name not in self.resolved:
+            self.resolved[scope_name] = []  # guards against recursive CTEs
+            scope = self.scopes.get(scope_name) or {'branches': []}
+            branches = [self.branch_columns(branch) for branch in scope['branches']]
+            columns = []
+            if branches:
+                names = scope.get('columns') or [name for name, _ in branches[0]]
+                for position, name in enumerate(names):
+                    lineage = {}
+                    for branch in branches:
+                        if position < len(branch):
+                            for key, transforms in branch[position][1].items():
+                                lineage.setdefault(key, transforms)
+                    columns.append((name, lineage))
+            self.resolved[scope_name] = columns
+        return self.resolved[scope_name]
+
+    def source_columns(self, source):
+        """
+        Return (column names or None when unknown, exact, lineage lookup) of a FROM source.
+
+        Columns are exact for scopes and parsed models; documented columns
+        of sources and seeds may be incomplete, so other references to
+        them are still kept.
+        """
+        kind, name = source
+        if kind == 'scope':
+            columns = self.scope_columns(name)
+            by_name = {}
+            for column, lineage in columns:
+                by_name.setdefault(column, lineage)
+            return [column for column, _ in columns], True, lambda column: by_name.get(column)
+        if kind == 'relation':
+            uid, columns, exact = self.relation_columns(name)
+            if uid == self.uid:
+                # Incremental models read their own table: not lineage
+                return [], True, lambda column: None
+            target = uid or f'relation:{name}'
+            if not exact:
+                return columns, False, lambda column: {(target, column): ()}
+            known = set(columns)
+            return columns, True, lambda column: {(target, column): ()} if column in known else None
+        return None, False, lambda column: None
+
+    def branch_columns(self, branch):
+        sources = {alias: self.source_columns(source) for alias, source in branch['sources'].items()}
+        output = []
+        for item in branch['items']:
+            if 'star' in item:
+                for alias, (columns, _, lookup) in sources.items():
+                    if item['star'] and alias != item['star']:
+                        continue
+                    if columns is None:
+                        lineage = lookup(UNKNOWN_COLUMN)
+                        if lineage:
+                            output.append((UNKNOWN_COLUMN, lineage))
+                        continue
+                    output.extend(
+                        (column, lookup(column) or {}) for column in columns if column not in item['exclude']
+                    )
+                continue
+
+            lineage = {}
+            for qualifier, column in item['refs']:
+                for key, transforms in self.resolve_ref(sources, output, qualifier, column).items():
+                    lineage.setdefault(key, transforms)
+            for scope_name in item['subqueries']:
+                columns = self.scope_columns(scope_name)
+                if columns:
+                    for key, transforms in columns[0][1].items():
+                        lineage.setdefault(key, transforms)
+            if 'expr' in item:
+                lineage = {key: (item['expr'],) + transforms for key, transforms in lineage.items()}
+            output.append((item['name'] or f'_col{len(output)}', lineage))
+        return output
+
+    def resolve_ref(self, sources, earlier, qualifier, column):
+        """Return the lineage of one column reference within a select"""
+        if qualifier is not None:
+            if qualifier not in sources:
+                return {}
+            return sources[qualifier][2](column) or {}
+        matches = [
+            lookup(column) for columns, _, lookup in sources.values()
+            if columns is not None and column in columns
+        ]
+        if matches:
+            return matches[0] or {}
+        # Earlier select items can be referenced by alias (lateral aliases)
+        for name, lineage in earlier:
+            if name == column:
+                return lineage
+        # Otherwise the column can only come from relations whose columns are
+        # not exactly known
+        lineage = {}
+        for _, exact, lookup in sources.values():
+            if not exact:
+                lineage.update(lookup(column) or {})
+        return lineage
+
+class ColumnGraph:
+    """
+    Column-level lineage graph.
+
+    ``columns`` lists each node's columns, ``upstream`` maps (unique_id,
+    column) to {(upstream unique_id, column): transforms} and
+    ``downstream`` is the reverse index. Columns are addressed as
+    'node.column', where node is a model or source name or unique_id.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.columns = {}
+        self.upstream = {}
+        self.downstream = {}
+        self.errors = {}
+        self.name_index = {}
+
+    def add_node(self, uid, name, resource_type):
+        self.nodes[uid] = {'name': name, 'resource_type': resource_type}
+        # Models win over sources and seeds of the same name
+        if resource_type == 'model' or name not in self.name_index:
+            self.name_index[name] = uid
+
+    def add_column(self, uid, column, lineage):
+        self.columns.setdefault(uid, []).append(column)
+        self.upstream[(uid, column)] = lineage
+        for key in lineage:
+            self.downstream.setdefault(key, {})[(uid, column)] = lineage[key]
+
+    def resolve(self, text):
+        """Return (unique_id, column) for 'node.column', or raise KeyError"""
+        node, _, column = text.rpartition('.')
+        uid = node if node in self.nodes else self.name_index.get(node)
+        column = column.lower()
+        if uid is None or column not in self.columns.get(uid, []):
+            raise KeyError(f"Unknown column: {text}")
+        return uid, column
+
+    def label(self, key):
+        uid, column = key
+        name = self.nodes[uid]['name'] if uid in self.nodes else uid
+        return f'{name}.{column}'
+
+    def walk(self, text, direction='upstream'):
+        """
+        Return every column upstream or downstream of a column.
+
+        Each entry has the column, its distance, the adjacent column it was
+        reached through and the transforms on that edge, breadth first.
+        """
+        return [entry for _, entry in self.traverse(self.resolve(text), direction)]
+
+    def traverse(self, start, direction):
+        """Yield (column key, entry) pairs of walk in breadth-first order"""
+        edges = self.upstream if direction == 'upstream' else self.downstream
+        seen = {start}
+        queue = deque([(start, 0)])
+        while queue:
+            key, depth = queue.popleft()
+            for other, transforms in edges.get(key, {}).items():
+                if other in seen:
+                    continue
+                seen.add(other)
+                yield other, {
+                    'column': self.label(other),
+                    'depth': depth + 1,
+                    'via': self.label(key),
+                    'transforms': list(transforms),
+                }
+                queue.append((other, depth + 1))
+
+    def origins(self, text):
+        """Return the source or seed columns a column is ultimately derived from"""
+        return [
+            entry for key, entry in self.traverse(self.resolve(text), 'upstream')
+            if not self.upstream.get(key)
+        ]
+
+    def edges(self):
+        """Yield (upstream label, column label, transforms) for every edge"""
+        for key, lineage in self.upstream.items():
+            for parent, transforms in lineage.items():
+                yield self.label(parent), self.label(key), list(transforms)
+
+    def to_dict(self):
+        return {
+            'nodes': self.nodes,
+            'columns': self.columns,
+            'edges': [
+                [list(parent), list(key), list(transforms)]
+                for key, lineage in self.upstream.items() for parent, transforms in lineage.items()
+            ],
+            'errors': self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        for uid, node in data['nodes'].items():
+            graph.add_node(uid, node['name'], node['resource_type'])
+        lineage = {}
+        for parent, key, transforms in data['edges']:
+            lineage.setdefault(tuple(key), {})[tuple(parent)] = tuple(transforms)
+        for uid, columns in data['columns'].items():
+            for column in columns:
+                graph.add_column(uid, column, lineage.get((uid, column), {}))
+        graph.errors = data.get('errors', {})
+        return graph
+
+@contextmanager
+def gc_paused():
+    """Disable the cyclic garbage collector inside the block"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def build_column_graph(manifest_path=MANIFEST_PATH, use_cache=True, max_workers=MAX_WORKERS):
+    """
+    Build the column graph of a manifest and return (graph, stats).
+
+    Compiled SQL is parsed per node through the parse cache; parse results
+    are then resolved in dependency order, so every model sees its
+    parents' columns when expanding SELECT * and unqualified references.
+    """
+    start = time.perf_counter()
+    lineage_graph, sql_by_node, documented, relations = load_column_inputs(manifest_path)
+    source_names = {uid: f"{source['source_name']}.{source['name']}" for uid, source in lineage_graph.sources.items()}
+    loaded = time.perf_counter()
+
+    # The parse results and the graph are many small containers; collection
+    # passes over them would cost more than parsing the SQL
+    with gc_paused():
+        cache = ParseCache(Path(manifest_path).with_name(PARSE_CACHE_FILENAME)) if use_cache else None
+        parsed, stats = parse_nodes(sql_by_node, cache, max_workers)
+
+        graph = ColumnGraph()
+        for uid, node in lineage_graph.nodes.items():
+            graph.add_node(uid, source_names.get(uid, node['name']), node['resource_type'])
+
+        def relation_columns(name):
+            key = relation_key(name)
+            for size in range(len(key), 0, -1):
+                uid = relations.get(key[-size:])
+                if uid is not None:
+                    if uid in parsed and uid in graph.columns:
+                        return uid, graph.columns[uid], True
+                    return uid, documented.get(uid), False
+            return None, None, False
+
+        resolve_start = time.perf_counter()
+        # Relations the SQL reads outside depends_on (e.g. {{ this }}) cannot form
+        # a cycle in the manifest order, so it is a safe resolution order
+        for uid in lineage_graph.topological_order():
+            result = parsed.get(uid)
+            if result is None:
+                for column in documented.get(uid) or []:
+                    graph.add_column(uid, column, {})
+                continue
+            if 'error' in result:
+                graph.errors[uid] = result['error']
+                continue
+            graph.columns[uid] = []
+            resolver = ColumnResolver(uid, result, relation_columns)
+            for column, lineage in resolver.scope_columns(result['final']):
+                if column not in graph.columns[uid]:
+                    graph.add_column(uid, column, lineage)
+
+    stats.update({
+        'load_seconds': loaded - start,
+        'resolve_seconds': time.perf_counter() - resolve_start,
+        'total_seconds': time.perf_counter() - start,
+        'columns': sum(len(columns) for columns in graph.columns.values()),
+        'edges': sum(len(lineage) for lineage in graph.upstream.values()),
+        'errors': len(graph.errors),
+    })
+    return graph, stats
+
+def manifest_fingerprint(manifest_path):
+    """Return the size, mtime and SHA-256 of a manifest"""
+    stat = Path(manifest_path).stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(manifest_path)}
+
+def save_column_graph(graph, graph_path, fingerprint):
+    """Write the column graph with the manifest fingerprint it was built from"""
+    data = graph.to_dict()
+    data.update({'parser_version': PARSER_VERSION, 'fingerprint': fingerprint})
+    tmp_path = Path(f'{graph_path}.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, graph_path)
+
+def read_column_graph(graph_path):
+    """
+    Read a stored column graph, returning (fingerprint, graph) or None.
+
+    A missing or corrupt file, or one written by another parser version,
+    counts as a miss so the caller rebuilds it from the manifest.
+    """
+    try:
+        data = json.loads(Path(graph_path).read_text())
+    except (OSError, ValueError):
+        return None
+    try:
+        if data.get('parser_version') != PARSER_VERSION:
+            return None
+        fingerprint = data['fingerprint']
+        if not {'size', 'mtime_ns', 'sha256'} <= set(fingerprint):
+            return None
+        return fingerprint, ColumnGraph.from_dict(data)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+def load_column_graph(manifest_path=MANIFEST_PATH, graph_path=None, use_cache=True, max_workers=MAX_WORKERS):
+    """
+    Return the column graph for a manifest, using the stored graph when valid.
+
+    The stored graph is reused when the manifest size and mtime match, or
+    when only the mtime changed and the content hash still matches (the
+    stored mtime is then refreshed). Otherwise the graph is rebuilt and
+    stored again, so the next query loads it instead of parsing the SQL.
+    """
+    graph_path = Path(graph_path or Path(manifest_path).with_name(GRAPH_FILENAME))
+    if not use_cache:
+        return build_column_graph(manifest_path, use_cache, max_workers)[0]
+
+    stat = Path(manifest_path).stat()
+    stored = read_column_graph(graph_path)
+    if stored is not None:
+        fingerprint, graph = stored
+        if fingerprint['size'] == stat.st_size:
+            if fingerprint['mtime_ns'] == stat.st_mtime_ns:
+                return graph
+            if fingerprint['sha256'] == file_sha256(manifest_path):
+                fingerprint['mtime_ns'] = stat.st_mtime_ns
+                save_column_graph(graph, graph_path, fingerprint)
+                return graph
+
+    graph, _ = build_column_graph(manifest_path, use_cache, max_workers)
+    try:
+        save_column_graph(graph, graph_path, manifest_fingerprint(manifest_path))
+    except OSError as e:
+        print(f"Warning: could not write column graph: {e}", file=sys.stderr)
+    return graph
+
+def print_build_stats(stats):
+    print(
+        f"🧬 Column lineage: {stats['columns']} columns, {stats['edges']} edges from {stats['nodes']} compiled nodes "
+        f"({stats['cache_hits']} cached, {stats['parsed']} parsed in {stats['parse_seconds']:.2f}s, "
+        f"{stats['total_seconds']:.2f}s total)"
+    )
+    if stats['errors']:
+        print(f"⚠️ {stats['errors']} nodes could not be parsed - see 'errors' in the column graph")
+
+def synthetic_sql_manifest(model_count, columns_per_model=20, fan_in=2):
+    """
+    Build a layered manifest of compiled CTE-style models.
+
+    Each model joins fan_in upstream relations in a CTE, transforms some
+    columns and re-selects them, like the project's silver and gold models.
+    """
+    sources = {
+        'source.scv.bronze.RAW': {
+            'resource_type': 'source', 'name': 'RAW', 'relation_name': 'SCV_DB.BRONZE.RAW',
+            'columns': {f'col_{c}': {} for c in range(columns_per_model)},
+        }
+    }
+    nodes = {}
+    per_layer = max(1, model_count // 3)
+    previous = [('source.scv.bronze.RAW', 'SCV_DB.BRONZE.RAW')]
+    for layer in ('bronze', 'silver', 'gold'):
+        current = []
+        for i in range(per_layer):
+            name = f'{layer}_model_{i}'
+            uid = f'model.scv.{name}'
+            relation = f'SCV_DB.{layer.upper()}.{name}'
+            parents = [previous[(i * 7 + k) % len(previous)] for k in range(min(fan_in, len(previous)))]
+            joins = [f'FROM {parents[0][1]} p0']
+            joins.extend(f'LEFT JOIN {parent[1]} p{k} ON p0.col_0 = p{k}.col_0' for k, parent in enumerate(parents[1:], 1))
+            selected = ',\n        '.join(
+                f'COALESCE(p{c % len(parents)}.col_{c}, 0) AS col_{c}' if c % 3 == 0
+                else f'p{c % len(parents)}.col_{c}'
+                for c in range(columns_per_model)
+            )
+            outer = ',\n    '.join(
+                f'CASE WHEN col_{c} > 0 THEN col_{c} ELSE NULL END AS col_{c}' if c % 5 == 1 else f'col_{c}'
+                for c in range(columns_per_model)
+            )
+            sql = (
+                f"WITH joined AS (\n    SELECT\n        {selected}\n    {' '.join(joins)}\n"
+                f"    WHERE p0.col_1 IS NOT NULL AND p0.col_2 <> {i}\n)\n\nSELECT\n    {outer},\n"
+                f"    CURRENT_TIMESTAMP() AS _dbt_loaded_at\nFROM joined"
+            )
+            nodes[uid] = {
+                'resource_type': 'model', 'name': name, 'relation_name': relation,
+                'config': {'materialized': 'table'},
+                'depends_on': {'nodes': sorted({parent[0] for parent in parents})},
+                'compiled_code': sql,
+            }
+            current.append((uid, relation))
+        previous = current
+    return {'nodes': nodes, 'sources': sources}
+
+def run_benchmark(sizes=(100, 1000, 5000), max_workers=MAX_WORKERS):
+    """
+    Time column graph builds on synthetic manifests.
+
+    Compares a cold serial parse, a cold parallel parse, a warm build with
+    every node cached and a build after one model's SQL changed, and checks
+    that all of them produce the same graph.
+    """
+    print(f"{'Models':>8} {'Serial (s)':>11} {'Parallel (s)':>13} {'Warm (s)':>10} {'1 changed (s)':>14} {'Edges':>9}")
+    print("-" * 70)
+    for size in sizes:
+        manifest = synthetic_sql_manifest(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_path = Path(tmp) / 'manifest.json'
+            manifest_path.write_text(json.dumps(manifest))
+
+            serial, serial_stats = build_column_graph(manifest_path, use_cache=False, max_workers=1)
+            parallel, parallel_stats = build_column_graph(manifest_path, max_workers=max_workers)
+            warm, warm_stats = build_column_graph(manifest_path, max_workers=max_workers)
+            if warm_stats['parsed'] != 0:
+                raise RuntimeError("warm build reparsed cached nodes")
+            if not serial.to_dict() == parallel.to_dict() == warm.to_dict():
+                raise RuntimeError("builds disagree")
+
+            changed = next(uid for uid in manifest['nodes'] if uid.startswith('model.scv.gold'))
+            manifest['nodes'][changed]['compiled_code'] += '\nWHERE col_2 IS NOT NULL'
+            manifest_path.write_text(json.dumps(manifest))
+            _, changed_stats = build_column_graph(manifest_path, max_workers=max_workers)
+            if changed_stats['parsed'] != 1:
+                raise RuntimeError("changed build did not reparse exactly one node")
+
+        print(
+            f"{len(manifest['nodes']):>8} {serial_stats['total_seconds']:>11.3f} "
+            f"{parallel_stats['total_seconds']:>13.3f} {warm_stats['total_seconds']:>10.3f} "
+            f"{changed_stats['total_seconds']:>14.3f} {serial_stats['edges']:>9}"
+        )
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="SCV column-level lineage from the compiled dbt manifest")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    manifest_args = argparse.ArgumentParser(add_help=False)
+    manifest_args.add_argument('--manifest', default=str(MANIFEST_PATH), help="Path to a compiled dbt manifest.json")
+    manifest_args.add_argument('--workers', type=int, default=MAX_WORKERS, help="Parser processes")
+    manifest_args.add_argument(
+        '--no-cache', dest='use_cache', action='store_false',
+        help="Ignore and do not write the parse cache under target/",
+    )
+
+    build = subparsers.add_parser(
+        'build', parents=[manifest_args], help=f"Write the column graph to {GRAPH_FILENAME} next to the manifest",
+    )
+    build.add_argument('--output', help="Path of the column graph JSON")
+
+    query_args = argparse.ArgumentParser(add_help=False)
+    query_args.add_argument(
+        '--graph', help=f"Stored column graph to query (default: {GRAPH_FILENAME} next to the manifest); "
+        "rebuilt when missing or stale against the manifest",
+    )
+
+    for op, help_text in (
+        ('upstream', "List every column COLUMN is derived from as JSON"),
+        ('downstream', "List every column derived from COLUMN as JSON"),
+        ('origins', "List the source and seed columns COLUMN comes from as JSON"),
+    ):
+        query = subparsers.add_parser(op, parents=[manifest_args, query_args], help=help_text)
+        query.add_argument('column', help="node.column, e.g. gold_customer_kpis.avg_temp_f")
+
+    subparsers.add_parser(
+        'edges', parents=[manifest_args, query_args], help="Print every column edge as tab-separated lines",
+    )
+
+    benchmark = subparsers.add_parser('benchmark', help="Benchmark column graph builds on synthetic manifests")
+    benchmark.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help="Synthetic models")
+    benchmark.add_argument('--workers', type=int, default=MAX_WORKERS, help="Parser processes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    if args.command == 'benchmark':
+        run_benchmark(args.sizes, args.workers)
+        return
+
+    if not Path(args.manifest).exists():
+        print(f"Error: {args.manifest} not found. Run 'dbt compile' first.")
+        sys.exit(1)
+    if args.command == 'build':
+        graph, stats = build_column_graph(args.manifest, args.use_cache, args.workers)
+        print_build_stats(stats)
+        output = Path(args.output or Path(args.manifest).with_name(GRAPH_FILENAME))
+        save_column_graph(graph, output, manifest_fingerprint(args.manifest))
+        print(f"📄 Column graph written to {output}")
+        return
+
+    graph = load_column_graph(args.manifest, args.graph, args.use_cache, args.workers)
+
+    if args.command == 'edges':
+        for parent, child, transforms in graph.edges():
+            print('\t'.join([parent, child, ' <- '.join(transforms)]))
+        return
+
+    try:
+        if args.command == 'origins':
+            response = graph.origins(args.column)
+        else:
+            response = graph.walk(args.column, args.command)
+    except KeyError as e:
+        print(json.dumps({'error': e.args[0]}))
+        sys.exit(1)
+    print(json.dumps({'column': args.column, args.command: response}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+SCV Local DuckDB Harness
+Runs the dbt models and data quality tests offline on synthetic data and benchmarks them
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from graphlib import TopologicalSorter
+from pathlib import Path
+from types import SimpleNamespace
+
+import duckdb
+import jinja2
+import yaml
+
+import synthetic_data
+
+PROJECT_DIR = Path(__file__).resolve().parent
+sys.path.append(str(PROJECT_DIR.parent / "dags"))
+
+import entity_resolution
+import profiling
+MODELS_DIR = PROJECT_DIR / "models"
+MACROS_DIR = PROJECT_DIR / "macros"
+HARNESS_DIR = Path("target/duckdb_harness")
+BASELINE_PATH = HARNESS_DIR / "baseline.json"
+
+# Models compared against the baseline unless --compare says otherwise
+COMPARE_MODELS = ('silver_customer_weather', 'gold_customer_kpis')
+
+# A model regresses when it is this much slower than its baseline, and by
+# more than the noise floor in absolute seconds
+REGRESSION_THRESHOLD = 0.2
+NOISE_FLOOR_SECONDS = 0.05
+
+# Share of D365 customers touched before the --incremental pass
+INCREMENTAL_CHANGE_RATE = 0.01
+
+# dbt source (source_name, table) -> generated table directory
+SOURCE_TABLES = {
+    ('bronze', 'D365_CUSTOMERS'): 'D365_CUSTOMERS',
+    ('bronze', 'EXCEL_DATA'): 'EXCEL_DATA',
+    ('marketplace', 'forecast_day'): 'forecast_day',
+    ('bronze', 'CUSTOMER_ID_MAP'): 'CUSTOMER_ID_MAP',
+}
+
+# Profiled tables (dags/profiling.py) -> harness relation
+PROFILE_RELATIONS = {
+    'D365_CUSTOMERS': 'raw."D365_CUSTOMERS"',
+    'EXCEL_DATA': 'raw."EXCEL_DATA"',
+    'WEATHER_DATA': 'raw."forecast_day"',
+    'silver_customer_weather': 'silver.silver_customer_weather',
+}
+
+# DuckDB's approx_count_distinct keeps far fewer HyperLogLog registers than
+# Snowflake's; this relative error is what the harness measures against exact counts
+DUCKDB_HLL_RELATIVE_ERROR = 0.13
+
+# Snowflake functions with a DuckDB rewrite, given the call's top-level arguments
+FUNCTION_REWRITES = {
+    'DATEADD': lambda args: f"({args[2]} + INTERVAL ({args[1]}) {args[0].strip(chr(39))})",
+}
+
+# Snowflake REGEXP/RLIKE match the whole string
+REGEXP_PATTERN = re.compile(
+    r"([\w.\"]+)\s+(NOT\s+)?(?:REGEXP|RLIKE)\s+('(?:[^']|'')*')", re.IGNORECASE
+)
+NILADIC_PATTERN = re.compile(r"\b(CURRENT_DATE|CURRENT_TIMESTAMP)\s*\(\s*\)", re.IGNORECASE)
+# Function forms avoid clashing with columns aliased current_date
+NILADIC_REWRITES = {'CURRENT_DATE': 'today()', 'CURRENT_TIMESTAMP': 'now()::TIMESTAMP'}
+MACRO_PATTERN = re.compile(r"\{%-?\s*macro\s+(\w+)\(.*?\{%-?\s*endmacro\s*-?%\}", re.DOTALL)
+SAMPLE_PATTERN = re.compile(r"\bSAMPLE\s*\(\s*([\d.]+)\s*\)", re.IGNORECASE)
+
+# Data quality test modes: every check in one scan per model, or one query per check
+TEST_MODES = ('fused', 'separate')
+
+class MacroReturn(Exception):
+    """Carries the value of dbt's {% do return(...) %} out of a macro"""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+def dbt_return(value):
+    raise MacroReturn(value)
+
+def returning(macro):
+    """Wrap a Jinja macro so a dbt-style return() becomes its result"""
+    def call(*args, **kwargs):
+        try:
+            return macro(*args, **kwargs)
+        except MacroReturn as result:
+            return result.value
+    return call
+
+def split_arguments(text):
+    """Split a function's argument text on top-level commas"""
+    args, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            args.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    args.append(''.join(current).strip())
+    return args
+
+def rewrite_function(sql, name, rewrite):
+    """Replace every call of a function, innermost arguments first"""
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    match = pattern.search(sql)
+    while match:
+        depth, end = 1, match.end()
+        while depth:
+            depth += {'(': 1, ')': -1}.get(sql[end], 0)
+            end += 1
+        inner = translate_sql(sql[match.end():end - 1])
+        replacement = rewrite(split_arguments(inner))
+        sql = sql[:match.start()] + replacement + sql[end:]
+        match = pattern.search(sql, match.start() + len(replacement))
+    return sql
+
+def translate_sql(sql):
+    """Rewrite the Snowflake constructs used by the models into DuckDB SQL"""
+    sql = NILADIC_PATTERN.sub(lambda m: NILADIC_REWRITES[m.group(1).upper()], sql)
+    sql = SAMPLE_PATTERN.sub(lambda m: f"TABLESAMPLE {m.group(1)}% (bernoulli)", sql)
+    sql = REGEXP_PATTERN.sub(
+        lambda m: f"{m.group(2) or ''}regexp_full_match({m.group(1)}, {m.group(3)})", sql
+    )
+    for name, rewrite in FUNCTION_REWRITES.items():
+        sql = rewrite_function(sql, name, rewrite)
+    return sql
+
+def generate_surrogate_key(fields):
+    """dbt_utils.generate_surrogate_key with the same NULL placeholder"""
+    parts = " || '-' || ".join(
+        f"coalesce(cast({field} as varchar), '_dbt_utils_surrogate_key_null_')" for field in fields
+    )
+    return f"md5(cast({parts} as varchar))"
+
+def discover_models(models_dir=MODELS_DIR):
+    """Return {name: {path, layer, sql, refs}} for every model file"""
+    models = {}
+    for path in sorted(Path(models_dir).rglob('*.sql')):
+        sql = path.read_text()
+        models[path.stem] = {
+            'path': path,
+            'layer': path.parent.name,
+            'sql': sql,
+            'refs': set(re.findall(r"ref\(\s*'(\w+)'\s*\)", sql)),
+            'sources': set(re.findall(r"source\(\s*'(\w+)'\s*,\s*'(\w+)'\s*\)", sql)),
+        }
+    return models
+
+def model_order(models):
+    """Return model names with every ref before the models that use it"""
+    graph = {name: model['refs'] & models.keys() for name, model in models.items()}
+    return list(TopologicalSorter(graph).static_order())
+
+def project_vars():
+    """Return the vars block of dbt_project.yml"""
+    with open(PROJECT_DIR / 'dbt_project.yml') as f:
+        return yaml.safe_load(f).get('vars', {}) or {}
+
+class DbtRenderer:
+    """
+    Minimal dbt Jinja context for rendering the project's models offline.
+
+    Provides config, ref, source, var, log, this, is_incremental, the
+    project macros and dbt_utils.generate_surrogate_key. Relations resolve
+    to DuckDB schemas named after the model layers.
+    """
+
+    def __init__(self, models, macros_dir=MACROS_DIR):
+        self.models = models
+        self.vars = project_vars()
+        self.env = jinja2.Environment(extensions=['jinja2.ext.do'])
+        self.macro_sources = {
+            match.group(1): match.group(0)
+            for path in sorted(Path(macros_dir).glob('*.sql'))
+            for match in MACRO_PATTERN.finditer(path.read_text())
+        }
+
+    def relation(self, name):
+        return f"{self.models[name]['layer']}.{name}"
+
+    def context(self, name, incremental=False, model_config=None):
+        """Return the Jinja globals for rendering one model"""
+        model_config = {} if model_config is None else model_config
+
+        def config(**kwargs):
+            model_config.update(kwargs)
+            return ''
+
+        context = {
+            'config': config,
+            'ref': self.relation,
+            'source': lambda source_name, table: f'raw."{SOURCE_TABLES[(source_name, table)]}"',
+            'var': lambda key, default=None: self.vars.get(key, default),
+            'log': lambda *args, **kwargs: '',
+            'is_incremental': lambda: incremental,
+            'this': self.relation(name) if name in self.models else name,
+            'target': SimpleNamespace(name='duckdb', schema='main'),
+            'dbt_utils': SimpleNamespace(generate_surrogate_key=generate_surrogate_key),
+            'modules': SimpleNamespace(datetime=__import__('datetime')),
+            'return': dbt_return,
+        }
+        # Each macro is compiled on its own and reaches the others through the
+        # context, so macro-to-macro calls also go through the return() wrapper
+        macros = {}
+        for name in self.macro_sources:
+            context[name] = returning(lambda *args, _name=name, **kwargs: macros[_name](*args, **kwargs))
+        for name, source in self.macro_sources.items():
+            macros[name] = getattr(self.env.from_string(source).make_module(context), name)
+        return context
+
+    def render(self, name, sql=None, incremental=False):
+        """Return (translated SQL, config) for a model or an ad hoc SQL string"""
+        model_config = {}
+        context = self.context(name, incremental, model_config)
+        rendered = self.env.from_string(sql or self.models[name]['sql']).render(context)
+        return translate_sql(rendered), model_config
+
+    def render_hooks(self, name, model_config, incremental=False):
+        """Return the model's post-hooks, rendered and translated"""
+        hooks = model_config.get('post_hook') or []
+        hooks = [hooks] if isinstance(hooks, str) else hooks
+        context = self.context(name, incremental)
+        return [translate_sql(self.env.from_string(hook).render(context)) for hook in hooks]
+
+class MemorySampler:
+    """Track the peak resident set size while a block runs"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def rss_mb():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * 4096 / (1024 * 1024)
+        except OSError:
+            return synthetic_data.peak_rss_mb()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self.rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = self.rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self.rss_mb())
+        return False
+
+def count_rows(con, relation):
+    return con.execute(f"SELECT COUNT(*) FROM {relation}").fetchone()[0]
+
+def load_sources(con, data_dir):
+    """Load the generated Parquet tables into the raw schema"""
+    con.execute("CREATE SCHEMA IF NOT EXISTS raw")
+    for table in SOURCE_TABLES.values():
+        con.execute(
+            f"CREATE OR REPLACE TABLE raw.\"{table}\" AS "
+            f"SELECT * FROM read_parquet('{Path(data_dir) / table}/*.parquet')"
+        )
+
+def build_model(con, renderer, name, incremental=False):
+    """
+    Build one model and return its timing and row counts.
+
+    Views and tables are created as such. Incremental models are rebuilt
+    on the first pass; with ``incremental`` the model SQL is rendered with
+    is_incremental() true and merged on its unique_key by delete and
+    insert, which like a Snowflake MERGE never matches NULL keys.
+    """
+    sql, model_config = renderer.render(name, incremental=incremental)
+    materialized = model_config.get('materialized', 'view')
+    relation = renderer.relation(name)
+    merge = incremental and materialized == 'incremental'
+
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {renderer.models[name]['layer']}")
+        if materialized == 'view':
+            con.execute(f"CREATE OR REPLACE VIEW {relation} AS {sql}")
+        elif merge:
+            keys = model_config['unique_key']
+            keys = [keys] if isinstance(keys, str) else keys
+            con.execute(f"CREATE OR REPLACE TEMP TABLE merge_batch AS {sql}")
+            matches = ' AND '.join(f"{relation}.{key} = merge_batch.{key}" for key in keys)
+            con.execute(f"DELETE FROM {relation} USING merge_batch WHERE {matches}")
+            con.execute(f"INSERT INTO {relation} BY NAME SELECT * FROM merge_batch")
+        else:
+            con.execute(f"CREATE OR REPLACE TABLE {relation} AS {sql}")
+        for hook in renderer.render_hooks(name, model_config, incremental):
+            con.execute(hook)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'materialized': materialized,
+        'seconds': elapsed,
+        'rows_in': (
+            sum(count_rows(con, renderer.relation(ref)) for ref in renderer.models[name]['refs'])
+            + sum(count_rows(con, f'raw."{SOURCE_TABLES[source]}"') for source in renderer.models[name]['sources'])
+        ),
+        'rows_out': count_rows(con, relation),
+        'merged_rows': count_rows(con, 'merge_batch') if merge else None,
+        'peak_rss_mb': memory.peak_mb,
+    }
+
+def run_tests(con, renderer, mode='fused', sample_pct=None):
+    """
+    Run the data quality checks and return (per-check results, total seconds).
+
+    'fused' evaluates every check in one query with one scan per model, as
+    tests/test_data_quality.sql does; 'separate' runs one query per check.
+    """
+    context = renderer.context('test_data_quality')
+    fused_checks = context['fused_data_quality_checks']
+    if mode == 'fused':
+        queries = [fused_checks(sample_pct=sample_pct, include_passing=True)]
+    else:
+        definitions = context['data_quality_checks']()
+        names = [
+            check['name'] for group in definitions['passes'] for check in group['checks']
+        ] + [check['name'] for check in definitions['aggregate_checks']]
+        queries = [fused_checks(sample_pct=sample_pct, only=[name], include_passing=True) for name in names]
+
+    results = {}
+    total = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        rows = con.execute(translate_sql(str(query))).fetchall()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        for check_name, model_name, severity, failures, scanned_rows, sampled in rows:
+            results[check_name] = {
+                'model': model_name,
+                'severity': severity,
+                'failures': int(failures),
+                'scanned_rows': int(scanned_rows),
+                'sampled': bool(sampled),
+                'seconds': elapsed,
+            }
+    return results, total
+
+class DuckDBPool:
+    """Minimal stand-in for the DAGs' connection pool over a DuckDB connection"""
+
+    def __init__(self, con):
+        self.con = con
+
+    def get_first(self, query):
+        return self.con.execute(translate_sql(query)).fetchone()
+
+def run_profiles(con, sample_pct=profiling.DEFAULT_SAMPLE_PCT):
+    """
+    Profile each table at every fidelity and score the estimates.
+
+    Returns {table: {fidelity: {'seconds', 'metrics'}}} where each metric
+    carries its estimate, reported error, the exact value and whether the
+    exact value fell inside the reported interval. Distinct-count errors use
+    DuckDB's HyperLogLog error, so only the timings transfer to Snowflake.
+    """
+    pool = DuckDBPool(con)
+    results = {}
+    for name, relation in PROFILE_RELATIONS.items():
+        results[name] = {}
+        for fidelity in profiling.FIDELITIES:
+            start = time.perf_counter()
+            profile = profiling.profile_table(
+                pool, name, fidelity, sample_pct, table=relation, hll_error=DUCKDB_HLL_RELATIVE_ERROR
+            )
+            results[name][fidelity] = {'seconds': time.perf_counter() - start, 'metrics': profile['metrics']}
+        exact = results[name]['exact']['metrics']
+        for fidelity in profiling.FIDELITIES:
+            for metric, estimate in results[name][fidelity]['metrics'].items():
+                estimate['exact'] = exact[metric]['value']
+                estimate['within_error'] = abs(estimate['value'] - estimate['exact']) <= estimate['error'] + 1e-9
+    return results
+
+def touch_customers(con, rate=INCREMENTAL_CHANGE_RATE):
+    """Mark a share of D365 customers as updated now, as a day's changes would"""
+    buckets = max(1, round(1 / rate))
+    con.execute(
+        f'UPDATE raw."D365_CUSTOMERS" SET updated_at = CURRENT_TIMESTAMP::TIMESTAMP '
+        f'WHERE hash(customer_id) % {buckets} = 0'
+    )
+
+def ensure_data(customers, marketplace_postal_codes=0, harness_dir=HARNESS_DIR):
+    """Generate synthetic sources for a scale factor unless already present"""
+    name = f"{customers}-mp{marketplace_postal_codes}" if marketplace_postal_codes else str(customers)
+    data_dir = Path(harness_dir) / 'data' / name
+    if not all((data_dir / table).is_dir() for table in synthetic_data.TABLES):
+        config = synthetic_data.build_config(customers=customers, marketplace_postal_codes=marketplace_postal_codes)
+        synthetic_data.generate(config, data_dir)
+    if not (data_dir / 'CUSTOMER_ID_MAP').is_dir():
+        # The mapping is resolved from the generated sources, as it is from the exports in production
+        summary = entity_resolution.resolve_entities([data_dir / 'D365_CUSTOMERS'], [data_dir / 'EXCEL_DATA'], data_dir)
+        entity_resolution.print_summary(summary, data_dir)
+    return data_dir
+
+def run_scale(customers, incremental=False, test_mode='fused', sample_pct=None, profile=False,
+              marketplace_postal_codes=0, harness_dir=HARNESS_DIR):
+    """Build every model, run the tests and optionally the profiles and an incremental pass"""
+    data_dir = ensure_data(customers, marketplace_postal_codes, harness_dir)
+    models = discover_models()
+    renderer = DbtRenderer(models)
+    con = duckdb.connect()
+    try:
+        start = time.perf_counter()
+        load_sources(con, data_dir)
+        result = {'load_seconds': time.perf_counter() - start, 'models': {}, 'incremental': {}}
+
+        for name in model_order(models):
+            result['models'][name] = build_model(con, renderer, name)
+        result['tests'], result['tests_seconds'] = run_tests(con, renderer, test_mode)
+        if sample_pct is not None:
+            result['sample_tests'], result['sample_tests_seconds'] = run_tests(con, renderer, test_mode, sample_pct)
+        if profile:
+            result['profiles'] = run_profiles(con, sample_pct or profiling.DEFAULT_SAMPLE_PCT)
+
+        if incremental:
+            touch_customers(con)
+            for name in model_order(models):
+                if "materialized='incremental'" in models[name]['sql']:
+                    result['incremental'][name] = build_model(con, renderer, name, incremental=True)
+    finally:
+        con.close()
+    return result
+
+def print_scale(customers, result):
+    print(f"\n📦 {customers:,} customers (sources loaded in {result['load_seconds']:.2f}s)")
+    print(f"{'Model':<42} {'Type':<12} {'Seconds':>9} {'Rows in':>13} {'Rows out':>13} {'Merged':>11} {'Peak RSS (MB)':>14}")
+    print("-" * 120)
+    for label, models in (('', result['models']), (' (incremental)', result['incremental'])):
+        for name, stats in models.items():
+            merged = f"{stats['merged_rows']:,}" if stats['merged_rows'] is not None else '-'
+            print(
+                f"{name + label:<42} {stats['materialized']:<12} {stats['seconds']:>9.3f} "
+                f"{stats['rows_in']:>13,} {stats['rows_out']:>13,} {merged:>11} {stats['peak_rss_mb']:>14.1f}"
+            )
+    sections = [('Data quality tests', 'tests')]
+    if 'sample_tests' in result:
+        sections.insert(0, ('Data quality tests on a sample', 'sample_tests'))
+    for heading, key in sections:
+        print(f"\n🧪 {heading} ({result[key + '_seconds']:.3f}s)")
+        for title, stats in result[key].items():
+            status = '✅' if stats['failures'] == 0 else ('⚠️' if stats['severity'] == 'warn' else '❌')
+            print(f"  {status} {title}: {stats['failures']:,} of {stats['scanned_rows']:,} {stats['model']} rows")
+    if 'profiles' in result:
+        print("\n📐 Profiles")
+        print(f"{'Table / metric':<46} {'Fidelity':<8} {'Seconds':>8} {'Estimate':>16} {'± Error':>14} {'Exact':>16}")
+        print("-" * 113)
+        for name, fidelities in result['profiles'].items():
+            for fidelity, stats in fidelities.items():
+                for metric, estimate in stats['metrics'].items():
+                    status = '✅' if estimate['within_error'] else '❌'
+                    print(
+                        f"{name + '.' + metric:<46} {fidelity:<8} {stats['seconds']:>8.3f} "
+                        f"{estimate['value']:>16,.4f} {estimate['error']:>14,.4f} {estimate['exact']:>16,.4f} {status}"
+                    )
+
+def compare_to_baseline(results, baseline, models=COMPARE_MODELS, threshold=REGRESSION_THRESHOLD):
+    """Print model timings against the baseline and return the regressions"""
+    regressions = []
+    print(f"\n📈 Comparison with baseline ({baseline.get('created_at', 'unknown date')})")
+    print(f"{'Scale':>12} {'Model':<42} {'Baseline (s)':>13} {'Current (s)':>12} {'Change':>8}")
+    print("-" * 91)
+    for scale, result in results.items():
+        previous = baseline.get('scales', {}).get(str(scale))
+        if previous is None:
+            print(f"{scale:>12,} {'(no baseline at this scale)':<42}")
+            continue
+        for section in ('models', 'incremental'):
+            for name in models:
+                before = previous.get(section, {}).get(name)
+                after = result[section].get(name)
+                if before is None or after is None:
+                    continue
+                label = name if section == 'models' else f"{name} (incremental)"
+                change = after['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+                regressed = change > threshold and after['seconds'] - before['seconds'] > NOISE_FLOOR_SECONDS
+                print(
+                    f"{scale:>12,} {label:<42} {before['seconds']:>13.3f} {after['seconds']:>12.3f} "
+                    f"{change:>+8.0%}{'  ❌' if regressed else ''}"
+                )
+                if regressed:
+                    regressions.append((scale, label, change))
+    return regressions
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run and benchmark the SCV models on DuckDB")
+    parser.add_argument('--scales', nargs='+', type=synthetic_data.parse_count, default=[10_000, 100_000],
+                        help="Customer counts to generate and run, e.g. 10k 100k 1M")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"Touch {INCREMENTAL_CHANGE_RATE:.0%}% of customers and rerun the incremental models")
+    parser.add_argument('--test-mode', choices=TEST_MODES, default='fused',
+                        help="Run the data quality checks fused per model or one query per check")
+    parser.add_argument('--sample-pct', type=float,
+                        help="Also run the checks on a Bernoulli sample of this percent first")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the health-check tables at every fidelity and compare with exact values")
+    parser.add_argument('--marketplace-postal-codes', type=synthetic_data.parse_count, default=0,
+                        help="Also forecast this many postal codes without customers, like the marketplace share")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="Baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="Write these results as the new baseline")
+    parser.add_argument('--compare', nargs='+', default=list(COMPARE_MODELS), help="Models compared with the baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Slowdown ratio that counts as a regression")
+    parser.add_argument('--json', action='store_true', help="Print the raw results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    results = {}
+    for customers in args.scales:
+        results[customers] = run_scale(
+            customers, args.incremental, args.test_mode, args.sample_pct, args.profile, args.marketplace_postal_codes
+        )
+        if not args.json:
+            print_scale(customers, results[customers])
+
+    if args.json:
+        print(json.dumps({str(scale): result for scale, result in results.items()}, indent=2))
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare_to_baseline(results, baseline, args.compare, args.threshold)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'scales': {str(scale): result for scale, result in results.items()},
+        }, indent=2))
+        print(f"\n💾 Baseline saved to {baseline_path}")
+
+    # Synthetic data contains deliberate quality issues, so only timing regressions fail the run
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
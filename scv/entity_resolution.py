@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+SCV Customer Entity Resolution
+Matches D365 and legacy customer records within blocks and writes a stable golden customer_id mapping
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from legacy_validation import BucketWriter, LockedWriter, input_batches, string_hash
+from synthetic_data import parse_count, peak_rss_mb
+
+OUTPUT_DIR = Path("target/entity_resolution")
+
+# Source systems in golden id priority: a cluster takes the lowest customer_id
+# of its highest-priority source, so D365 ids win over legacy ids
+SOURCES = ('D365', 'LEGACY')
+
+# Blocking passes: candidate pairs are only compared within one block of one
+# pass, and a pair found by several passes is scored once
+#   postal_name  - same postal code and last name phonetics
+#   email        - same normalized email
+#   domain_names - same email domain and first and last name phonetics
+BLOCKING_PASSES = ('postal_name', 'email', 'domain_names')
+
+# Blocks above this size are compared by sorted neighbourhood instead of all
+# pairs: rows sorted by email, each compared with the next NEIGHBOURHOOD_WINDOW
+MAX_BLOCK_SIZE = 100
+NEIGHBOURHOOD_WINDOW = 10
+
+# Jaro-Winkler similarity at or above which names and email local parts agree
+NAME_SIMILARITY = 0.9
+EMAIL_SIMILARITY = 0.9
+
+# Common provider aliases folded into one email domain
+DOMAIN_ALIASES = {
+    'googlemail.com': 'gmail.com',
+    'hotmail.co.uk': 'hotmail.com',
+    'live.com': 'outlook.com',
+    'msn.com': 'outlook.com',
+    'ymail.com': 'yahoo.com',
+}
+
+BATCH_SIZE = 250_000
+# Hash buckets of staged block rows: at least MIN_BUCKETS, and enough that each
+# holds about BUCKET_INPUT_BYTES of input per pass, which bounds worker memory
+MIN_BUCKETS = 16
+BUCKET_INPUT_BYTES = 16 * 1024 * 1024
+MAX_WORKERS = os.cpu_count() or 4
+
+# Match rules, in the order they are tried; codes are stored with the matches
+MATCH_RULES = ('email', 'fuzzy')
+
+# Staged columns
+RECORD_COLUMN = '_record'
+SOURCE_COLUMN = '_source'
+BLOCK_COLUMN = '_block'
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+def soundex(name):
+    """American Soundex of a normalized name, e.g. 'robert' -> 'R163'"""
+    if not name:
+        return None
+    code, previous = name[0].upper(), SOUNDEX_CODES.get(name[0])
+    for char in name[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+def jaro_winkler(left, right):
+    """Jaro-Winkler similarity of two strings, 1.0 for identical strings"""
+    if left == right:
+        return 1.0
+    if not left or not right:
+        return 0.0
+    window = max(0, max(len(left), len(right)) // 2 - 1)
+    left_matched = [False] * len(left)
+    right_matched = [False] * len(right)
+    matches = 0
+    for i, char in enumerate(left):
+        for j in range(max(0, i - window), min(len(right), i + window + 1)):
+            if not right_matched[j] and right[j] == char:
+                left_matched[i] = right_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    left_chars = [char for char, matched in zip(left, left_matched) if matched]
+    right_chars = [char for char, matched in zip(right, right_matched) if matched]
+    transpositions = sum(a != b for a, b in zip(left_chars, right_chars)) / 2
+    jaro = (matches / len(left) + matches / len(right) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for a, b in zip(left[:4], right[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def map_unique(values, function):
+    """Apply a Python function to each distinct value of a string array"""
+    encoded = pc.dictionary_encode(values)
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    mapped = pa.array([function(value) for value in encoded.dictionary.to_pylist()], pa.string())
+    return mapped.take(encoded.indices)
+
+def normalize_name_values(values):
+    """Lower-case names and keep only their letters"""
+    return pc.replace_substring_regex(pc.utf8_lower(pc.utf8_trim_whitespace(values)), r'[^\p{L}]+', '')
+
+def normalize_email_values(values):
+    """Lower-case and trim emails and drop '+tag' suffixes from the local part"""
+    email = pc.utf8_lower(pc.utf8_trim_whitespace(values))
+    return pc.replace_substring_regex(email, r'\+[^@]*@', '@')
+
+def email_parts(email):
+    """
+    Split normalized emails into (letters, digits, domain).
+
+    letters is the local part without digits and digits its digits in order.
+    A value without an '@' is all local part with a null domain.
+    """
+    if isinstance(email, pa.ChunkedArray):
+        email = email.combine_chunks()
+    has_at = pc.fill_null(pc.match_substring(email, '@'), False)
+    local = pc.if_else(has_at, pc.replace_substring_regex(email, r'@.*$', ''), email)
+    domain = pc.if_else(has_at, pc.replace_substring_regex(email, r'^[^@]*@', ''), pa.nulls(len(email), pa.string()))
+    for alias, canonical in DOMAIN_ALIASES.items():
+        domain = pc.if_else(pc.fill_null(pc.equal(domain, alias), False), canonical, domain)
+    letters = pc.replace_substring_regex(local, r'[^\p{L}]+', '')
+    digits = pc.replace_substring_regex(local, r'[^0-9]+', '')
+    return letters, digits, domain
+
+def blank_to_null(values):
+    return pc.if_else(pc.fill_null(pc.equal(values, ''), True), pa.nulls(len(values), pa.string()), values)
+
+def block_keys(table):
+    """
+    Return {pass: key array} for a normalized table; null keys are not blocked.
+
+    Keys are joined with a pass prefix so equal values in different passes
+    land in different blocks.
+    """
+    last_phonetic = map_unique(table.column('last_name'), soundex)
+    first_phonetic = map_unique(table.column('first_name'), soundex)
+    email = table.column('email')
+    _, _, domain = email_parts(email)
+    valid_email = pc.fill_null(pc.match_substring(email, '@'), False)
+    return {
+        'postal_name': pc.binary_join_element_wise('postal_name', table.column('postal_code'), last_phonetic, '|'),
+        'email': pc.if_else(valid_email, pc.binary_join_element_wise('email', email, '|'), pa.nulls(len(email), pa.string())),
+        'domain_names': pc.binary_join_element_wise('domain_names', domain, first_phonetic, last_phonetic, '|'),
+    }
+
+def normalize_batch(batch, source, first_record):
+    """Return the normalized comparison columns of one input batch with record numbers"""
+    columns = dict(zip(batch.schema.names, batch.columns))
+    missing = pa.nulls(batch.num_rows, pa.string())
+    table = pa.table({
+        RECORD_COLUMN: pa.array(np.arange(first_record, first_record + batch.num_rows, dtype=np.int64)),
+        SOURCE_COLUMN: pa.array(np.full(batch.num_rows, SOURCES.index(source), dtype=np.int8)),
+        'customer_id': pc.utf8_trim_whitespace(columns.get('customer_id', missing)),
+        'first_name': blank_to_null(normalize_name_values(columns.get('first_name', missing))),
+        'last_name': blank_to_null(normalize_name_values(columns.get('last_name', missing))),
+        'email': blank_to_null(normalize_email_values(columns.get('email', missing))),
+        'postal_code': blank_to_null(pc.utf8_trim_whitespace(columns.get('postal_code', missing))),
+    })
+    return table.filter(pc.is_valid(table.column('customer_id')))
+
+def stage_batch(batch, source, first_record, buckets, records, counts, counts_lock):
+    """Normalize one batch, record its ids and route one row per blocking pass"""
+    table = normalize_batch(batch, source, first_record)
+    records.write(table.select([RECORD_COLUMN, SOURCE_COLUMN, 'customer_id']))
+    staged = 0
+    for name, keys in block_keys(table).items():
+        blocked = pc.is_valid(keys)
+        rows = table.filter(blocked)
+        keys = pc.filter(keys, blocked)
+        hashes = string_hash(keys)
+        buckets.write(rows.append_column(BLOCK_COLUMN, pa.array(hashes)), hashes)
+        staged += rows.num_rows
+    with counts_lock:
+        counts[f'{source.lower()}_records'] += table.num_rows
+        counts['staged_rows'] += staged
+
+def candidate_pairs(blocks):
+    """
+    Return (left, right) row positions of the candidate pairs in sorted rows.
+
+    Rows must be sorted by block. Each row is paired with the rows after
+    it in its block: all of them in blocks of up to MAX_BLOCK_SIZE rows,
+    and the next NEIGHBOURHOOD_WINDOW in larger ones. Pairs are built one
+    distance at a time over the rows that still have a partner that far
+    ahead, so the work follows the pair count.
+    """
+    rows = len(blocks)
+    left, right = [np.empty(0, np.int64)], [np.empty(0, np.int64)]
+    if rows < 2:
+        return left[0], right[0]
+    starts = np.r_[0, np.flatnonzero(blocks[1:] != blocks[:-1]) + 1]
+    sizes = np.diff(np.r_[starts, rows])
+    row_sizes = np.repeat(sizes, sizes)
+    offsets = np.arange(rows) - np.repeat(starts, sizes)
+
+    active = np.flatnonzero(row_sizes > 1)
+    distance = 0
+    while len(active):
+        distance += 1
+        active = active[offsets[active] + distance < row_sizes[active]]
+        if distance > NEIGHBOURHOOD_WINDOW:
+            active = active[row_sizes[active] <= MAX_BLOCK_SIZE]
+        left.append(active)
+        right.append(active + distance)
+    return np.concatenate(left), np.concatenate(right)
+
+def match_pair(left, right):
+    """
+    Score one candidate pair and return (rule, score) or None.
+
+    email: the normalized emails are equal and the first names agree, so a
+    shared household address does not merge different people.
+    fuzzy: first and last names and the email local part's letters agree,
+    its digits are equal and the postal code or email domain is shared.
+    """
+    first = jaro_winkler(left['first_name'], right['first_name'])
+    if left['email'] is not None and left['email'] == right['email']:
+        if first >= NAME_SIMILARITY:
+            return 'email', first
+        return None
+    if left['digits'] != right['digits']:
+        return None
+    if not (
+        (left['postal_code'] is not None and left['postal_code'] == right['postal_code'])
+        or (left['domain'] is not None and left['domain'] == right['domain'])
+    ):
+        return None
+    last = jaro_winkler(left['last_name'], right['last_name'])
+    letters = jaro_winkler(left['letters'], right['letters'])
+    if first >= NAME_SIMILARITY and last >= NAME_SIMILARITY and letters >= EMAIL_SIMILARITY:
+        return 'fuzzy', (first + last + letters) / 3
+    return None
+
+def resolve_bucket(path):
+    """
+    Match the candidate pairs of one bucket of staged block rows.
+
+    Runs in a worker process. Pairs are screened with vectorized hash
+    comparisons (equal email, or equal email digits with a shared postal
+    code or domain) before the string similarities are computed in Python.
+    Returns (left records, right records, rule codes, scores, candidates).
+    """
+    table = pq.read_table(path)
+    letters, digits, domain = email_parts(table.column('email'))
+    table = table.append_column('letters', letters).append_column('digits', digits).append_column('domain', domain)
+    table = table.sort_by([(BLOCK_COLUMN, 'ascending'), ('email', 'ascending')])
+
+    left, right = candidate_pairs(table.column(BLOCK_COLUMN).to_numpy())
+    records = table.column(RECORD_COLUMN).to_numpy()
+    candidates = len(left)
+
+    email_hash = string_hash(table.column('email'))
+    has_email = pc.is_valid(table.column('email')).to_numpy()
+    digits_hash = string_hash(table.column('digits'))
+    postal_hash = string_hash(table.column('postal_code'))
+    has_postal = pc.is_valid(table.column('postal_code')).to_numpy()
+    domain_hash = string_hash(table.column('domain'))
+    has_domain = pc.is_valid(table.column('domain')).to_numpy()
+    screened = (
+        (has_email[left] & (email_hash[left] == email_hash[right]))
+        | (
+            (digits_hash[left] == digits_hash[right])
+            & (
+                (has_postal[left] & (postal_hash[left] == postal_hash[right]))
+                | (has_domain[left] & (domain_hash[left] == domain_hash[right]))
+            )
+        )
+    )
+    screened &= records[left] != records[right]
+    left, right = left[screened], right[screened]
+
+    rows = table.select(['first_name', 'last_name', 'email', 'postal_code', 'letters', 'digits', 'domain'])
+    positions = np.unique(np.concatenate([left, right]))
+    values = rows.take(pa.array(positions)).to_pylist()
+    lookup = dict(zip(positions.tolist(), values))
+
+    matched = ([], [], [], [])
+    for i, j in zip(left.tolist(), right.tolist()):
+        result = match_pair(lookup[i], lookup[j])
+        if result is not None:
+            a, b = sorted((int(records[i]), int(records[j])))
+            matched[0].append(a)
+            matched[1].append(b)
+            matched[2].append(MATCH_RULES.index(result[0]))
+            matched[3].append(result[1])
+    return (
+        np.array(matched[0], np.int64), np.array(matched[1], np.int64),
+        np.array(matched[2], np.int8), np.array(matched[3], np.float64), candidates,
+    )
+
+def connected_components(left, right):
+    """
+    Return (nodes, labels) for the graph of matched record pairs.
+
+    nodes are the sorted records that matched anything; labels[i] is the
+    smallest node position in nodes[i]'s component. Minimum labels are
+    propagated across edges with pointer jumping until nothing changes,
+    in NumPy and in memory proportional to the matches, not the records.
+    """
+    nodes, inverse = np.unique(np.concatenate([left, right]), return_inverse=True)
+    a, b = inverse[:len(left)], inverse[len(left):]
+    labels = np.arange(len(nodes))
+    while True:
+        updated = labels.copy()
+        smallest = np.minimum(labels[a], labels[b])
+        np.minimum.at(updated, a, smallest)
+        np.minimum.at(updated, b, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return nodes, labels
+        labels = updated
+
+def matched_records(records_path, nodes, batch_size):
+    """Read the source and customer_id of the matched records, in node order"""
+    tables = []
+    for batch in pq.ParquetFile(records_path).iter_batches(batch_size=batch_size):
+        keep = np.isin(batch.column(RECORD_COLUMN).to_numpy(), nodes)
+        if keep.any():
+            tables.append(pa.Table.from_batches([batch]).filter(pa.array(keep)))
+    if not tables:
+        return pa.table({RECORD_COLUMN: pa.array([], pa.int64()), SOURCE_COLUMN: pa.array([], pa.int8()),
+                         'customer_id': pa.array([], pa.string())})
+    return pa.concat_tables(tables).sort_by(RECORD_COLUMN)
+
+def golden_ids(matched, labels):
+    """
+    Return the golden customer_id of every matched record, in node order.
+
+    The golden id is the customer_id of the cluster's anchor: its record
+    from the highest-priority source with the lowest customer_id. It
+    depends only on the cluster's members, so reruns, input order and
+    worker counts do not change it.
+    """
+    ranked = matched.append_column('_label', pa.array(labels)).append_column('_node', pa.array(np.arange(len(labels))))
+    ranked = ranked.sort_by([('_label', 'ascending'), (SOURCE_COLUMN, 'ascending'), ('customer_id', 'ascending')])
+    ranked_labels = ranked.column('_label').to_numpy()
+    first = np.r_[True, ranked_labels[1:] != ranked_labels[:-1]] if len(ranked_labels) else np.array([], bool)
+    anchors = np.empty(len(labels), dtype=np.int64)
+    anchors[ranked_labels[first]] = ranked.column('_node').to_numpy()[first]
+    return matched.column('customer_id').combine_chunks().take(pa.array(anchors[labels]))
+
+def write_mapping(records_path, nodes, labels, golden, map_dir, batch_size):
+    """Stream every staged record into the mapping with its golden id and cluster size"""
+    map_dir.mkdir(parents=True, exist_ok=True)
+    cluster_sizes = np.bincount(labels, minlength=len(labels))[labels] if len(labels) else np.empty(0, np.int64)
+    rows = 0
+    for index, batch in enumerate(pq.ParquetFile(records_path).iter_batches(batch_size=batch_size)):
+        record = batch.column(RECORD_COLUMN).to_numpy()
+        position = np.clip(np.searchsorted(nodes, record), 0, max(len(nodes) - 1, 0))
+        matched = (nodes[position] == record) if len(nodes) else np.zeros(len(record), bool)
+        customer_id = batch.column('customer_id')
+        golden_id = customer_id
+        sizes = np.ones(len(record), dtype=np.int64)
+        if matched.any():
+            golden_id = pc.if_else(pa.array(matched), golden.take(pa.array(position)), customer_id)
+            sizes = np.where(matched, cluster_sizes[position], 1)
+        pq.write_table(pa.table({
+            'source_system': pa.array(np.array(SOURCES)[batch.column(SOURCE_COLUMN).to_numpy()]),
+            'customer_id': customer_id,
+            'golden_customer_id': golden_id,
+            'cluster_size': pa.array(sizes),
+        }), map_dir / f'part-{index:05d}.parquet', compression='zstd')
+        rows += batch.num_rows
+    return rows
+
+def input_files(paths):
+    """Expand directories into the Parquet and CSV files they contain"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix in ('.parquet', '.csv')))
+        else:
+            files.append(path)
+    return files
+
+def resolve_entities(d365_paths, legacy_paths, output_dir=OUTPUT_DIR, batch_size=BATCH_SIZE, buckets=None,
+                     max_workers=MAX_WORKERS):
+    """
+    Resolve D365 and legacy customers into a golden customer_id mapping.
+
+    Pass one streams both sources in Arrow batches across threads,
+    normalizes names, emails and postal codes and writes one row per
+    blocking pass to hash buckets on disk, so every block lands whole in
+    one bucket. Each bucket is then matched in a worker process, bounding
+    memory by the bucket size rather than the input size. Matched pairs
+    are clustered into connected components and the mapping is streamed
+    out with one row per input record. Returns the summary counts.
+    """
+    output_dir = Path(output_dir)
+    staging = output_dir / '_staging'
+    map_dir = output_dir / 'CUSTOMER_ID_MAP'
+    d365_paths, legacy_paths = input_files(d365_paths), input_files(legacy_paths)
+    if buckets is None:
+        input_bytes = sum(os.path.getsize(path) for path in d365_paths + legacy_paths)
+        buckets = max(MIN_BUCKETS, -(-input_bytes * len(BLOCKING_PASSES) // BUCKET_INPUT_BYTES))
+    for stale in (map_dir, output_dir / 'matches', staging):
+        shutil.rmtree(stale, ignore_errors=True)
+
+    counts = Counter()
+    counts_lock = threading.Lock()
+    start = time.perf_counter()
+
+    writer = BucketWriter(staging / 'blocks', buckets)
+    records = LockedWriter(staging / 'records.parquet')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending, first_record = [], 0
+        for source, paths in zip(SOURCES, (d365_paths, legacy_paths)):
+            for batch in input_batches(paths, batch_size):
+                pending.append(executor.submit(
+                    stage_batch, batch, source, first_record, writer, records, counts, counts_lock
+                ))
+                first_record += batch.num_rows
+                # Bound the batches held in memory at once
+                if len(pending) >= max_workers * 2:
+                    pending.pop(0).result()
+        for future in pending:
+            future.result()
+    bucket_paths = writer.close()
+    records.close()
+    counts['stage_seconds'] = round(time.perf_counter() - start, 3)
+
+    matches = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for left, right, rules, scores, candidates in executor.map(resolve_bucket, bucket_paths):
+            counts['candidate_pairs'] += candidates
+            matches.append((left, right, rules, scores))
+    left, right, rules, scores = (np.concatenate(column) for column in zip(*matches)) if matches else (
+        np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int8), np.empty(0, np.float64)
+    )
+    # A pair found by several passes is kept once, with its best score
+    order = np.lexsort((-scores, right, left))
+    left, right, rules, scores = left[order], right[order], rules[order], scores[order]
+    first = np.r_[True, (left[1:] != left[:-1]) | (right[1:] != right[:-1])] if len(left) else np.array([], bool)
+    left, right, rules, scores = left[first], right[first], rules[first], scores[first]
+    counts['match_seconds'] = round(time.perf_counter() - start - counts['stage_seconds'], 3)
+
+    nodes, labels = connected_components(left, right)
+    matched = matched_records(staging / 'records.parquet', nodes, batch_size)
+    golden = golden_ids(matched, labels)
+    counts['mapped_records'] = write_mapping(staging / 'records.parquet', nodes, labels, golden, map_dir, batch_size)
+
+    node_position = np.searchsorted(nodes, left), np.searchsorted(nodes, right)
+    matches_dir = output_dir / 'matches'
+    matches_dir.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.table({
+        'left_customer_id': matched.column('customer_id').take(pa.array(node_position[0])),
+        'right_customer_id': matched.column('customer_id').take(pa.array(node_position[1])),
+        'golden_customer_id': golden.take(pa.array(node_position[0])),
+        'match_rule': pa.array(np.array(MATCH_RULES)[rules] if len(rules) else [], pa.string()),
+        'score': pa.array(scores),
+    }), matches_dir / 'matches.parquet')
+    shutil.rmtree(staging, ignore_errors=True)
+
+    for rule, count in zip(*np.unique(rules, return_counts=True)):
+        counts[f'{MATCH_RULES[rule]}_matches'] = int(count)
+    sources = matched.column(SOURCE_COLUMN).to_numpy()
+    clusters = np.unique(labels)
+    counts['clusters'] = len(clusters)
+    counts['matched_records'] = len(nodes)
+    counts['cross_source_clusters'] = len(np.intersect1d(labels[sources == 0], labels[sources == 1]))
+    counts['records_merged'] = len(nodes) - len(clusters)
+    summary = {
+        'd365_inputs': [str(path) for path in d365_paths],
+        'legacy_inputs': [str(path) for path in legacy_paths],
+        'seconds': round(time.perf_counter() - start, 3),
+        'buckets': buckets,
+        'workers': max_workers,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'counts': dict(counts),
+    }
+    (output_dir / 'summary.json').write_text(json.dumps(summary, indent=2))
+    return summary
+
+def print_summary(summary, output_dir):
+    counts = summary['counts']
+    records = counts.get('d365_records', 0) + counts.get('legacy_records', 0)
+    print(
+        f"🔗 Resolved {records:,} customer records in {summary['seconds']:.2f}s "
+        f"({summary['buckets']} buckets, {summary['workers']} workers, peak RSS {summary['peak_rss_mb']:.0f} MB)"
+    )
+    print(f"  D365 records: {counts.get('d365_records', 0):,}, legacy records: {counts.get('legacy_records', 0):,}")
+    print(f"  Candidate pairs compared: {counts.get('candidate_pairs', 0):,} (naive pairwise: {records * (records - 1) // 2:,})")
+    for rule in MATCH_RULES:
+        print(f"  Matches by {rule}: {counts.get(f'{rule}_matches', 0):,}")
+    print(f"  Clusters: {counts.get('clusters', 0):,} covering {counts.get('matched_records', 0):,} records "
+          f"({counts.get('cross_source_clusters', 0):,} link D365 and legacy)")
+    print(f"  ✅ Mapping: {counts.get('mapped_records', 0):,} rows -> {Path(output_dir) / 'CUSTOMER_ID_MAP'}")
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Resolve D365 and legacy customers into a golden customer_id mapping")
+    parser.add_argument('--d365', nargs='+', required=True, help="D365_CUSTOMERS Parquet or CSV files or directories")
+    parser.add_argument('--legacy', nargs='+', required=True, help="EXCEL_DATA Parquet or CSV files or directories")
+    parser.add_argument('--output', default=str(OUTPUT_DIR), help="Directory for CUSTOMER_ID_MAP/, matches/ and summary.json")
+    parser.add_argument('--batch-size', type=parse_count, default=BATCH_SIZE, help="Rows per Arrow batch")
+    parser.add_argument('--buckets', type=int,
+                        help="Hash buckets of blocked rows (default: one per 16 MB of input per pass, at least 16)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Worker threads and processes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    missing = [path for path in args.d365 + args.legacy if not Path(path).exists()]
+    if missing:
+        print(f"Error: input not found: {', '.join(missing)}")
+        sys.exit(1)
+
+    summary = resolve_entities(args.d365, args.legacy, args.output, args.batch_size, args.buckets, args.workers)
+    print_summary(summary, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+SCV Legacy Customer Validation
+Validates EXCEL_DATA exports in Arrow batches before they are loaded into Snowflake
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from synthetic_data import mix64, parse_count, peak_rss_mb
+
+OUTPUT_DIR = Path("target/legacy_validation")
+
+# Same formats bronze_customers and the data quality tests enforce
+EMAIL_PATTERN = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
+POSTAL_CODE_PATTERN = r'^[0-9]{5}$'
+
+# Columns the EXCEL_DATA source tests require to be present
+REQUIRED_COLUMNS = ('customer_id', 'first_name', 'last_name', 'email', 'postal_code', 'region')
+
+# Keys that must be unique across the whole export; the first row wins
+UNIQUE_KEYS = ('customer_id', 'email')
+
+BATCH_SIZE = 250_000
+# Hash buckets for duplicate detection: at least MIN_BUCKETS, and enough that
+# each holds about BUCKET_INPUT_BYTES of the export, which bounds dedupe memory
+MIN_BUCKETS = 16
+BUCKET_INPUT_BYTES = 32 * 1024 * 1024
+MAX_WORKERS = os.cpu_count() or 4
+
+# Columns added while validating; only _source_row and _quarantine_reason
+# are kept, and only in the quarantine output
+ROW_COLUMN = '_source_row'
+REASON_COLUMN = '_quarantine_reason'
+KEY_COLUMN = '_key'
+
+def normalize_name(name):
+    """Map spreadsheet headers such as 'Customer ID' to customer_id"""
+    return '_'.join(name.strip().lower().replace('-', ' ').split())
+
+def csv_header(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+def csv_batches(path, batch_size):
+    """Stream a CSV export as record batches, reading every column as a string"""
+    header = csv_header(path)
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=max(1 << 20, batch_size * 32)),
+        # Strings keep leading zeros in postal codes and ids
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch
+
+def parquet_batches(path, batch_size):
+    yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+
+def input_columns(paths):
+    """
+    Return the normalized columns every input batch is conformed to.
+
+    The union of the inputs' headers in first-seen order, followed by the
+    required columns no input has, so exports with different headers
+    share one schema and a missing required column fails its rule.
+    """
+    columns = []
+    for path in paths:
+        names = pq.read_schema(path).names if str(path).endswith('.parquet') else csv_header(path)
+        for name in map(normalize_name, names):
+            if name not in columns:
+                columns.append(name)
+    return columns + [name for name in REQUIRED_COLUMNS if name not in columns]
+
+def input_batches(paths, batch_size=BATCH_SIZE):
+    """Yield batches from CSV and Parquet inputs as strings under the columns of input_columns"""
+    columns = input_columns(paths)
+    for path in paths:
+        read = parquet_batches if str(path).endswith('.parquet') else csv_batches
+        for batch in read(path, batch_size):
+            present = {
+                normalize_name(name): column.cast(pa.string())
+                for name, column in zip(batch.schema.names, batch.columns)
+            }
+            missing = pa.nulls(batch.num_rows, pa.string())
+            yield pa.RecordBatch.from_arrays([present.get(name, missing) for name in columns], names=columns)
+
+def string_hash(values):
+    """
+    Hash a string array to uint64 without leaving NumPy.
+
+    A polynomial hash over each string's bytes, computed with one
+    np.add.reduceat over the Arrow data buffer, then mixed with
+    splitmix64. Null and empty strings hash to the same value.
+    """
+    values = pc.fill_null(values, '')
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    hashes = np.zeros(len(values), dtype=np.uint64)
+    if len(values) == 0:
+        return hashes
+
+    _, offsets_buffer, data_buffer = values.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[values.offset:values.offset + len(values) + 1]
+    if data_buffer is None or offsets[-1] == offsets[0]:
+        return mix64(hashes, 1)
+    data = np.frombuffer(data_buffer, dtype=np.uint8)[offsets[0]:offsets[-1]].astype(np.uint64)
+    starts = offsets[:-1] - offsets[0]
+    lengths = np.diff(offsets)
+
+    positions = np.arange(len(data)) - np.repeat(starts, lengths)
+    powers = np.cumprod(np.full(int(lengths.max()), 1_099_511_628_211, dtype=np.uint64))
+    non_empty = lengths > 0
+    hashes[non_empty] = np.add.reduceat(data * powers[positions], starts[non_empty])
+    return mix64(hashes + lengths.astype(np.uint64), 1)
+
+def rule_masks(batch):
+    """
+    Return {rule: boolean array} of failing rows for the row-level rules.
+
+    A required column is missing when it is absent, null or blank.
+    Format rules only fire on present values, as in bronze_customers.
+    """
+    masks = {}
+    columns = dict(zip(batch.schema.names, batch.columns))
+    for name in REQUIRED_COLUMNS:
+        column = columns.get(name)
+        if column is None:
+            masks[f'missing_{name}'] = pa.array(np.ones(batch.num_rows, dtype=bool))
+        else:
+            masks[f'missing_{name}'] = pc.fill_null(pc.equal(column, ''), True)
+
+    if 'email' in columns:
+        masks['invalid_email'] = pc.fill_null(
+            pc.invert(pc.match_substring_regex(columns['email'], EMAIL_PATTERN)), False
+        )
+    if 'postal_code' in columns:
+        masks['invalid_postal_code'] = pc.fill_null(
+            pc.invert(pc.match_substring_regex(columns['postal_code'], POSTAL_CODE_PATTERN)), False
+        )
+    return masks
+
+def quarantine_reasons(masks, num_rows):
+    """Return the first failed rule per row, in rule order, null where all rules pass"""
+    reasons = pa.nulls(num_rows, pa.string())
+    for rule, mask in reversed(list(masks.items())):
+        reasons = pc.if_else(mask, rule, reasons)
+    return reasons
+
+def trim_columns(batch):
+    """Trim surrounding whitespace that spreadsheet exports leave in cells"""
+    return pa.RecordBatch.from_arrays(
+        [pc.utf8_trim_whitespace(column) for column in batch.columns], names=batch.schema.names
+    )
+
+class BucketWriter:
+    """
+    Thread-safe writer that spreads rows across per-bucket Parquet files.
+
+    Rows are routed by the uint64 hash of a key column, so every copy of a
+    key lands in the same bucket and each bucket can be deduplicated on
+    its own in bounded memory.
+    """
+
+    def __init__(self, directory, buckets=MIN_BUCKETS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.buckets = buckets
+        self._writers = {}
+        self._locks = [threading.Lock() for _ in range(buckets)]
+        self._create_lock = threading.Lock()
+
+    def path(self, bucket):
+        return self.directory / f'bucket-{bucket:04d}.parquet'
+
+    def write(self, table, key_hashes):
+        if table.num_rows == 0:
+            return
+        bucket_ids = (key_hashes % np.uint64(self.buckets)).astype(np.int32)
+        order = np.argsort(bucket_ids, kind='stable')
+        table = table.take(pa.array(order))
+        bucket_ids = bucket_ids[order]
+        bounds = np.flatnonzero(np.diff(bucket_ids)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(bucket_ids)]):
+            bucket = int(bucket_ids[start])
+            with self._locks[bucket]:
+                writer = self._writer(bucket, table.schema)
+                writer.write_table(table.slice(start, end - start))
+
+    def _writer(self, bucket, schema):
+        with self._create_lock:
+            if bucket not in self._writers:
+                # Staging files are read once and deleted, so skip compression and dictionaries
+                self._writers[bucket] = pq.ParquetWriter(
+                    self.path(bucket), schema, compression='none', use_dictionary=False
+                )
+            return self._writers[bucket]
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        return sorted(self.path(bucket) for bucket in self._writers)
+
+class LockedWriter:
+    """Single Parquet file shared by worker threads"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write(self, table):
+        if table.num_rows == 0:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def key_values(table, key):
+    """Return the normalized values of a unique key; emails compare case-insensitively"""
+    column = table.column(key)
+    return pc.utf8_lower(column) if key == 'email' else column
+
+def validate_batch(batch, first_row, next_key, buckets, quarantine, counts, counts_lock):
+    """Apply the row rules to one batch and route its rows"""
+    batch = trim_columns(batch)
+    masks = rule_masks(batch)
+    reasons = quarantine_reasons(masks, batch.num_rows)
+
+    table = pa.Table.from_batches([batch]).append_column(
+        ROW_COLUMN, pa.array(np.arange(first_row, first_row + batch.num_rows, dtype=np.int64))
+    )
+    rejected = pc.is_valid(reasons)
+    quarantine.write(table.filter(rejected).append_column(REASON_COLUMN, pc.filter(reasons, rejected)))
+
+    accepted = table.filter(pc.invert(rejected))
+    buckets.write(accepted, string_hash(key_values(accepted, next_key)))
+
+    with counts_lock:
+        counts['rows_read'] += batch.num_rows
+        for rule, mask in masks.items():
+            counts[rule] += pc.sum(mask).as_py() or 0
+
+def deduplicate_bucket(path, key, next_key, next_writer, clean_dir, quarantine, counts, counts_lock):
+    """
+    Keep the first row per key in one bucket and route the survivors.
+
+    Survivors go to the bucket writer of the next unique key, or after the
+    last key to a clean Parquet file named after the bucket.
+    """
+    rule = f'duplicate_{key}'
+    table = pq.read_table(path)
+    table = table.append_column(KEY_COLUMN, key_values(table, key))
+    table = table.sort_by([(KEY_COLUMN, 'ascending'), (ROW_COLUMN, 'ascending')])
+    keys = table.column(KEY_COLUMN).combine_chunks()
+    first = np.ones(len(keys), dtype=bool)
+    if len(keys) > 1:
+        first[1:] = pc.not_equal(keys.slice(1), keys.slice(0, len(keys) - 1)).to_numpy(zero_copy_only=False)
+    table = table.drop_columns([KEY_COLUMN])
+
+    duplicates = table.filter(pa.array(~first))
+    quarantine.write(duplicates.append_column(REASON_COLUMN, pa.array([rule] * duplicates.num_rows, pa.string())))
+    survivors = table.filter(pa.array(first))
+    if next_key is None:
+        pq.write_table(survivors.drop_columns([ROW_COLUMN]), Path(clean_dir) / Path(path).name)
+    else:
+        next_writer.write(survivors, string_hash(key_values(survivors, next_key)))
+
+    with counts_lock:
+        counts[rule] += duplicates.num_rows
+
+def validate_exports(paths, output_dir=OUTPUT_DIR, batch_size=BATCH_SIZE, buckets=None, max_workers=MAX_WORKERS):
+    """
+    Validate legacy exports into clean and quarantined Parquet.
+
+    Pass one streams the inputs in batches across worker threads (Arrow
+    kernels release the GIL), quarantines rows failing the null and
+    format rules and buckets the rest by customer_id. Each further pass
+    deduplicates one unique key bucket by bucket, so memory is bounded
+    by the batch size and the bucket size rather than the export size.
+    Returns the per-rule counts.
+    """
+    output_dir = Path(output_dir)
+    staging = output_dir / '_staging'
+    if buckets is None:
+        input_bytes = sum(os.path.getsize(path) for path in paths)
+        buckets = max(MIN_BUCKETS, -(-input_bytes // BUCKET_INPUT_BYTES))
+    for stale in (output_dir / 'clean', output_dir / 'quarantine', staging):
+        shutil.rmtree(stale, ignore_errors=True)
+
+    counts = Counter()
+    counts_lock = threading.Lock()
+    quarantine = LockedWriter(output_dir / 'quarantine' / 'quarantine.parquet')
+    start = time.perf_counter()
+
+    writer = BucketWriter(staging / UNIQUE_KEYS[0], buckets)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending, first_row = [], 0
+        for batch in input_batches(paths, batch_size):
+            pending.append(executor.submit(
+                validate_batch, batch, first_row, UNIQUE_KEYS[0], writer, quarantine, counts, counts_lock
+            ))
+            first_row += batch.num_rows
+            # Bound the batches held in memory at once
+            if len(pending) >= max_workers * 2:
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+    bucket_paths = writer.close()
+
+    clean_dir = output_dir / 'clean'
+    clean_dir.mkdir(parents=True, exist_ok=True)
+    for index, key in enumerate(UNIQUE_KEYS):
+        next_key = UNIQUE_KEYS[index + 1] if index + 1 < len(UNIQUE_KEYS) else None
+        next_writer = BucketWriter(staging / next_key, buckets) if next_key else None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    deduplicate_bucket, path, key, next_key, next_writer, clean_dir,
+                    quarantine, counts, counts_lock,
+                )
+                for path in bucket_paths
+            ]
+            for future in futures:
+                future.result()
+        if next_writer is not None:
+            bucket_paths = next_writer.close()
+
+    quarantine.close()
+    shutil.rmtree(staging, ignore_errors=True)
+
+    counts['clean_rows'] = sum(pq.ParquetFile(path).metadata.num_rows for path in clean_dir.glob('*.parquet'))
+    counts['quarantined_rows'] = counts['rows_read'] - counts['clean_rows']
+    summary = {
+        'inputs': [str(path) for path in paths],
+        'seconds': round(time.perf_counter() - start, 3),
+        'buckets': buckets,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'counts': dict(counts),
+    }
+    (output_dir / 'summary.json').write_text(json.dumps(summary, indent=2))
+    return summary
+
+def print_summary(summary, output_dir):
+    counts = summary['counts']
+    rows = counts.get('rows_read', 0)
+    print(f"🔍 Validated {rows:,} legacy rows in {summary['seconds']:.2f}s (peak RSS {summary['peak_rss_mb']:.0f} MB)")
+    print(f"  ✅ Clean: {counts.get('clean_rows', 0):,} -> {Path(output_dir) / 'clean'}")
+    print(f"  🚫 Quarantined: {counts.get('quarantined_rows', 0):,} -> {Path(output_dir) / 'quarantine'}")
+    print("\n📋 Rule failures (a row can fail several rules; it is quarantined under the first)")
+    rules = [f'missing_{name}' for name in REQUIRED_COLUMNS] + ['invalid_email', 'invalid_postal_code']
+    rules += [f'duplicate_{key}' for key in UNIQUE_KEYS]
+    for rule in rules:
+        failures = counts.get(rule, 0)
+        share = failures / rows if rows else 0
+        print(f"  {'❌' if failures else '✅'} {rule:<24} {failures:>12,} ({share:.2%})")
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Validate legacy EXCEL_DATA exports before loading")
+    parser.add_argument('inputs', nargs='+', help="CSV or Parquet export files")
+    parser.add_argument('--output', default=str(OUTPUT_DIR), help="Directory for clean/, quarantine/ and summary.json")
+    parser.add_argument('--batch-size', type=parse_count, default=BATCH_SIZE, help="Rows per Arrow batch")
+    parser.add_argument('--buckets', type=int,
+                        help="Hash buckets for duplicate detection (default: one per 32 MB of input, at least 16)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Worker threads")
+    parser.add_argument('--fail-on-quarantine', action='store_true', help="Exit 1 when any row is quarantined")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    missing = [path for path in args.inputs if not Path(path).exists()]
+    if missing:
+        print(f"Error: input not found: {', '.join(missing)}")
+        sys.exit(1)
+
+    summary = validate_exports(args.inputs, args.output, args.batch_size, args.buckets, args.workers)
+    print_summary(summary, args.output)
+    if args.fail_on_quarantine and summary['counts'].get('quarantined_rows'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
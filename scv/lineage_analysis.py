@@ -4,194 +4,1231 @@ SCV Project dbt Lineage Analysis
 This script analyzes the dbt project lineage and generates insights
 """
 
+import argparse
+import contextlib
+import hashlib
+import heapq
+import io
 import json
 import os
+import struct
 import sys
+import tempfile
+import time
+from array import array
 from pathlib import Path
 
-def load_manifest():
+LAYERS = ('bronze', 'silver', 'gold')
+
+MANIFEST_PATH = Path("target/manifest.json")
+RUN_RESULTS_PATH = Path("target/run_results.json")
+
+# Source fields used by the report; everything else is dropped when streaming
+SOURCE_FIELDS = ('resource_type', 'name', 'source_name', 'database', 'schema', 'tables')
+
+# Compact binary lineage cache written next to the manifest
+CACHE_FILENAME = "lineage_cache.bin"
+CACHE_MAGIC = b"SCVLINEAGE\n"
+CACHE_VERSION = 1
+
+# Resource types whose changes trigger a rebuild in the changed-model selection
+DIFF_RESOURCE_TYPES = ('model', 'seed', 'snapshot')
+
+# Materializations that only store a query: selecting from them always reads
+# current source data, so the changed-model selection never has to force them
+LIVE_MATERIALIZATIONS = ('view', 'ephemeral')
+
+# Subcommands answered by the transitive closure index
+QUERY_COMMANDS = ('ancestors', 'descendants', 'reachable', 'path', 'query')
+
+# Thread counts simulated by the critical-path report, and how close to the
+# critical path a thread count must get before more threads stop paying off
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+THREAD_TOLERANCE = 0.05
+
+# Above this many models the dependency matrix is unreadable, so the
+# report switches to the sparse edge list unless a format is forced.
+MATRIX_MAX_MODELS = 30
+
+def load_manifest(manifest_path=MANIFEST_PATH, streaming=False):
     """Load dbt manifest.json file"""
-    manifest_path = Path("target/manifest.json")
+    manifest_path = Path(manifest_path)
     if not manifest_path.exists():
         print("Error: manifest.json not found. Run 'dbt compile' first.")
         sys.exit(1)
-    
+
+    if streaming:
+        return load_manifest_streaming(manifest_path)
+
     with open(manifest_path, 'r') as f:
         return json.load(f)
 
-def analyze_lineage(manifest):
+def slim_node(node_info):
+    """Keep only the node fields the lineage analysis reads"""
+    return {
+        'name': node_info.get('name'),
+        'resource_type': node_info.get('resource_type'),
+        'config': {'materialized': (node_info.get('config') or {}).get('materialized')},
+        'depends_on': {'nodes': list((node_info.get('depends_on') or {}).get('nodes') or [])},
+    }
+
+def slim_source(source_info):
+    """Keep only the source fields the lineage analysis reads"""
+    return {key: source_info[key] for key in SOURCE_FIELDS if key in source_info}
+
+def import_ijson():
+    """Return the ijson module, or None with a warning when it is not installed"""
+    try:
+        import ijson
+    except ImportError:
+        print("Warning: ijson not installed, falling back to json.load (pip install -r requirements.txt)",
+              file=sys.stderr)
+        return None
+    return ijson
+
+def load_manifest_streaming(manifest_path=MANIFEST_PATH):
+    """
+    Incrementally parse manifest.json keeping only the lineage fields.
+
+    Nodes and sources are read one at a time with ijson and slimmed down
+    before the next one is parsed, so compiled SQL, docs, macros and
+    column metadata never accumulate in memory. Falls back to the regular
+    loader when ijson is not installed. Parse time and peak RSS are
+    printed so the saving can be checked on real manifests.
+    """
+    ijson = import_ijson()
+    if ijson is None:
+        start = time.perf_counter()
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        manifest = {
+            'nodes': {key: slim_node(info) for key, info in manifest.get('nodes', {}).items()},
+            'sources': {key: slim_source(info) for key, info in manifest.get('sources', {}).items()},
+        }
+        report_parse_stats('json', time.perf_counter() - start)
+        return manifest
+
+    start = time.perf_counter()
+    manifest = {'nodes': {}, 'sources': {}}
+    with open(manifest_path, 'rb') as f:
+        for key, info in ijson.kvitems(f, 'nodes', use_float=True):
+            manifest['nodes'][key] = slim_node(info)
+    with open(manifest_path, 'rb') as f:
+        for key, info in ijson.kvitems(f, 'sources', use_float=True):
+            manifest['sources'][key] = slim_source(info)
+    report_parse_stats(f'ijson/{ijson.backend}', time.perf_counter() - start)
+    return manifest
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def report_parse_stats(backend, elapsed):
+    """Print manifest parse time and peak memory"""
+    peak = peak_rss_mb()
+    peak_text = f"{peak:.1f} MB" if peak is not None else "n/a"
+    print(f"Manifest parsed with {backend} in {elapsed:.2f}s (peak RSS: {peak_text})")
+
+def layer_of(name):
+    """Return the medallion layer a model name belongs to, or None"""
+    for layer in LAYERS:
+        if name.startswith(layer):
+            return layer
+    return None
+
+class LineageGraph:
+    """
+    Indexed lineage graph built in a single pass over a dbt manifest.
+
+    Nodes are keyed by unique_id. ``parents`` and ``children`` hold the
+    forward and reverse adjacency taken from ``depends_on.nodes`` and
+    ``name_index`` maps a model name to its unique_id, so every report
+    can resolve dependencies exactly instead of by substring.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.sources = {}
+        self.parents = {}
+        self.children = {}
+        self.name_index = {}
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """Build the graph from a loaded manifest dict"""
+        graph = cls()
+        for source_key, source_info in manifest.get('sources', {}).items():
+            graph.sources[source_key] = source_info
+            graph.add_node(source_key, source_info.get('name', source_key), 'source')
+
+        for node_key, node_info in manifest.get('nodes', {}).items():
+            graph.add_node(
+                node_key,
+                node_info.get('name', node_key),
+                node_info.get('resource_type'),
+                node_info.get('config', {}).get('materialized') or 'view',
+                node_info.get('depends_on', {}).get('nodes', []),
+            )
+        return graph
+
+    def add_node(self, unique_id, name, resource_type, materialized=None, depends_on=()):
+        """Register a node and its upstream edges"""
+        self.nodes[unique_id] = {
+            'name': name,
+            'resource_type': resource_type,
+            'materialized': materialized,
+            'layer': layer_of(name) if resource_type == 'model' else None,
+        }
+        self.parents[unique_id] = list(depends_on)
+        self.children.setdefault(unique_id, [])
+        for dep in depends_on:
+            self.children.setdefault(dep, []).append(unique_id)
+        if resource_type == 'model':
+            self.name_index.setdefault(name, unique_id)
+
+    def resolve(self, name_or_id):
+        """Return the unique_id for a model name or unique_id, or None"""
+        if name_or_id in self.nodes:
+            return name_or_id
+        return self.name_index.get(name_or_id)
+
+    def of_type(self, resource_type):
+        """Return the unique_ids of every node with the given resource type"""
+        return [uid for uid, node in self.nodes.items() if node['resource_type'] == resource_type]
+
+    def models(self, layer=None):
+        """Return model unique_ids, optionally restricted to one layer"""
+        return [
+            uid for uid, node in self.nodes.items()
+            if node['resource_type'] == 'model' and (layer is None or node['layer'] == layer)
+        ]
+
+    def model_parents(self, unique_id):
+        """Return the upstream model unique_ids of a node"""
+        return [dep for dep in self.parents.get(unique_id, []) if dep.startswith('model.')]
+
+    def descendants(self, unique_ids):
+        """Return every node downstream of the given unique_ids"""
+        seen = set()
+        stack = list(unique_ids)
+        while stack:
+            for child in self.children.get(stack.pop(), []):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def topological_order(self, unique_ids=None):
+        """
+        Return unique_ids ordered so every node follows its parents.
+
+        Raises ValueError if the nodes contain a dependency cycle.
+        """
+        members = set(self.nodes if unique_ids is None else unique_ids)
+        pending = {
+            uid: sum(1 for dep in self.parents.get(uid, []) if dep in members)
+            for uid in members
+        }
+        ready = [uid for uid in (self.nodes if unique_ids is None else unique_ids) if pending[uid] == 0]
+        order = []
+        while ready:
+            uid = ready.pop()
+            order.append(uid)
+            for child in self.children.get(uid, []):
+                if child in pending:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        ready.append(child)
+
+        if len(order) != len(members):
+            cyclic = sorted(uid for uid, count in pending.items() if count > 0)
+            raise ValueError(f"Dependency cycle detected involving: {', '.join(cyclic[:10])}")
+        return order
+
+    def edges(self):
+        """Yield (parent, child) unique_id pairs"""
+        for child, deps in self.parents.items():
+            for parent in deps:
+                yield parent, child
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path_for(manifest_path):
+    """Return the lineage cache path that sits next to a manifest"""
+    return Path(manifest_path).with_name(CACHE_FILENAME)
+
+def save_graph_cache(graph, cache_path, fingerprint):
+    """
+    Write a compact binary form of the graph.
+
+    Node ids and names are interned into one string table, resource types,
+    materializations and layers become one-byte codes and edges are stored
+    as two parallel arrays of node indexes. The JSON header carries the
+    manifest fingerprint (size, mtime and SHA-256) used for invalidation.
+    """
+    ids = list(graph.nodes)
+    index = {uid: i for i, uid in enumerate(ids)}
+    # Edges may point at ids that are not nodes (e.g. disabled models)
+    for _, deps in graph.parents.items():
+        for dep in deps:
+            if dep not in index:
+                index[dep] = len(ids)
+                ids.append(dep)
+
+    types = sorted({str(node['resource_type']) for node in graph.nodes.values()})
+    materializations = sorted({str(node['materialized']) for node in graph.nodes.values()})
+    layers = ('',) + LAYERS
+
+    arrays = {
+        'resource_type': array('B', (types.index(str(node['resource_type'])) for node in graph.nodes.values())),
+        'materialized': array('B', (materializations.index(str(node['materialized'])) for node in graph.nodes.values())),
+        'layer': array('B', (layers.index(node['layer'] or '') for node in graph.nodes.values())),
+        'edge_child': array('I'),
+        'edge_parent': array('I'),
+    }
+    for child, deps in graph.parents.items():
+        for dep in deps:
+            arrays['edge_child'].append(index[child])
+            arrays['edge_parent'].append(index[dep])
+
+    strings = '\0'.join(ids + [node['name'] for node in graph.nodes.values()]).encode('utf-8')
+    header = {
+        'version': CACHE_VERSION,
+        'fingerprint': fingerprint,
+        'node_count': len(graph.nodes),
+        'id_count': len(ids),
+        'resource_types': types,
+        'materializations': materializations,
+        'layers': list(layers),
+        'sources': graph.sources,
+        'strings': len(strings),
+        'arrays': [(name, arr.typecode, len(arr)) for name, arr in arrays.items()],
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    # Per-process temp name: the scheduler and every worker may rebuild the
+    # cache at the same time
+    tmp_path = Path(f'{cache_path}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(strings)
+        for arr in arrays.values():
+            f.write(arr.tobytes())
+    os.replace(tmp_path, cache_path)
+
+def read_graph_cache(cache_path):
+    """
+    Read a cache file, returning (header, graph) or None if unreadable.
+
+    A missing, truncated or corrupt file counts as a cache miss, so the
+    caller rebuilds the graph from the manifest and rewrites the cache.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(CACHE_MAGIC):
+        return None
+    try:
+        return decode_graph_cache(data)
+    except (struct.error, ValueError, KeyError, IndexError, TypeError):
+        return None
+
+def decode_graph_cache(data):
+    """Decode the bytes of a cache file, returning (header, graph) or None for another version"""
+    offset = len(CACHE_MAGIC)
+    (header_len,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    header = json.loads(data[offset:offset + header_len])
+    offset += header_len
+    if header.get('version') != CACHE_VERSION:
+        return None
+    if not {'size', 'mtime_ns', 'sha256'} <= set(header.get('fingerprint') or {}):
+        raise ValueError("lineage cache has no manifest fingerprint")
+
+    strings = data[offset:offset + header['strings']].decode('utf-8').split('\0')
+    offset += header['strings']
+    arrays = {}
+    if header['id_count'] and len(strings) != header['id_count'] + header['node_count']:
+        raise ValueError("lineage cache string table is truncated")
+    for name, typecode, length in header['arrays']:
+        arr = array(typecode)
+        size = arr.itemsize * length
+        if offset + size > len(data):
+            raise ValueError(f"lineage cache array {name} is truncated")
+        arr.frombytes(data[offset:offset + size])
+        arrays[name] = arr
+        offset += size
+
+    node_count = header['node_count']
+    ids = strings[:header['id_count']]
+    names = strings[header['id_count']:]
+    types = [None if t == 'None' else t for t in header['resource_types']]
+    materializations = [None if m == 'None' else m for m in header['materializations']]
+    layers = [layer or None for layer in header['layers']]
+
+    graph = LineageGraph()
+    graph.sources = header['sources']
+    graph.nodes = {
+        ids[i]: {
+            'name': names[i],
+            'resource_type': types[resource_type],
+            'materialized': materializations[materialized],
+            'layer': layers[layer],
+        }
+        for i, resource_type, materialized, layer in zip(
+            range(node_count), arrays['resource_type'], arrays['materialized'], arrays['layer'],
+        )
+    }
+    graph.parents = {uid: [] for uid in ids[:node_count]}
+    graph.children = {uid: [] for uid in ids}
+    for child, parent in zip(arrays['edge_child'], arrays['edge_parent']):
+        graph.parents[ids[child]].append(ids[parent])
+        graph.children[ids[parent]].append(ids[child])
+    graph.name_index = {}
+    for uid, node in graph.nodes.items():
+        if node['resource_type'] == 'model':
+            graph.name_index.setdefault(node['name'], uid)
+    return header, graph
+
+def load_graph(manifest_path=MANIFEST_PATH, streaming=False, use_cache=True):
+    """
+    Return the lineage graph for a manifest, using the cache when valid.
+
+    The cache is reused when the manifest size and mtime match. When only
+    the mtime changed (dbt compile rewrote an identical file) the content
+    hash decides, and a hit refreshes the stored mtime so the next run
+    skips hashing again.
+    """
+    manifest_path = Path(manifest_path)
+    if not use_cache or not manifest_path.exists():
+        return LineageGraph.from_manifest(load_manifest(manifest_path, streaming))
+
+    cache_path = cache_path_for(manifest_path)
+    stat = manifest_path.stat()
+    cached = read_graph_cache(cache_path)
+    if cached is not None:
+        header, graph = cached
+        fingerprint = header['fingerprint']
+        if fingerprint['size'] == stat.st_size:
+            if fingerprint['mtime_ns'] == stat.st_mtime_ns:
+                return graph
+            if fingerprint['sha256'] == file_sha256(manifest_path):
+                fingerprint['mtime_ns'] = stat.st_mtime_ns
+                save_graph_cache(graph, cache_path, fingerprint)
+                return graph
+
+    graph = LineageGraph.from_manifest(load_manifest(manifest_path, streaming))
+    fingerprint = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(manifest_path),
+    }
+    try:
+        save_graph_cache(graph, cache_path, fingerprint)
+    except OSError as e:
+        print(f"Warning: could not write lineage cache: {e}")
+    return graph
+
+def iter_manifest_section(manifest_path, section):
+    """Yield (key, value) pairs of a manifest section, streaming when possible"""
+    ijson = import_ijson()
+    if ijson is None:
+        with open(manifest_path, 'r') as f:
+            yield from json.load(f).get(section, {}).items()
+        return
+
+    with open(manifest_path, 'rb') as f:
+        yield from ijson.kvitems(f, section, use_float=True)
+
+def node_signatures(manifest_path):
+    """
+    Return {unique_id: (resource_type, signature)} for a manifest.
+
+    The signature hashes the node's file checksum, its full config, its
+    upstream nodes and the SQL of every macro it calls, so any change that
+    can alter what dbt builds for the node changes the signature.
+    """
+    macro_hashes = {
+        key: hashlib.sha256((info.get('macro_sql') or '').encode('utf-8')).hexdigest()
+        for key, info in iter_manifest_section(manifest_path, 'macros')
+    }
+
+    signatures = {}
+    for key, info in iter_manifest_section(manifest_path, 'nodes'):
+        depends_on = info.get('depends_on') or {}
+        macros = sorted(depends_on.get('macros') or [])
+        payload = json.dumps([
+            (info.get('checksum') or {}).get('checksum'),
+            info.get('config') or {},
+            sorted(depends_on.get('nodes') or []),
+            [(macro, macro_hashes.get(macro)) for macro in macros],
+        ], sort_keys=True, default=str)
+        signatures[key] = (info.get('resource_type'), hashlib.sha256(payload.encode('utf-8')).hexdigest())
+    return signatures
+
+def diff_manifests(previous, current):
+    """Return the buildable unique_ids that are new or changed between two signature maps"""
+    return {
+        key for key, (resource_type, signature) in current.items()
+        if resource_type in DIFF_RESOURCE_TYPES
+        and previous.get(key, (None, None))[1] != signature
+    }
+
+def source_fed_models(graph):
+    """
+    Return the persisted models that read source data.
+
+    A model reads source data when it depends on a source directly or
+    through views and ephemeral models, which hold no data of their own.
+    """
+    live = set()
+    fed = set()
+    for uid in graph.topological_order():
+        node = graph.nodes[uid]
+        if node['resource_type'] == 'source':
+            live.add(uid)
+        elif node['resource_type'] == 'model' and any(dep in live for dep in graph.parents.get(uid, [])):
+            if node['materialized'] in LIVE_MATERIALIZATIONS:
+                live.add(uid)
+            else:
+                fed.add(uid)
+    return fed
+
+def select_changed_models(manifest_path, state_path, refresh_materializations=()):
+    """
+    Return the model names dbt run should build, or None for a full run.
+
+    A model is forced when it changed since the deployed manifest at
+    ``state_path``, when it is a table or incremental model reading source
+    data (which changes every night even when the code does not), or when
+    its materialization is listed in ``refresh_materializations``. The
+    selection is every forced model plus its transitive downstream closure,
+    so nothing built from a refreshed model is left stale.
+    """
+    state_path = Path(state_path)
+    if not state_path.exists():
+        return None
+
+    changed = diff_manifests(node_signatures(state_path), node_signatures(manifest_path))
+    graph = load_graph(manifest_path)
+    forced = changed | source_fed_models(graph)
+    forced.update(
+        uid for uid in graph.models()
+        if graph.nodes[uid]['materialized'] in refresh_materializations
+    )
+    impacted = graph.descendants(forced) | forced
+    return sorted(
+        graph.nodes[uid]['name'] for uid in impacted
+        if graph.nodes.get(uid, {}).get('resource_type') == 'model'
+    )
+
+class ClosureIndex:
+    """
+    Precomputed transitive closure over a lineage graph.
+
+    Nodes are numbered in topological order and every node gets two
+    bitsets (Python ints): its ancestors and its descendants. Reachability
+    is a single bit test, ancestor/descendant lists are a bitset decode and
+    shortest paths only search nodes that lie between the two endpoints.
+    Tests are leaves that nobody depends on, so they are left out of the
+    index by default to keep the bitsets small on large projects.
+    """
+
+    def __init__(self, graph, include_tests=False):
+        self.graph = graph
+        members = [
+            uid for uid, node in graph.nodes.items()
+            if include_tests or node['resource_type'] != 'test'
+        ]
+        self.ids = graph.topological_order(members)
+        self.position = {uid: i for i, uid in enumerate(self.ids)}
+
+        self.ancestor_bits = [0] * len(self.ids)
+        for i, uid in enumerate(self.ids):
+            bits = 0
+            for parent in graph.parents.get(uid, []):
+                j = self.position.get(parent)
+                if j is not None:
+                    bits |= self.ancestor_bits[j] | (1 << j)
+            self.ancestor_bits[i] = bits
+
+        self.descendant_bits = [0] * len(self.ids)
+        for i in range(len(self.ids) - 1, -1, -1):
+            bits = 0
+            for child in graph.children.get(self.ids[i], []):
+                j = self.position.get(child)
+                if j is not None:
+                    bits |= self.descendant_bits[j] | (1 << j)
+            self.descendant_bits[i] = bits
+
+    def _position(self, name_or_id):
+        uid = self.graph.resolve(name_or_id)
+        if uid not in self.position:
+            raise KeyError(f"Unknown node: {name_or_id}")
+        return self.position[uid]
+
+    def _decode(self, bits):
+        digits = bin(bits)[:1:-1]
+        return [self.ids[i] for i, digit in enumerate(digits) if digit == '1']
+
+    def ancestors(self, node):
+        """Return every upstream unique_id of a node"""
+        return self._decode(self.ancestor_bits[self._position(node)])
+
+    def descendants(self, node):
+        """Return every downstream unique_id of a node"""
+        return self._decode(self.descendant_bits[self._position(node)])
+
+    def is_reachable(self, target, source):
+        """Return True if target can be reached by following edges from source"""
+        return bool(self.ancestor_bits[self._position(target)] >> self._position(source) & 1)
+
+    def shortest_path(self, source, target):
+        """Return the shortest source -> target path as unique_ids, or None"""
+        start, end = self._position(source), self._position(target)
+        if start == end:
+            return [self.ids[start]]
+        if not self.ancestor_bits[end] >> start & 1:
+            return None
+
+        # Only nodes downstream of source and upstream of target can be on a path
+        between = self.descendant_bits[start] & self.ancestor_bits[end]
+        previous = {start: None}
+        frontier = [start]
+        while frontier and end not in previous:
+            next_frontier = []
+            for i in frontier:
+                for child in self.graph.children.get(self.ids[i], []):
+                    j = self.position.get(child)
+                    if j is None or j in previous:
+                        continue
+                    if j == end or between >> j & 1:
+                        previous[j] = i
+                        next_frontier.append(j)
+            frontier = next_frontier
+
+        path = []
+        step = end
+        while step is not None:
+            path.append(self.ids[step])
+            step = previous[step]
+        return path[::-1]
+
+    def query(self, op, node, other=None):
+        """Answer one query as a JSON-serializable dict"""
+        uid = self.graph.resolve(node)
+        if op == 'ancestors':
+            result = self.ancestors(node)
+        elif op == 'descendants':
+            result = self.descendants(node)
+        elif op == 'reachable':
+            return {'op': op, 'target': uid, 'source': self.graph.resolve(other),
+                    'reachable': self.is_reachable(node, other)}
+        elif op == 'path':
+            return {'op': op, 'source': uid, 'target': self.graph.resolve(other),
+                    'path': self.shortest_path(node, other)}
+        else:
+            raise ValueError(f"Unknown query: {op}")
+        return {'op': op, 'node': uid, 'count': len(result), 'nodes': result}
+
+def load_run_results(run_results_path=RUN_RESULTS_PATH):
+    """Return ({unique_id: execution_time}, threads) from dbt run_results.json"""
+    with open(run_results_path, 'r') as f:
+        run_results = json.load(f)
+    durations = {
+        result['unique_id']: float(result.get('execution_time') or 0.0)
+        for result in run_results.get('results', [])
+    }
+    return durations, (run_results.get('args') or {}).get('threads')
+
+def schedule_timings(graph, durations):
+    """
+    Overlay execution times on the DAG and compute critical-path timings.
+
+    Returns earliest/latest start per node, per-node slack, the unbounded
+    makespan (the critical path length) and the critical path itself.
+    Nodes missing from run_results count as zero-duration.
+    """
+    order = graph.topological_order()
+    earliest_start, earliest_finish = {}, {}
+    for uid in order:
+        start = max((earliest_finish[dep] for dep in graph.parents.get(uid, []) if dep in earliest_finish), default=0.0)
+        earliest_start[uid] = start
+        earliest_finish[uid] = start + durations.get(uid, 0.0)
+
+    makespan = max(earliest_finish.values(), default=0.0)
+    latest_start = {}
+    for uid in reversed(order):
+        finish = min((latest_start[child] for child in graph.children.get(uid, []) if child in latest_start), default=makespan)
+        latest_start[uid] = finish - durations.get(uid, 0.0)
+
+    critical_path = []
+    if earliest_finish:
+        step = max(earliest_finish, key=earliest_finish.get)
+        while step is not None:
+            critical_path.append(step)
+            step = next(
+                (dep for dep in graph.parents.get(step, [])
+                 if dep in earliest_finish and abs(earliest_finish[dep] - earliest_start[step]) < 1e-9
+                 and durations.get(dep, 0.0) > 0),
+                None,
+            )
+        critical_path.reverse()
+
+    return {
+        'earliest_start': earliest_start,
+        'latest_start': latest_start,
+        'slack': {uid: latest_start[uid] - earliest_start[uid] for uid in order},
+        'makespan': makespan,
+        'critical_path': critical_path,
+    }
+
+def simulate_makespan(graph, durations, threads):
+    """
+    Simulate a run with a fixed number of threads and return its makespan.
+
+    Ready nodes are started longest-remaining-path first, which is the best
+    a list scheduler can usually do, so the result is a lower bound for
+    what dbt will see at that thread count. Zero-duration nodes (sources,
+    nodes not in run_results) finish instantly without taking a thread.
+    """
+    order = graph.topological_order()
+    tail = {}
+    for uid in reversed(order):
+        tail[uid] = durations.get(uid, 0.0) + max(
+            (tail[child] for child in graph.children.get(uid, []) if child in tail), default=0.0,
+        )
+
+    pending = {uid: sum(1 for dep in graph.parents.get(uid, []) if dep in tail) for uid in order}
+    ready = [(-tail[uid], uid) for uid in order if pending[uid] == 0]
+    heapq.heapify(ready)
+    running = []
+    now = 0.0
+
+    def finish(uid):
+        for child in graph.children.get(uid, []):
+            if child in pending:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    heapq.heappush(ready, (-tail[child], child))
+
+    while ready or running:
+        while ready and (len(running) < threads or durations.get(ready[0][1], 0.0) == 0):
+            _, uid = heapq.heappop(ready)
+            if durations.get(uid, 0.0) == 0:
+                finish(uid)
+            else:
+                heapq.heappush(running, (now + durations[uid], uid))
+        if running:
+            now, uid = heapq.heappop(running)
+            finish(uid)
+    return now
+
+def recommend_threads(makespans, critical_length, tolerance=THREAD_TOLERANCE):
+    """Return the smallest thread count whose makespan is within tolerance of the critical path"""
+    for threads in sorted(makespans):
+        if makespans[threads] <= critical_length * (1 + tolerance):
+            return threads
+    return max(makespans)
+
+def critical_path_report(graph, durations, thread_counts=THREAD_COUNTS, current_threads=None):
+    """Build the critical-path, slack and thread-count report as a dict"""
+    timings = schedule_timings(graph, durations)
+    thread_counts = sorted(set(thread_counts) | ({current_threads} if current_threads else set()))
+    makespans = {threads: simulate_makespan(graph, durations, threads) for threads in thread_counts}
+    timed = [uid for uid in timings['slack'] if durations.get(uid, 0.0) > 0]
+    return {
+        'total_execution_time': sum(durations.get(uid, 0.0) for uid in timed),
+        'critical_path_length': timings['makespan'],
+        'critical_path': [
+            {'node': uid, 'execution_time': durations.get(uid, 0.0)} for uid in timings['critical_path']
+        ],
+        'slack': {
+            uid: {
+                'execution_time': durations[uid],
+                'earliest_start': timings['earliest_start'][uid],
+                'slack': timings['slack'][uid],
+            }
+            for uid in sorted(timed, key=lambda uid: timings['slack'][uid])
+        },
+        'makespan_by_threads': makespans,
+        'current_threads': current_threads,
+        'recommended_threads': recommend_threads(makespans, timings['makespan']),
+    }
+
+def print_critical_path_report(graph, report):
+    """Print the critical-path report"""
+    def name(uid):
+        return graph.nodes.get(uid, {}).get('name', uid)
+
+    print("\n⏱️  CRITICAL PATH ANALYSIS:")
+    print("-" * 40)
+    print(f"Total Execution Time: {report['total_execution_time']:.1f}s")
+    print(f"Critical Path Length: {report['critical_path_length']:.1f}s")
+    for step in report['critical_path']:
+        print(f"  └─ {name(step['node'])} ({step['execution_time']:.1f}s)")
+
+    print("\nSlack per node (seconds a node can slip without delaying the run):")
+    for uid, timing in report['slack'].items():
+        print(f"  • {name(uid):<40} {timing['execution_time']:>8.1f}s  slack {timing['slack']:>8.1f}s")
+
+    print("\nTheoretical makespan by threads:")
+    for threads, makespan in report['makespan_by_threads'].items():
+        marker = " (current)" if threads == report['current_threads'] else ""
+        print(f"  threads={threads:<3} {makespan:>8.1f}s{marker}")
+    print(f"Recommended threads: {report['recommended_threads']}")
+
+def analyze_lineage(graph):
     """Analyze the dbt project lineage"""
-    
-    # Extract models and their dependencies
-    models = manifest.get('nodes', {})
-    sources = manifest.get('sources', {})
-    
+
+    nodes = graph.nodes
+
     print("=" * 80)
     print("SCV PROJECT DBT LINEAGE ANALYSIS")
     print("=" * 80)
-    
+
     # Analyze sources
     print("\n📊 DATA SOURCES:")
     print("-" * 40)
-    for source_key, source_info in sources.items():
+    for source_key, source_info in graph.sources.items():
         if source_info.get('resource_type') == 'source':
             print(f"• {source_info['name']} ({source_info['source_name']})")
             print(f"  - Database: {source_info.get('database', 'N/A')}")
             print(f"  - Schema: {source_info.get('schema', 'N/A')}")
             print(f"  - Tables: {len(source_info.get('tables', []))}")
-    
+
     # Analyze models by layer
-    bronze_models = []
-    silver_models = []
-    gold_models = []
-    
-    for model_key, model_info in models.items():
-        if model_info.get('resource_type') == 'model':
-            model_name = model_info['name']
-            if model_name.startswith('bronze'):
-                bronze_models.append(model_info)
-            elif model_name.startswith('silver'):
-                silver_models.append(model_info)
-            elif model_name.startswith('gold'):
-                gold_models.append(model_info)
-    
+    bronze_models = graph.models('bronze')
+    silver_models = graph.models('silver')
+    gold_models = graph.models('gold')
+
     print(f"\n🏗️  BRONZE LAYER ({len(bronze_models)} models):")
     print("-" * 40)
     for model in bronze_models:
-        print(f"• {model['name']}")
-        print(f"  - Materialization: {model.get('config', {}).get('materialized', 'view')}")
-        print(f"  - Dependencies: {len(model.get('depends_on', {}).get('nodes', []))}")
-    
+        print(f"• {nodes[model]['name']}")
+        print(f"  - Materialization: {nodes[model]['materialized']}")
+        print(f"  - Dependencies: {len(graph.parents[model])}")
+
     print(f"\n⚡ SILVER LAYER ({len(silver_models)} models):")
     print("-" * 40)
     for model in silver_models:
-        print(f"• {model['name']}")
-        print(f"  - Materialization: {model.get('config', {}).get('materialized', 'view')}")
-        deps = model.get('depends_on', {}).get('nodes', [])
-        print(f"  - Dependencies: {len(deps)}")
-        for dep in deps:
-            if 'model.' in dep:
-                dep_name = dep.split('.')[-1]
-                print(f"    └─ {dep_name}")
-    
+        print(f"• {nodes[model]['name']}")
+        print(f"  - Materialization: {nodes[model]['materialized']}")
+        print(f"  - Dependencies: {len(graph.parents[model])}")
+        for dep in graph.model_parents(model):
+            print(f"    └─ {dep.split('.')[-1]}")
+
     print(f"\n🎯 GOLD LAYER ({len(gold_models)} models):")
     print("-" * 40)
     for model in gold_models:
-        print(f"• {model['name']}")
-        print(f"  - Materialization: {model.get('config', {}).get('materialized', 'view')}")
-        deps = model.get('depends_on', {}).get('nodes', [])
-        print(f"  - Dependencies: {len(deps)}")
-        for dep in deps:
-            if 'model.' in dep:
-                dep_name = dep.split('.')[-1]
-                print(f"    └─ {dep_name}")
-    
+        print(f"• {nodes[model]['name']}")
+        print(f"  - Materialization: {nodes[model]['materialized']}")
+        print(f"  - Dependencies: {len(graph.parents[model])}")
+        for dep in graph.model_parents(model):
+            print(f"    └─ {dep.split('.')[-1]}")
+
     # Analyze data flow
     print(f"\n🔄 DATA FLOW ANALYSIS:")
     print("-" * 40)
-    
-    # Find the gold model and trace its lineage
-    if gold_models:
-        gold_model = gold_models[0]
-        print(f"Gold Model: {gold_model['name']}")
-        
-        def trace_lineage(model_key, level=0):
-            model_info = models.get(model_key)
-            if not model_info:
-                return
-            
-            indent = "  " * level
-            print(f"{indent}└─ {model_info['name']} ({model_info.get('config', {}).get('materialized', 'view')})")
-            
-            deps = model_info.get('depends_on', {}).get('nodes', [])
-            for dep in deps:
-                if 'model.' in dep:
-                    trace_lineage(dep, level + 1)
-        
-        deps = gold_model.get('depends_on', {}).get('nodes', [])
-        for dep in deps:
-            if 'model.' in dep:
-                trace_lineage(dep, 1)
-    
+
+    # Trace the lineage of every gold model; shared ancestors are only expanded once
+    traced = set()
+
+    def trace_lineage(model_key, level=0):
+        model_info = nodes.get(model_key)
+        if not model_info:
+            return
+
+        indent = "  " * level
+        if model_key in traced:
+            print(f"{indent}└─ {model_info['name']} (see above)")
+            return
+        traced.add(model_key)
+        print(f"{indent}└─ {model_info['name']} ({model_info['materialized']})")
+
+        for dep in graph.model_parents(model_key):
+            trace_lineage(dep, level + 1)
+
+    for gold_model in gold_models:
+        print(f"Gold Model: {nodes[gold_model]['name']}")
+        for dep in graph.model_parents(gold_model):
+            trace_lineage(dep, 1)
+
     # Performance analysis
     print(f"\n⚡ PERFORMANCE METRICS:")
     print("-" * 40)
-    
+
     total_models = len(bronze_models) + len(silver_models) + len(gold_models)
     print(f"Total Models: {total_models}")
     print(f"Bronze Models: {len(bronze_models)} (Views)")
     print(f"Silver Models: {len(silver_models)} (Tables)")
     print(f"Gold Models: {len(gold_models)} (Tables)")
-    
+
     # Calculate complexity
-    max_deps = 0
-    for model in models.values():
-        if model.get('resource_type') == 'model':
-            deps = len(model.get('depends_on', {}).get('nodes', []))
-            max_deps = max(max_deps, deps)
-    
+    max_deps = max((len(graph.parents[model]) for model in graph.models()), default=0)
     print(f"Maximum Dependencies: {max_deps}")
-    
+
     # Data quality coverage
-    tests = [node for node in models.values() if node.get('resource_type') == 'test']
-    print(f"Data Quality Tests: {len(tests)}")
+    print(f"Data Quality Tests: {len(graph.of_type('test'))}")
 
-def generate_dependency_matrix(manifest):
+def generate_dependency_matrix(graph):
     """Generate a dependency matrix for the models"""
-    
-    models = manifest.get('nodes', {})
-    
+
     print(f"\n📋 DEPENDENCY MATRIX:")
     print("-" * 80)
-    
-    # Get all model names
-    model_names = []
-    for model_key, model_info in models.items():
-        if model_info.get('resource_type') == 'model':
-            model_names.append(model_info['name'])
-    
-    model_names.sort()
-    
+
+    model_ids = sorted(graph.models(), key=lambda uid: graph.nodes[uid]['name'])
+    model_names = [graph.nodes[uid]['name'] for uid in model_ids]
+
     # Print header
     print(f"{'Model':<25}", end="")
     for dep in model_names:
         print(f"{dep[:8]:<10}", end="")
     print()
     print("-" * (25 + len(model_names) * 10))
-    
+
     # Print matrix
-    for model_name in model_names:
+    for model_id, model_name in zip(model_ids, model_names):
         print(f"{model_name:<25}", end="")
-        
-        # Find the model info
-        model_info = None
-        for model_key, info in models.items():
-            if info.get('resource_type') == 'model' and info['name'] == model_name:
-                model_info = info
-                break
-        
-        if model_info:
-            deps = model_info.get('depends_on', {}).get('nodes', [])
-            for dep_name in model_names:
-                has_dep = any(dep_name in dep for dep in deps)
-                print(f"{'✓' if has_dep else ' ':>9}", end="")
+        deps = set(graph.parents[model_id])
+        for dep_id in model_ids:
+            print(f"{'✓' if dep_id in deps else ' ':>9}", end="")
         print()
 
-def main():
+def generate_edge_list(graph):
+    """Generate a sparse model-to-model edge list for large projects"""
+
+    model_ids = sorted(graph.models(), key=lambda uid: graph.nodes[uid]['name'])
+    edge_count = sum(len(graph.model_parents(uid)) for uid in model_ids)
+
+    print(f"\n📋 DEPENDENCY EDGES ({len(model_ids)} models, {edge_count} edges):")
+    print("-" * 80)
+
+    for model_id in model_ids:
+        for dep in graph.model_parents(model_id):
+            print(f"{graph.nodes[dep]['name']} -> {graph.nodes[model_id]['name']}")
+
+def print_dependencies(graph, output_format='auto'):
+    """Print the matrix or the edge list depending on project size"""
+    if output_format == 'auto':
+        output_format = 'matrix' if len(graph.models()) <= MATRIX_MAX_MODELS else 'edges'
+
+    if output_format == 'matrix':
+        generate_dependency_matrix(graph)
+    else:
+        generate_edge_list(graph)
+
+def synthetic_manifest(node_count, fan_in=3, test_ratio=0.4):
+    """Build a layered synthetic manifest with roughly node_count nodes"""
+    model_count = max(3, int(node_count * (1 - test_ratio)))
+    test_count = node_count - model_count
+    per_layer = max(1, model_count // len(LAYERS))
+
+    nodes = {}
+    sources = {
+        'source.scv.bronze.RAW': {
+            'resource_type': 'source', 'name': 'RAW', 'source_name': 'bronze',
+        }
+    }
+    previous = ['source.scv.bronze.RAW']
+    model_ids = []
+    for layer in LAYERS:
+        current = []
+        for i in range(per_layer):
+            unique_id = f'model.scv.{layer}_model_{i}'
+            deps = [previous[(i * 7 + k) % len(previous)] for k in range(min(fan_in, len(previous)))]
+            nodes[unique_id] = {
+                'resource_type': 'model',
+                'name': f'{layer}_model_{i}',
+                'config': {'materialized': 'view' if layer == 'bronze' else 'table'},
+                'depends_on': {'nodes': sorted(set(deps))},
+            }
+            current.append(unique_id)
+        model_ids.extend(current)
+        previous = current
+
+    for i in range(test_count):
+        target = model_ids[i % len(model_ids)]
+        nodes[f'test.scv.not_null_{i}'] = {
+            'resource_type': 'test',
+            'name': f'not_null_{i}',
+            'config': {'materialized': 'test'},
+            'depends_on': {'nodes': [target]},
+        }
+    return {'nodes': nodes, 'sources': sources}
+
+def run_benchmark(sizes=(100, 1000, 10000, 50000)):
+    """Time graph construction and reporting on synthetic manifests"""
+    print(f"{'Nodes':>8} {'Build (s)':>12} {'Analyze (s)':>12} {'Edges (s)':>12} {'Index (s)':>12}")
+    print("-" * 61)
+    for size in sizes:
+        manifest = synthetic_manifest(size)
+        sink = io.StringIO()
+
+        start = time.perf_counter()
+        graph = LineageGraph.from_manifest(manifest)
+        built = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            analyze_lineage(graph)
+        analyzed = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            generate_edge_list(graph)
+        listed = time.perf_counter()
+        ClosureIndex(graph)
+        indexed = time.perf_counter()
+
+        print(
+            f"{size:>8} {built - start:>12.4f} {analyzed - built:>12.4f} "
+            f"{listed - analyzed:>12.4f} {indexed - listed:>12.4f}"
+        )
+
+def run_cache_benchmark(sizes=(100, 1000, 10000, 50000)):
+    """
+    Compare cold and warm graph loads and check cache invalidation.
+
+    Each synthetic manifest is written to a temporary target/ directory.
+    After the cold and warm timings the manifest is touched (same content,
+    new mtime) and then rewritten with one extra edge, and the loaded graph
+    is checked against the manifest each time.
+    """
+    print(f"{'Nodes':>8} {'Cold (s)':>10} {'Warm (s)':>10} {'Touched (s)':>12} {'Changed (s)':>12} {'Speedup':>8}")
+    print("-" * 66)
+    for size in sizes:
+        manifest = synthetic_manifest(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_path = Path(tmp) / 'manifest.json'
+            manifest_path.write_text(json.dumps(manifest))
+
+            start = time.perf_counter()
+            cold = load_graph(manifest_path)
+            cold_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            warm = load_graph(manifest_path)
+            warm_time = time.perf_counter() - start
+            if warm.parents != cold.parents or warm.nodes != cold.nodes:
+                raise RuntimeError("warm cache differs from manifest")
+
+            stat = manifest_path.stat()
+            os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            start = time.perf_counter()
+            touched = load_graph(manifest_path)
+            touched_time = time.perf_counter() - start
+            if touched.parents != cold.parents:
+                raise RuntimeError("touched manifest loaded a different graph")
+
+            gold = sorted(cold.models('gold'))[0]
+            manifest['nodes'][gold]['depends_on']['nodes'].append('model.scv.bronze_model_0')
+            manifest_path.write_text(json.dumps(manifest))
+            start = time.perf_counter()
+            changed = load_graph(manifest_path)
+            changed_time = time.perf_counter() - start
+            if 'model.scv.bronze_model_0' not in changed.parents[gold]:
+                raise RuntimeError("changed manifest served a stale cache")
+
+        speedup = cold_time / warm_time if warm_time else float('inf')
+        print(f"{size:>8} {cold_time:>10.4f} {warm_time:>10.4f} {touched_time:>12.4f} {changed_time:>12.4f} {speedup:>7.1f}x")
+
+def print_changed_selection(args):
+    """
+    Print the changed-model selection for scv_dbt_pipeline.
+
+    The last line is what the DAG reads: ``all`` for a full run, ``none``
+    when nothing changed, otherwise ``--select`` followed by model names.
+    """
+    selection = None if args.full else select_changed_models(args.manifest, args.state, args.refresh)
+    if selection is None:
+        print("No deployed state found or full run requested - building every model")
+        print("all")
+    elif not selection:
+        print("No models changed since the last deployment")
+        print("none")
+    else:
+        print(f"{len(selection)} models selected for rebuild")
+        print("--select " + " ".join(selection))
+
+def run_queries(graph, args):
+    """Answer closure queries from the command line or stdin as JSON"""
+    index = ClosureIndex(graph)
+    if args.command != 'query':
+        try:
+            if args.command in ('ancestors', 'descendants'):
+                response = index.query(args.command, args.node)
+            elif args.command == 'reachable':
+                response = index.query('reachable', args.target, args.source)
+            else:
+                response = index.query('path', args.source, args.target)
+        except KeyError as e:
+            print(json.dumps({'error': e.args[0]}))
+            sys.exit(1)
+        print(json.dumps(response, indent=2))
+        return
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            response = index.query(request['op'], request['node'], request.get('other'))
+        except (KeyError, ValueError) as e:
+            response = {'error': e.args[0] if e.args else str(e)}
+        print(json.dumps(response), flush=True)
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="SCV dbt lineage analysis")
+    subparsers = parser.add_subparsers(dest='command')
+
+    manifest_args = argparse.ArgumentParser(add_help=False)
+    manifest_args.add_argument(
+        '--manifest', default=str(MANIFEST_PATH),
+        help="Path to the dbt manifest.json",
+    )
+    manifest_args.add_argument(
+        '--streaming', action='store_true',
+        help="Parse the manifest incrementally, keeping only lineage fields",
+    )
+    manifest_args.add_argument(
+        '--no-cache', dest='use_cache', action='store_false',
+        help="Ignore and do not write the lineage cache under target/",
+    )
+
+    report = subparsers.add_parser(
+        'report', parents=[manifest_args], help="Print the lineage report (default)",
+    )
+    report.add_argument(
+        '--format', choices=['auto', 'matrix', 'edges'], default='auto',
+        help="Dependency output: matrix for small projects, edges for large ones",
+    )
+
+    benchmark = subparsers.add_parser('benchmark', help="Benchmark the graph on synthetic manifests")
+    benchmark.add_argument(
+        '--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000],
+        help="Synthetic manifest sizes in nodes",
+    )
+    benchmark.add_argument(
+        '--cache', action='store_true',
+        help="Benchmark cold versus warm loads through the lineage cache",
+    )
+
+    select = subparsers.add_parser(
+        'select-changed',
+        help="Print the dbt --select list for models changed since the deployed manifest",
+    )
+    select.add_argument(
+        '--manifest', default=str(MANIFEST_PATH),
+        help="Path to the current dbt manifest.json",
+    )
+    select.add_argument(
+        '--state', required=True,
+        help="Path to the manifest.json of the last successful deployment",
+    )
+    select.add_argument(
+        '--refresh', nargs='*', default=[], metavar='MATERIALIZATION',
+        help="Materializations to rebuild on every run (e.g. incremental)",
+    )
+    select.add_argument(
+        '--full', action='store_true',
+        help="Ignore the state and select every model (e.g. for a full refresh)",
+    )
+
+    for op, help_text in (
+        ('ancestors', "List every upstream node of NODE as JSON"),
+        ('descendants', "List every downstream node of NODE as JSON"),
+    ):
+        query = subparsers.add_parser(op, parents=[manifest_args], help=help_text)
+        query.add_argument('node', help="Model name or unique_id")
+
+    for op, help_text in (
+        ('reachable', "Report whether TARGET is reachable from SOURCE as JSON"),
+        ('path', "Print the shortest SOURCE -> TARGET path as JSON"),
+    ):
+        query = subparsers.add_parser(op, parents=[manifest_args], help=help_text)
+        query.add_argument('source', help="Model name or unique_id")
+        query.add_argument('target', help="Model name or unique_id")
+
+    critical = subparsers.add_parser(
+        'critical-path', parents=[manifest_args],
+        help="Report the critical path, slack and makespan by threads from run_results.json",
+    )
+    critical.add_argument(
+        '--run-results', default=str(RUN_RESULTS_PATH),
+        help="Path to dbt run_results.json",
+    )
+    critical.add_argument(
+        '--threads', type=int, nargs='+', default=list(THREAD_COUNTS),
+        help="Thread counts to simulate",
+    )
+    critical.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    subparsers.add_parser(
+        'query', parents=[manifest_args],
+        help="Answer JSON-lines queries from stdin against one index "
+             '(e.g. {"op": "path", "node": "a", "other": "b"})',
+    )
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in subparsers.choices and argv[0] not in ('-h', '--help'):
+        argv.insert(0, 'report')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function"""
+    args = parse_args(argv)
     try:
-        manifest = load_manifest()
-        analyze_lineage(manifest)
-        generate_dependency_matrix(manifest)
-        
+        if args.command == 'benchmark':
+            if args.cache:
+                run_cache_benchmark(args.sizes)
+            else:
+                run_benchmark(args.sizes)
+            return
+
+        if args.command == 'select-changed':
+            print_changed_selection(args)
+            return
+
+        graph = load_graph(args.manifest, args.streaming, args.use_cache)
+
+        if args.command in QUERY_COMMANDS:
+            run_queries(graph, args)
+            return
+
+        if args.command == 'critical-path':
+            durations, current_threads = load_run_results(args.run_results)
+            report = critical_path_report(graph, durations, args.threads, current_threads)
+            if args.json:
+                print(json.dumps(report, indent=2))
+            else:
+                print_critical_path_report(graph, report)
+            return
+
+        analyze_lineage(graph)
+        print_dependencies(graph, args.format)
+
         print(f"\n✅ Lineage analysis completed!")
         print(f"📊 Generated files:")
         print(f"   • scv_lineage_graph.svg - Visual lineage graph")
         print(f"   • dbt docs available at http://localhost:8081")
-        
+
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
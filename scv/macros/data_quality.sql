@@ -0,0 +1,181 @@
+-- Fused data quality macros for SCV project
+-- Every check is a row predicate on one model, and all checks on a model are
+-- evaluated in a single pass with conditional aggregation
+
+{% macro data_quality_checks() %}
+    {#-
+        Passes run in order; a pass may join helper CTEs and earlier passes.
+        group_by keeps one row per key so later passes can join it (the weather
+        pass doubles as the list of covered postal codes). Passes that another
+        pass joins are never sampled, so a sample cannot invent missing keys.
+    -#}
+    {% do return({
+        'helpers': [
+            {
+                'name': 'legacy_keys',
+                'sql': "SELECT email, postal_code, COUNT(DISTINCT customer_id) as legacy_customers, MIN(customer_id) as any_customer_id FROM " ~ ref('bronze_legacy_customers') ~ " GROUP BY email, postal_code",
+            },
+        ],
+        'passes': [
+            {
+                'model': 'bronze_weather',
+                'group_by': 'postal_code',
+                'sampleable': false,
+                'checks': [
+                    {
+                        'name': 'Validate weather data freshness',
+                        'severity': 'error',
+                        'predicate': "t.date_valid_std < DATEADD('day', -7, CURRENT_DATE())",
+                    },
+                    {
+                        'name': 'Validate temperature ranges are reasonable',
+                        'severity': 'error',
+                        'predicate': "t.avg_temperature_air_2m_f < -50 OR t.avg_temperature_air_2m_f > 130",
+                    },
+                ],
+            },
+            {
+                'model': 'bronze_customers',
+                'sampleable': true,
+                'joins': [
+                    "LEFT JOIN legacy_keys legacy ON t.email = legacy.email AND t.postal_code = legacy.postal_code",
+                    "LEFT JOIN bronze_weather_pass weather ON t.postal_code = weather.postal_code",
+                ],
+                'checks': [
+                    {
+                        'name': 'Ensure all customers have valid email addresses',
+                        'severity': 'error',
+                        'predicate': "t.email IS NOT NULL AND t.email NOT REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'",
+                    },
+                    {
+                        'name': 'Validate postal code format (US 5-digit format)',
+                        'severity': 'warn',
+                        'predicate': "t.postal_code IS NOT NULL AND t.postal_code NOT REGEXP '^[0-9]{5}$'",
+                    },
+                    {
+                        'name': 'Check for duplicate customer records across sources',
+                        'severity': 'error',
+                        'predicate': "legacy.email IS NOT NULL AND NOT (legacy.legacy_customers = 1 AND legacy.any_customer_id = t.customer_id)",
+                    },
+                    {
+                        'name': 'Check for customers without weather data',
+                        'severity': 'warn',
+                        'predicate': "weather.postal_code IS NULL",
+                    },
+                ],
+            },
+            {
+                'model': 'gold_customer_kpis',
+                'sampleable': false,
+                'checks': [
+                    {
+                        'name': 'Check for missing regions in gold layer',
+                        'severity': 'warn',
+                        'predicate': "t.total_customers = 0",
+                    },
+                ],
+            },
+        ],
+        'aggregate_checks': [
+            {
+                'name': 'Validate data completeness in silver layer',
+                'severity': 'error',
+                'model': 'silver_customer_weather',
+                'condition': "(SELECT COUNT(*) FROM " ~ ref('silver_customer_weather') ~ ") < bronze_customers_totals.scanned_rows * 0.9",
+            },
+        ],
+    }) %}
+{% endmacro %}
+
+{% macro fused_data_quality_checks(sample_pct=none, only=none, include_passing=false) %}
+    {#-
+        Returns one row per failing check with its model, severity, failure
+        count and scanned rows. sample_pct evaluates sampleable passes on a
+        Bernoulli sample and skips aggregate checks, which need full counts.
+        only limits the checks to a list of names; include_passing also
+        returns checks with no failures.
+    -#}
+    {%- set definitions = data_quality_checks() -%}
+    {%- set results = [] -%}
+    {%- set aggregate_checks = [] -%}
+    {%- for check in definitions['aggregate_checks'] if sample_pct is none and (only is none or check['name'] in only) -%}
+        {%- do aggregate_checks.append(check) -%}
+    {%- endfor -%}
+WITH
+    {%- for helper in definitions['helpers'] %}
+{{ helper['name'] }} AS (
+    {{ helper['sql'] }}
+),
+    {%- endfor %}
+    {%- for pass in definitions['passes'] %}
+        {%- set sampled = sample_pct is not none and pass['sampleable'] %}
+{{ pass['model'] }}_pass AS (
+    SELECT
+        {%- if pass.get('group_by') %}
+        t.{{ pass['group_by'] }},
+        {%- endif %}
+        COUNT(*) as scanned_rows
+        {%- for check in pass['checks'] %}
+        , COUNT_IF({{ check['predicate'] }}) as check_{{ loop.index }}
+        {%- if only is none or check['name'] in only %}
+            {%- do results.append({'check': check, 'model': pass['model'], 'column': 'check_' ~ loop.index, 'sampled': sampled}) %}
+        {%- endif %}
+        {%- endfor %}
+    FROM {{ ref(pass['model']) }} t{% if sampled %} SAMPLE ({{ sample_pct }}){% endif %}
+    {%- for join in pass.get('joins', []) %}
+    {{ join }}
+    {%- endfor %}
+    {%- if pass.get('group_by') %}
+    GROUP BY t.{{ pass['group_by'] }}
+    {%- endif %}
+),
+
+{{ pass['model'] }}_totals AS (
+    SELECT
+        SUM(scanned_rows) as scanned_rows
+        {%- for check in pass['checks'] %}
+        , SUM(check_{{ loop.index }}) as check_{{ loop.index }}
+        {%- endfor %}
+    FROM {{ pass['model'] }}_pass
+),
+    {%- endfor %}
+
+check_results AS (
+    {%- for result in results %}
+    SELECT
+        '{{ result['check']['name'] }}' as check_name,
+        '{{ result['model'] }}' as model_name,
+        '{{ result['check']['severity'] }}' as severity,
+        COALESCE({{ result['column'] }}, 0) as failures,
+        COALESCE(scanned_rows, 0) as scanned_rows,
+        {{ 'TRUE' if result['sampled'] else 'FALSE' }} as sampled
+    FROM {{ result['model'] }}_totals
+    {%- if not loop.last %}
+    UNION ALL
+    {%- endif %}
+    {%- endfor %}
+    {%- for check in aggregate_checks %}
+    {%- if results or not loop.first %}
+    UNION ALL
+    {%- endif %}
+    SELECT
+        '{{ check['name'] }}' as check_name,
+        '{{ check['model'] }}' as model_name,
+        '{{ check['severity'] }}' as severity,
+        CASE WHEN {{ check['condition'] }} THEN 1 ELSE 0 END as failures,
+        bronze_customers_totals.scanned_rows as scanned_rows,
+        FALSE as sampled
+    FROM bronze_customers_totals
+    {%- endfor %}
+    {%- if not results and not aggregate_checks %}
+    SELECT NULL as check_name, NULL as model_name, NULL as severity, 0 as failures, 0 as scanned_rows, FALSE as sampled
+    WHERE 1 = 0
+    {%- endif %}
+)
+
+SELECT check_name, model_name, severity, failures, scanned_rows, sampled
+FROM check_results
+{%- if not include_passing %}
+WHERE failures > 0
+{%- endif %}
+{% endmacro %}
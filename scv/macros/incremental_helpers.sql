@@ -0,0 +1,14 @@
+-- Incremental maintenance macros for SCV project
+-- These macros run as post-hooks to keep incremental models consistent
+
+{% macro silver_weather_remove_customers() %}
+    -- Drop customers no longer in bronze_customers; merges only add or update rows
+    DELETE FROM {{ this }}
+    WHERE customer_id NOT IN (
+        SELECT customer_id
+        FROM {{ ref('bronze_customers') }}
+        WHERE customer_id IS NOT NULL
+          AND postal_code IS NOT NULL
+    )
+{% endmacro %}
+
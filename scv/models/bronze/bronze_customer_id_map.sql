@@ -0,0 +1,15 @@
+{{ config(
+    materialized='view'
+) }}
+
+-- Golden customer_id mapping from entity_resolution.py, one row per source record.
+-- Records are matched within blocks of postal code, email domain and name
+-- phonetics, so case, whitespace and typo variants of a customer across D365
+-- and the legacy export share one golden_customer_id.
+
+SELECT
+    source_system,
+    customer_id,
+    golden_customer_id,
+    cluster_size
+FROM {{ source('bronze', 'CUSTOMER_ID_MAP') }}
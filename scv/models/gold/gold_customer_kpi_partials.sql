@@ -0,0 +1,69 @@
+{{ config(
+    materialized='table'
+) }}
+
+-- Per-region aggregates behind gold_customer_kpis
+-- One row per region holding sums and counts over its customers, which
+-- gold_customer_kpis turns into averages. Silver has one row per customer,
+-- so every count is a count of distinct customers.
+--
+-- Rebuilt as a table in a single pass over silver. With a few dozen regions,
+-- a night's changes touch nearly every region, so a merge of re-aggregated
+-- regions would still scan silver and rewrite almost every row; and silver's
+-- merge overwrites the values a customer contributed before, so there is no
+-- delta to maintain the sums from.
+
+{{ log("Starting execution of model: gold_customer_kpi_partials", info=true) }}
+
+WITH customer_weather_data AS (
+    SELECT
+        {{ dbt_utils.generate_surrogate_key(['region']) }} as partial_key,
+        region,
+        customer_id,
+        avg_temperature_air_2m_f,
+        probability_of_precipitation_pct,
+        hot_days,
+        cold_days,
+        rainy_days,
+        data_completeness_status
+    FROM {{ ref('silver_customer_weather') }}
+    WHERE region IS NOT NULL  -- Ensure we have valid region data
+),
+
+partials AS (
+    SELECT
+        partial_key,
+        region,
+        COUNT(*) as customer_count,
+        SUM(avg_temperature_air_2m_f) as temp_sum,
+        COUNT(avg_temperature_air_2m_f) as temp_count,
+        SUM(probability_of_precipitation_pct) as rain_chance_sum,
+        COUNT(probability_of_precipitation_pct) as rain_chance_count,
+        COUNT(CASE WHEN data_completeness_status = 'Complete data' THEN 1 END) as complete_customers,
+        COUNT(CASE WHEN data_completeness_status != 'Complete data' THEN 1 END) as incomplete_customers,
+        -- Customers with at least one such day in the weather window
+        COUNT(CASE WHEN hot_days > 0 THEN 1 END) as hot_weather_customers,
+        COUNT(CASE WHEN cold_days > 0 THEN 1 END) as cold_weather_customers,
+        COUNT(CASE WHEN rainy_days > 0 THEN 1 END) as rainy_weather_customers
+    FROM customer_weather_data
+    GROUP BY partial_key, region
+)
+
+SELECT
+    partial_key,
+    region,
+    customer_count,
+    temp_sum,
+    temp_count,
+    rain_chance_sum,
+    rain_chance_count,
+    complete_customers,
+    incomplete_customers,
+    hot_weather_customers,
+    cold_weather_customers,
+    rainy_weather_customers,
+    -- Add audit columns
+    CURRENT_TIMESTAMP() as _dbt_loaded_at
+FROM partials
+
+{{ log("Completed execution of model: gold_customer_kpi_partials", info=true) }}
@@ -6,35 +6,26 @@
 -- Enhanced gold layer with regional customer KPIs and weather metrics
 -- This model provides business intelligence insights by region
 -- Includes error handling, data quality checks, and debugging capabilities
+-- Derived from gold_customer_kpi_partials, which already holds one row of
+-- sums and counts per region, so a rebuild reads one row per region instead
+-- of the silver table and only turns the sums into averages
 
 {{ log("Starting execution of model: gold_customer_kpis", info=true) }}
 
-WITH customer_weather_data AS (
-    SELECT 
-        region,
-        customer_id,
-        avg_temperature_air_2m_f,
-        probability_of_precipitation_pct,
-        data_completeness_status
-    FROM {{ ref('silver_customer_weather') }}
-    WHERE region IS NOT NULL  -- Ensure we have valid region data
-),
-
-regional_stats AS (
+WITH regional_stats AS (
     SELECT
         region,
-        COUNT(DISTINCT customer_id) AS total_customers,
-        AVG(avg_temperature_air_2m_f) AS avg_temp_f,
-        AVG(probability_of_precipitation_pct) AS avg_rain_chance_pct,
+        customer_count AS total_customers,
+        temp_sum / NULLIF(temp_count, 0) AS avg_temp_f,
+        rain_chance_sum / NULLIF(rain_chance_count, 0) AS avg_rain_chance_pct,
         -- Additional business metrics
-        COUNT(CASE WHEN data_completeness_status = 'Complete data' THEN 1 END) as customers_with_complete_data,
-        COUNT(CASE WHEN data_completeness_status != 'Complete data' THEN 1 END) as customers_with_incomplete_data,
+        complete_customers as customers_with_complete_data,
+        incomplete_customers as customers_with_incomplete_data,
         -- Weather-based customer segments
-        COUNT(CASE WHEN avg_temperature_air_2m_f > 80 THEN 1 END) as customers_in_hot_weather,
-        COUNT(CASE WHEN avg_temperature_air_2m_f < 32 THEN 1 END) as customers_in_cold_weather,
-        COUNT(CASE WHEN probability_of_precipitation_pct > 50 THEN 1 END) as customers_in_rainy_weather
-    FROM customer_weather_data
-    GROUP BY region
+        hot_weather_customers as customers_in_hot_weather,
+        cold_weather_customers as customers_in_cold_weather,
+        rainy_weather_customers as customers_in_rainy_weather
+    FROM {{ ref('gold_customer_kpi_partials') }}
 ),
 
 final_kpis AS (
@@ -1,17 +1,37 @@
 {{ config(
-    materialized='table', 
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='customer_id',
     enabled=True,
-    on_schema_change='sync_all_columns'
+    on_schema_change='sync_all_columns',
+    post_hook=[
+        "{{ silver_weather_remove_customers() }}"
+    ]
 ) }}
 
 -- Enhanced silver layer combining customer data with weather forecasts
 -- This model joins customer data with weather data for location-based analysis
 -- Includes error handling, data quality checks, and debugging capabilities
+--
+-- One row per customer: each customer joins the single row of their postal
+-- code in silver_weather_postal_summary, which holds the weather window's
+-- aggregates, so the table grows with customers and not with forecast days.
+-- golden_customer_id comes from the entity resolution mapping and is shared
+-- by every D365 and legacy record of the same customer.
+--
+-- Incremental: rows are merged on customer_id. Each run only rebuilds new
+-- customers, customers updated since they were merged (including postal code
+-- moves), customers whose golden id changed and customers whose postal
+-- code's weather summary changed, e.g. as the window rolls forward or
+-- forecasts are revised. Customers removed from bronze_customers are deleted
+-- by the post-hook. Use
+-- `dbt run --full-refresh --select silver_customer_weather` to rebuild
+-- from scratch.
 
 {{ log("Starting execution of model: silver_customer_weather", info=true) }}
 
 WITH customer_data AS (
-    SELECT 
+    SELECT
         customer_id,
         first_name,
         last_name,
@@ -24,32 +44,49 @@ WITH customer_data AS (
     WHERE postal_code IS NOT NULL  -- Ensure we have location data for weather join
 ),
 
-weather_data AS (
-    SELECT 
+weather_summary AS (
+    SELECT
         postal_code,
-        date_valid_std,
-        -- Handle missing weather data
-        COALESCE(avg_temperature_air_2m_f, 0) as avg_temperature_air_2m_f,
-        COALESCE(probability_of_precipitation_pct, 0) as probability_of_precipitation_pct,
+        weather_window_start,
+        weather_window_end,
+        forecast_days,
+        avg_temperature_air_2m_f,
+        probability_of_precipitation_pct,
         avg_humidity_relative_2m_pct,
         avg_wind_speed_10m_mph,
         tot_precipitation_in,
         tot_snowfall_in,
         avg_cloud_cover_tot_pct,
-        probability_of_snow_pct
-    FROM {{ ref('bronze_weather') }}
-    WHERE date_valid_std >= CURRENT_DATE() - 7  -- Only include recent weather data
+        probability_of_snow_pct,
+        hot_days,
+        cold_days,
+        rainy_days,
+        weather_version
+    FROM {{ ref('silver_weather_postal_summary') }}
 ),
 
-joined_data AS (
+customer_id_map AS (
+    SELECT
+        customer_id,
+        golden_customer_id
+    FROM {{ ref('bronze_customer_id_map') }}
+    WHERE source_system = 'D365'
+),
+
+customer_weather AS (
     SELECT
         c.customer_id,
+        -- Customers the resolution run has not seen yet are their own golden customer
+        COALESCE(m.golden_customer_id, c.customer_id) as golden_customer_id,
         c.first_name,
         c.last_name,
         c.postal_code,
         c.region,
         c.email,
-        w.date_valid_std,
+        c.updated_at,
+        w.weather_window_start,
+        w.weather_window_end,
+        w.forecast_days,
         w.avg_temperature_air_2m_f,
         w.probability_of_precipitation_pct,
         w.avg_humidity_relative_2m_pct,
@@ -58,28 +95,75 @@ joined_data AS (
         w.tot_snowfall_in,
         w.avg_cloud_cover_tot_pct,
         w.probability_of_snow_pct,
+        w.hot_days,
+        w.cold_days,
+        w.rainy_days,
+        w.weather_version
+    FROM customer_data c
+    LEFT JOIN customer_id_map m
+        ON c.customer_id = m.customer_id
+    LEFT JOIN weather_summary w
+        ON c.postal_code = w.postal_code
+    {% if is_incremental() %}
+    -- New customers, customers changed since their merge, and customers whose
+    -- golden id or weather summary differs from the one they were merged with
+    LEFT JOIN {{ this }} s
+        ON c.customer_id = s.customer_id
+    WHERE s.customer_id IS NULL
+       OR c.updated_at > s._customer_updated_at
+       OR COALESCE(m.golden_customer_id, c.customer_id) IS DISTINCT FROM s.golden_customer_id
+       OR w.weather_version IS DISTINCT FROM s.weather_version
+    {% endif %}
+),
+
+joined_data AS (
+    SELECT
+        customer_id,
+        golden_customer_id,
+        first_name,
+        last_name,
+        postal_code,
+        region,
+        email,
+        weather_window_start,
+        weather_window_end,
+        forecast_days,
+        avg_temperature_air_2m_f,
+        probability_of_precipitation_pct,
+        avg_humidity_relative_2m_pct,
+        avg_wind_speed_10m_mph,
+        tot_precipitation_in,
+        tot_snowfall_in,
+        avg_cloud_cover_tot_pct,
+        probability_of_snow_pct,
+        hot_days,
+        cold_days,
+        rainy_days,
+        weather_version,
         -- Add audit columns
         CURRENT_TIMESTAMP() as _dbt_loaded_at,
+        updated_at as _customer_updated_at,
         -- Add data quality indicators
-        CASE 
-            WHEN w.postal_code IS NULL THEN 'No weather data available'
-            WHEN w.avg_temperature_air_2m_f IS NULL THEN 'Missing temperature data'
-            WHEN w.probability_of_precipitation_pct IS NULL THEN 'Missing precipitation data'
+        CASE
+            WHEN forecast_days IS NULL THEN 'No weather data available'
+            WHEN avg_temperature_air_2m_f IS NULL THEN 'Missing temperature data'
+            WHEN probability_of_precipitation_pct IS NULL THEN 'Missing precipitation data'
             ELSE 'Complete data'
         END as data_completeness_status
-    FROM customer_data c
-    LEFT JOIN weather_data w
-        ON c.postal_code = w.postal_code
+    FROM customer_weather
 )
 
-SELECT 
+SELECT
     customer_id,
+    golden_customer_id,
     first_name,
     last_name,
     postal_code,
     region,
     email,
-    date_valid_std,
+    weather_window_start,
+    weather_window_end,
+    forecast_days,
     avg_temperature_air_2m_f,
     probability_of_precipitation_pct,
     avg_humidity_relative_2m_pct,
@@ -88,7 +172,12 @@ SELECT
     tot_snowfall_in,
     avg_cloud_cover_tot_pct,
     probability_of_snow_pct,
+    hot_days,
+    cold_days,
+    rainy_days,
+    weather_version,
     _dbt_loaded_at,
+    _customer_updated_at,
     data_completeness_status
 FROM joined_data
 WHERE customer_id IS NOT NULL  -- Ensure we have valid customer data
@@ -0,0 +1,97 @@
+{{ config(
+    materialized='table',
+    cluster_by=['postal_code']
+) }}
+
+-- Compact weather summary behind silver_customer_weather
+-- One row per served postal code with aggregates over the silver weather
+-- window, so silver joins each customer to a single weather row instead of
+-- one row per forecast day
+--
+-- The marketplace forecast_day share covers every postal code it sells, so
+-- the window's weather rows are semi-joined to the distinct customer postal
+-- codes before aggregating: the stage grows with the postal codes we serve,
+-- not with the share's footprint. Clustered on postal_code, the join key of
+-- silver_customer_weather, so the table is stored in join key order.
+
+{{ log("Starting execution of model: silver_weather_postal_summary", info=true) }}
+
+{% set weather_window_days = var('silver_weather_window_days', 7) %}
+
+WITH served_postal_codes AS (
+    SELECT DISTINCT postal_code
+    FROM {{ ref('bronze_customers') }}
+    WHERE postal_code IS NOT NULL
+),
+
+weather_data AS (
+    SELECT
+        postal_code,
+        date_valid_std,
+        -- Handle missing weather data
+        COALESCE(avg_temperature_air_2m_f, 0) as avg_temperature_air_2m_f,
+        COALESCE(probability_of_precipitation_pct, 0) as probability_of_precipitation_pct,
+        avg_humidity_relative_2m_pct,
+        avg_wind_speed_10m_mph,
+        tot_precipitation_in,
+        tot_snowfall_in,
+        avg_cloud_cover_tot_pct,
+        probability_of_snow_pct
+    FROM {{ ref('bronze_weather') }}
+    WHERE date_valid_std >= CURRENT_DATE() - {{ weather_window_days }}  -- Only include recent weather data
+      AND postal_code IN (SELECT postal_code FROM served_postal_codes)  -- Only postal codes with customers
+),
+
+postal_summary AS (
+    SELECT
+        postal_code,
+        MIN(date_valid_std) as weather_window_start,
+        MAX(date_valid_std) as weather_window_end,
+        COUNT(*) as forecast_days,
+        AVG(avg_temperature_air_2m_f) as avg_temperature_air_2m_f,
+        AVG(probability_of_precipitation_pct) as probability_of_precipitation_pct,
+        AVG(avg_humidity_relative_2m_pct) as avg_humidity_relative_2m_pct,
+        AVG(avg_wind_speed_10m_mph) as avg_wind_speed_10m_mph,
+        SUM(tot_precipitation_in) as tot_precipitation_in,
+        SUM(tot_snowfall_in) as tot_snowfall_in,
+        AVG(avg_cloud_cover_tot_pct) as avg_cloud_cover_tot_pct,
+        AVG(probability_of_snow_pct) as probability_of_snow_pct,
+        -- Days per weather segment, so gold can count customers facing each
+        COUNT(CASE WHEN avg_temperature_air_2m_f > 80 THEN 1 END) as hot_days,
+        COUNT(CASE WHEN avg_temperature_air_2m_f < 32 THEN 1 END) as cold_days,
+        COUNT(CASE WHEN probability_of_precipitation_pct > 50 THEN 1 END) as rainy_days
+    FROM weather_data
+    GROUP BY postal_code
+)
+
+SELECT
+    postal_code,
+    weather_window_start,
+    weather_window_end,
+    forecast_days,
+    avg_temperature_air_2m_f,
+    probability_of_precipitation_pct,
+    avg_humidity_relative_2m_pct,
+    avg_wind_speed_10m_mph,
+    tot_precipitation_in,
+    tot_snowfall_in,
+    avg_cloud_cover_tot_pct,
+    probability_of_snow_pct,
+    hot_days,
+    cold_days,
+    rainy_days,
+    -- Changes only when the measured weather does; silver re-merges a postal
+    -- code's customers only when it differs from the version they were merged
+    -- with. The window dates are left out: they move every day, and hashing
+    -- them would re-merge every customer every night.
+    {{ dbt_utils.generate_surrogate_key([
+        'avg_temperature_air_2m_f', 'probability_of_precipitation_pct',
+        'avg_humidity_relative_2m_pct', 'avg_wind_speed_10m_mph',
+        'tot_precipitation_in', 'tot_snowfall_in', 'avg_cloud_cover_tot_pct',
+        'probability_of_snow_pct', 'hot_days', 'cold_days', 'rainy_days'
+    ]) }} as weather_version,
+    -- Add audit columns
+    CURRENT_TIMESTAMP() as _dbt_loaded_at
+FROM postal_summary
+
+{{ log("Completed execution of model: silver_weather_postal_summary", info=true) }}
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+SCV Synthetic Source Data Generator
+Writes D365_CUSTOMERS, EXCEL_DATA and forecast_day as chunked Parquet at a chosen scale
+"""
+
+import argparse
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+OUTPUT_DIR = Path("target/synthetic")
+
+# Generation defaults; every rate is a fraction of the rows in its table
+DEFAULTS = {
+    'customers': 10_000,
+    'batch_size': 500_000,
+    'seed': 42,
+    'invalid_email_rate': 0.02,
+    'invalid_postal_rate': 0.01,
+    'recent_update_rate': 0.05,
+    'legacy_ratio': 0.2,
+    'duplicate_rate': 0.3,
+    'variant_rate': 0.3,
+    'weather_coverage': 0.9,
+    'weather_past_days': 7,
+    'weather_future_days': 7,
+    'postal_codes': None,  # derived from the customer count when unset
+    'marketplace_postal_codes': 0,  # forecast-only postal codes with no customers
+}
+
+TABLES = ('D365_CUSTOMERS', 'EXCEL_DATA', 'forecast_day')
+
+FIRST_NAMES = (
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+    'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Charles', 'Karen', 'Daniel', 'Lisa', 'Matthew', 'Nancy',
+    'Anthony', 'Betty', 'Mark', 'Sandra', 'Steven', 'Ashley', 'Paul', 'Emily',
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas',
+    'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White',
+    'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker', 'Young',
+)
+EMAIL_DOMAINS = ('example.com', 'mail.com', 'contoso.com', 'fabrikam.net', 'outlook.com', 'proton.me')
+STREET_NAMES = ('Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lake Rd', 'Hill Ave')
+CITIES = ('Springfield', 'Riverside', 'Franklin', 'Greenville', 'Clinton', 'Fairview', 'Salem', 'Madison')
+
+# States in rough ZIP code order, so a postal code's leading digits pick its region
+REGIONS = (
+    'MA', 'RI', 'NH', 'ME', 'VT', 'CT', 'NJ', 'NY', 'PA', 'DE', 'MD', 'VA', 'WV',
+    'NC', 'SC', 'GA', 'FL', 'AL', 'TN', 'MS', 'KY', 'OH', 'IN', 'MI', 'IA', 'WI',
+    'MN', 'SD', 'ND', 'MT', 'IL', 'MO', 'KS', 'NE', 'LA', 'AR', 'OK', 'TX', 'CO',
+    'WY', 'ID', 'UT', 'AZ', 'NM', 'NV', 'CA', 'HI', 'OR', 'WA', 'AK',
+)
+
+# Salts for the per-column hashes of a customer number
+SALT_FIRST, SALT_LAST, SALT_DOMAIN, SALT_POSTAL, SALT_STREET, SALT_CITY = range(1, 7)
+SALT_CREATED, SALT_UPDATED, SALT_RECENT, SALT_BAD_EMAIL, SALT_BAD_POSTAL = range(7, 12)
+SALT_DUPLICATE, SALT_DUPLICATE_OF, SALT_EMAIL_CASE, SALT_COVERAGE, SALT_PHONE = range(12, 17)
+SALT_VARIANT, SALT_VARIANT_KIND, SALT_VARIANT_POSITION = range(17, 20)
+
+HISTORY_DAYS = 5 * 365
+MICROS_PER_DAY = 86_400 * 1_000_000
+MASK64 = (1 << 64) - 1
+
+def parse_count(value):
+    """Parse counts such as 10000, 10k, 2.5M or 1B"""
+    multipliers = {'k': 1_000, 'm': 1_000_000, 'b': 1_000_000_000}
+    value = value.strip().lower().replace('_', '')
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+def build_config(**overrides):
+    """Return DEFAULTS updated with overrides and the derived postal code count"""
+    config = dict(DEFAULTS)
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    if config['postal_codes'] is None:
+        # About 25 customers per postal code, capped near the number of US ZIP codes
+        config['postal_codes'] = min(40_000, max(100, config['customers'] // 25))
+    config['now'] = config.get('now') or datetime.now(timezone.utc).replace(tzinfo=None)
+    return config
+
+def mix64(values, salt):
+    """
+    Hash unsigned 64-bit integers with splitmix64.
+
+    Every customer attribute is a hash of the customer number, so any
+    customer can be regenerated from its number alone. That is what lets
+    EXCEL_DATA duplicate D365 customers without keeping them in memory.
+    """
+    z = values.astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 * salt) & MASK64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def uniform(values, salt):
+    """Map customer numbers to deterministic floats in [0, 1)"""
+    return (mix64(values, salt) >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def choice(values, salt, options):
+    """Pick one of options per customer number"""
+    return (mix64(values, salt) % np.uint64(len(options))).astype(np.int64)
+
+def postal_code_values(count):
+    """Return count distinct 5-digit postal codes spread over the US range"""
+    return 501 + np.arange(count, dtype=np.int64) * ((99_950 - 501) // count)
+
+def format_ids(prefix, numbers, width=10):
+    """Format integers as zero-padded identifiers such as C0000000042"""
+    digits = pc.utf8_lpad(pc.cast(pa.array(numbers), pa.string()), width=width, padding='0')
+    return pc.binary_join_element_wise(prefix, digits, '')
+
+def lookup(options, indices):
+    """Take strings from a small tuple by index"""
+    return pa.array(options).take(pa.array(indices))
+
+def person_columns(numbers, config):
+    """
+    Return the name, email and location columns shared by both customer sources.
+
+    A configurable share of emails lose their '@' and of postal codes lose a
+    digit, matching the formats bronze_customers filters out.
+    """
+    first_names = lookup(FIRST_NAMES, choice(numbers, SALT_FIRST, FIRST_NAMES))
+    last_names = lookup(LAST_NAMES, choice(numbers, SALT_LAST, LAST_NAMES))
+    domains = lookup(EMAIL_DOMAINS, choice(numbers, SALT_DOMAIN, EMAIL_DOMAINS))
+
+    local_part = pc.utf8_lower(pc.binary_join_element_wise(
+        first_names, '.', last_names, pc.cast(pa.array(numbers), pa.string()), ''
+    ))
+    bad_email = uniform(numbers, SALT_BAD_EMAIL) < config['invalid_email_rate']
+    email = pc.if_else(
+        pa.array(bad_email),
+        pc.binary_join_element_wise(local_part, domains, '.'),
+        pc.binary_join_element_wise(local_part, domains, '@'),
+    )
+
+    postal_values = postal_code_values(config['postal_codes'])
+    # Skew customers towards lower postal indices so some codes are much denser
+    postal_index = (uniform(numbers, SALT_POSTAL) ** 1.5 * len(postal_values)).astype(np.int64)
+    postal = postal_values[postal_index]
+    region_index = postal * len(REGIONS) // 100_000
+    bad_postal = uniform(numbers, SALT_BAD_POSTAL) < config['invalid_postal_rate']
+    postal_code = pc.if_else(
+        pa.array(bad_postal),
+        pc.utf8_lpad(pc.cast(pa.array(postal // 10), pa.string()), width=4, padding='0'),
+        pc.utf8_lpad(pc.cast(pa.array(postal), pa.string()), width=5, padding='0'),
+    )
+
+    return {
+        'first_name': first_names,
+        'last_name': last_names,
+        'email': email,
+        'postal_code': postal_code,
+        'region': lookup(REGIONS, region_index),
+    }
+
+def timestamp_columns(numbers, config):
+    """Return created_at and updated_at, with a share updated in the last day"""
+    now = np.datetime64(config['now'], 'us').astype(np.int64)
+    created = now - (uniform(numbers, SALT_CREATED) * HISTORY_DAYS * MICROS_PER_DAY).astype(np.int64)
+    updated = created + (uniform(numbers, SALT_UPDATED) * (now - created)).astype(np.int64)
+    recent = uniform(numbers, SALT_RECENT) < config['recent_update_rate']
+    updated = np.where(recent, now - (uniform(numbers, SALT_UPDATED) * MICROS_PER_DAY).astype(np.int64), updated)
+    updated = np.maximum(updated, created)
+    return {
+        'created_at': pa.array(created.astype('datetime64[us]')),
+        'updated_at': pa.array(updated.astype('datetime64[us]')),
+    }
+
+def d365_batches(config):
+    """Yield D365_CUSTOMERS record batches of at most batch_size rows"""
+    total, batch_size = config['customers'], config['batch_size']
+    for start in range(0, total, batch_size):
+        numbers = np.arange(start, min(start + batch_size, total), dtype=np.uint64)
+        person = person_columns(numbers, config)
+        phone = 2_000_000_000 + (mix64(numbers, SALT_PHONE) % np.uint64(7_999_999_999)).astype(np.int64)
+        street_numbers = pc.cast(pa.array(1 + (mix64(numbers, SALT_STREET) % np.uint64(9999)).astype(np.int64)), pa.string())
+        columns = {
+            'customer_id': format_ids('C', numbers),
+            'first_name': person['first_name'],
+            'last_name': person['last_name'],
+            'email': person['email'],
+            'phone': pc.cast(pa.array(phone), pa.string()),
+            'address': pc.binary_join_element_wise(
+                street_numbers, lookup(STREET_NAMES, choice(numbers, SALT_STREET, STREET_NAMES)), ' '
+            ),
+            'city': lookup(CITIES, choice(numbers, SALT_CITY, CITIES)),
+            'region': person['region'],
+            'postal_code': person['postal_code'],
+            **timestamp_columns(numbers, config),
+        }
+        yield pa.RecordBatch.from_pydict(columns)
+
+def legacy_duplicate_of(legacy_numbers, config):
+    """Return the D365 customer number each legacy row duplicates, or -1"""
+    duplicate = uniform(legacy_numbers, SALT_DUPLICATE) < config['duplicate_rate']
+    duplicate_of = mix64(legacy_numbers, SALT_DUPLICATE_OF) % np.uint64(max(config['customers'], 1))
+    return np.where(duplicate, duplicate_of.astype(np.int64), -1)
+
+def vary(value, kind, position):
+    """
+    Apply one typing variant to a string.
+
+    Kinds: 0 pads and upper-cases, 1 drops a character, 2 swaps two
+    adjacent characters and 3 adds a '+legacy' tag to an email's local part.
+    """
+    if value is None or len(value) < 3:
+        return value
+    index = 1 + position % (len(value) - 2)
+    if kind == 0:
+        return f"  {value.upper()} "
+    if kind == 1:
+        return value[:index] + value[index + 1:]
+    if kind == 2:
+        return value[:index] + value[index + 1] + value[index] + value[index + 2:]
+    local, at, domain = value.partition('@')
+    return f"{local}+legacy{at}{domain}" if at else value
+
+def variant_columns(columns, legacy_numbers, duplicate, config):
+    """
+    Give a variant_rate share of the duplicate rows a formatting or typo variant.
+
+    Each such row varies one of first name, last name or email, the way
+    a hand-maintained spreadsheet drifts from the system of record.
+    """
+    varied = np.flatnonzero(duplicate & (uniform(legacy_numbers, SALT_VARIANT) < config['variant_rate']))
+    if len(varied) == 0:
+        return columns
+    kinds = mix64(legacy_numbers[varied], SALT_VARIANT_KIND) % np.uint64(6)
+    positions = mix64(legacy_numbers[varied], SALT_VARIANT_POSITION)
+    # (column, variant kind) per drawn kind; emails only get the typo and tag variants
+    plan = (('first_name', 0), ('first_name', 2), ('last_name', 1), ('last_name', 2), ('email', 2), ('email', 3))
+    values = {name: columns[name].to_pylist() for name in ('first_name', 'last_name', 'email')}
+    for row, kind, position in zip(varied, kinds, positions):
+        name, variant = plan[int(kind)]
+        values[name][row] = vary(values[name][row], variant, int(position))
+    return {**columns, **{name: pa.array(column, pa.string()) for name, column in values.items()}}
+
+def excel_batches(config):
+    """
+    Yield EXCEL_DATA record batches.
+
+    The legacy table holds legacy_ratio * customers rows. A duplicate_rate
+    share of them are D365 customers re-keyed with a legacy id, half of
+    those with an upper-cased email and a variant_rate share with a typo
+    or formatting variant; the rest are legacy-only customers numbered
+    after the D365 range.
+    """
+    total = int(config['customers'] * config['legacy_ratio'])
+    batch_size = config['batch_size']
+    for start in range(0, total, batch_size):
+        legacy_numbers = np.arange(start, min(start + batch_size, total), dtype=np.uint64)
+        duplicate_of = legacy_duplicate_of(legacy_numbers, config)
+        duplicate = duplicate_of >= 0
+        numbers = np.where(duplicate, duplicate_of, legacy_numbers + np.uint64(config['customers'])).astype(np.uint64)
+
+        person = person_columns(numbers, config)
+        upper_email = duplicate & (uniform(legacy_numbers, SALT_EMAIL_CASE) < 0.5)
+        columns = {
+            'customer_id': format_ids('L', legacy_numbers),
+            'first_name': person['first_name'],
+            'last_name': person['last_name'],
+            'email': pc.if_else(pa.array(upper_email), pc.utf8_upper(person['email']), person['email']),
+            'postal_code': person['postal_code'],
+            'region': person['region'],
+        }
+        yield pa.RecordBatch.from_pydict(variant_columns(columns, legacy_numbers, duplicate, config))
+
+def weather_batches(config):
+    """
+    Yield forecast_day record batches, one row per covered postal code and day.
+
+    Postal codes outside weather_coverage get no rows at all, so customers
+    there fall through to 'No weather data available' in silver. Up to
+    marketplace_postal_codes further codes nobody lives in are forecast too,
+    like the rest of the marketplace share's footprint.
+    """
+    customer_codes = postal_code_values(config['postal_codes'])
+    codes = np.arange(config['postal_codes'], dtype=np.uint64)
+    covered = customer_codes[uniform(codes, SALT_COVERAGE) < config['weather_coverage']]
+    if config['marketplace_postal_codes']:
+        extra = np.setdiff1d(postal_code_values(config['marketplace_postal_codes']) + 1, customer_codes)
+        covered = np.concatenate([covered, extra])
+    offsets = np.arange(-config['weather_past_days'], config['weather_future_days'] + 1)
+    today = np.datetime64(config['now'].date(), 'D')
+    codes_per_batch = max(1, config['batch_size'] // len(offsets))
+
+    for batch, start in enumerate(range(0, len(covered), codes_per_batch)):
+        rng = np.random.default_rng((config['seed'], batch))
+        postal = np.repeat(covered[start:start + codes_per_batch], len(offsets))
+        days = np.tile(offsets, len(postal) // len(offsets))
+        rows = len(postal)
+
+        # Warmer towards the south and west of the ZIP range, colder in the north east
+        temperature = 45 + 30 * postal / 100_000 + rng.normal(0, 12, rows)
+        precipitation_chance = rng.uniform(0, 100, rows)
+        raining = rng.uniform(0, 100, rows) < precipitation_chance
+        precipitation = np.where(raining, rng.exponential(0.25, rows), 0.0)
+        freezing = temperature < 32
+        columns = {
+            'postal_code': pc.utf8_lpad(pc.cast(pa.array(postal), pa.string()), width=5, padding='0'),
+            'country': pa.array(np.full(rows, 'US')),
+            'date_valid_std': pa.array(today + days),
+            'avg_temperature_air_2m_f': pa.array(temperature.round(1)),
+            'avg_humidity_relative_2m_pct': pa.array(rng.uniform(20, 100, rows).round(1)),
+            'avg_wind_speed_10m_mph': pa.array(rng.gamma(2.0, 4.0, rows).round(1)),
+            'tot_precipitation_in': pa.array(np.where(freezing, 0.0, precipitation).round(2)),
+            'tot_snowfall_in': pa.array(np.where(freezing, precipitation * 10, 0.0).round(2)),
+            'avg_cloud_cover_tot_pct': pa.array(np.clip(precipitation_chance + rng.normal(0, 15, rows), 0, 100).round(1)),
+            'probability_of_precipitation_pct': pa.array(precipitation_chance.round(0)),
+            'probability_of_snow_pct': pa.array(np.where(temperature < 35, precipitation_chance, 0.0).round(0)),
+        }
+        yield pa.RecordBatch.from_pydict(columns)
+
+TABLE_BATCHES = {
+    'D365_CUSTOMERS': d365_batches,
+    'EXCEL_DATA': excel_batches,
+    'forecast_day': weather_batches,
+}
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def write_table(name, config, output_dir):
+    """Write one table as part-NNNNN.parquet files, one per batch"""
+    table_dir = Path(output_dir) / name
+    table_dir.mkdir(parents=True, exist_ok=True)
+    for stale in table_dir.glob('part-*.parquet'):
+        stale.unlink()
+
+    rows = files = 0
+    start = time.perf_counter()
+    for index, batch in enumerate(TABLE_BATCHES[name](config)):
+        pq.write_table(pa.Table.from_batches([batch]), table_dir / f'part-{index:05d}.parquet', compression='zstd')
+        rows += batch.num_rows
+        files += 1
+    return {'table': name, 'rows': rows, 'files': files, 'seconds': time.perf_counter() - start}
+
+def generate(config, output_dir=OUTPUT_DIR, tables=TABLES):
+    """Generate every requested table and print throughput and peak memory"""
+    print(f"🏭 Generating {config['customers']:,} customers across {config['postal_codes']:,} postal codes into {output_dir}")
+    print(f"{'Table':<16} {'Rows':>14} {'Files':>7} {'Seconds':>9} {'Rows/s':>12} {'Peak RSS (MB)':>14}")
+    print("-" * 77)
+    results = []
+    for name in tables:
+        result = write_table(name, config, output_dir)
+        rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+        print(
+            f"{name:<16} {result['rows']:>14,} {result['files']:>7} {result['seconds']:>9.2f} "
+            f"{rate:>12,.0f} {peak_rss_mb():>14.1f}"
+        )
+        results.append(result)
+    return results
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Generate synthetic SCV source data as Parquet")
+    parser.add_argument('--customers', type=parse_count, default=DEFAULTS['customers'],
+                        help="Scale factor: number of D365 customers, e.g. 10k, 1M or 100M")
+    parser.add_argument('--output', default=str(OUTPUT_DIR), help="Output directory, one sub-directory per table")
+    parser.add_argument('--tables', nargs='+', choices=TABLES, default=list(TABLES), help="Tables to generate")
+    parser.add_argument('--batch-size', type=parse_count, help="Rows per batch and Parquet file; bounds memory use")
+    parser.add_argument('--seed', type=int, help="Seed for the weather measurements")
+    parser.add_argument('--postal-codes', type=parse_count, help="Distinct postal codes (default: customers / 25, at most 40k)")
+    parser.add_argument('--invalid-email-rate', type=float, help="Share of emails without an '@'")
+    parser.add_argument('--invalid-postal-rate', type=float, help="Share of 4-digit postal codes")
+    parser.add_argument('--recent-update-rate', type=float, help="Share of customers updated in the last day")
+    parser.add_argument('--legacy-ratio', type=float, help="EXCEL_DATA rows per D365 customer")
+    parser.add_argument('--duplicate-rate', type=float, help="Share of EXCEL_DATA rows that duplicate a D365 customer")
+    parser.add_argument('--variant-rate', type=float, help="Share of duplicate rows with a typo or formatting variant")
+    parser.add_argument('--weather-coverage', type=float, help="Share of postal codes with forecast rows")
+    parser.add_argument('--weather-past-days', type=int, help="Forecast days before today")
+    parser.add_argument('--weather-future-days', type=int, help="Forecast days after today")
+    parser.add_argument('--marketplace-postal-codes', type=parse_count,
+                        help="Extra forecast-only postal codes without customers (default: 0)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = vars(parse_args(argv))
+    output_dir = args.pop('output')
+    tables = args.pop('tables')
+    config = build_config(**args)
+    if config['batch_size'] <= 0 or config['customers'] < 0:
+        print("Error: --customers and --batch-size must be positive")
+        sys.exit(1)
+    generate(config, output_dir, tables)
+
+if __name__ == "__main__":
+    main()
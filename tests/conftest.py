@@ -0,0 +1,13 @@
+"""
+Shared pytest setup for the SCV Python tooling
+The DAG helpers and dbt project tools are scripts, so their directories go on sys.path
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+for directory in ('dags', 'scv'):
+    path = str(ROOT / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,62 @@
+"""Tests for the asynchronous check execution in dags/async_checks.py"""
+
+import threading
+
+import pytest
+
+import query_metrics
+from async_checks import FakeAsyncDriver, run_checks_async
+from metric_cache import MetricCache
+from snowflake_pool import ConnectionPool
+
+SETUP_SQL = """
+    CREATE TABLE demo (id INTEGER, value REAL);
+    INSERT INTO demo VALUES (1, 0.5), (2, 1.5), (3, 2.5);
+    ATTACH ':memory:' AS information_schema;
+    CREATE TABLE information_schema.tables (table_schema TEXT, table_name TEXT, row_count INTEGER, last_altered TEXT);
+    INSERT INTO information_schema.tables VALUES ('RAW', 'DEMO', 3, '2026-10-01 00:00:00');
+"""
+
+CHECKS = {
+    'demo': {
+        'query': "SELECT COUNT(*), SUM(value) FROM demo",
+        'tables': ['raw.demo'],
+        'columns': ['record_count', 'value_sum'],
+        'required': True,
+    },
+}
+
+@pytest.fixture(autouse=True)
+def no_metric_sinks(monkeypatch):
+    monkeypatch.setattr(query_metrics, 'SINKS', ['none'])
+
+def run_with_deadline(target, seconds=10):
+    """Run target on a thread and fail the test if it has not returned within seconds"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = target()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    if thread.is_alive():
+        pytest.fail(f"still running after {seconds}s - waiting on a second pooled connection?")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+def test_single_connection_pool_with_cache(tmp_path):
+    driver = FakeAsyncDriver(latency=0.01, setup_sql=SETUP_SQL)
+    pool = ConnectionPool(driver.connect, max_size=1)
+    cache = MetricCache(str(tmp_path / 'cache.sqlite'))
+
+    first = run_with_deadline(lambda: run_checks_async(pool, CHECKS, CHECKS, cache, poll_interval=0.01))
+    assert first['demo']['row'] == {'record_count': 3, 'value_sum': 4.5}
+
+    second = run_with_deadline(lambda: run_checks_async(pool, CHECKS, CHECKS, cache, poll_interval=0.01))
+    assert second['demo']['row'] == first['demo']['row']
+    assert cache.hits == 1
@@ -0,0 +1,78 @@
+"""Tests for the changed-model selection in scv/lineage_analysis.py"""
+
+import json
+
+import pytest
+
+from lineage_analysis import select_changed_models
+
+# (name, materialized, parents) shaped like the SCV project
+MODELS = [
+    ('bronze_customers', 'view', ['source.scv.bronze.D365_CUSTOMERS']),
+    ('bronze_weather', 'view', ['source.scv.marketplace.forecast_day']),
+    ('bronze_customer_id_map', 'view', ['source.scv.bronze.CUSTOMER_ID_MAP']),
+    ('region_names', 'table', ['seed.scv.regions']),
+    ('silver_weather_postal_summary', 'table', ['model.scv.bronze_weather']),
+    ('silver_customer_weather', 'incremental',
+     ['model.scv.bronze_customers', 'model.scv.silver_weather_postal_summary', 'model.scv.bronze_customer_id_map']),
+    ('gold_customer_kpi_partials', 'table', ['model.scv.silver_customer_weather']),
+    ('gold_customer_kpis', 'table', ['model.scv.gold_customer_kpi_partials', 'model.scv.region_names']),
+    ('gold_region_view', 'view', ['model.scv.gold_customer_kpis']),
+]
+
+def write_manifest(path, checksums=None):
+    """Write a manifest for MODELS, with optional per-model checksum overrides"""
+    checksums = checksums or {}
+    nodes = {
+        f"model.scv.{name}": {
+            'name': name,
+            'resource_type': 'model',
+            'checksum': {'checksum': checksums.get(name, name)},
+            'config': {'materialized': materialized},
+            'depends_on': {'nodes': parents, 'macros': []},
+        }
+        for name, materialized, parents in MODELS
+    }
+    nodes['seed.scv.regions'] = {
+        'name': 'regions', 'resource_type': 'seed', 'checksum': {'checksum': 'regions'},
+        'config': {'materialized': 'seed'}, 'depends_on': {'nodes': [], 'macros': []},
+    }
+    sources = {
+        f"source.scv.{source}.{table}": {'resource_type': 'source', 'name': table, 'source_name': source}
+        for source, table in (('bronze', 'D365_CUSTOMERS'), ('bronze', 'CUSTOMER_ID_MAP'), ('marketplace', 'forecast_day'))
+    }
+    path.write_text(json.dumps({'nodes': nodes, 'sources': sources, 'macros': {}}))
+    return path
+
+@pytest.fixture
+def state_path(tmp_path):
+    (tmp_path / 'state').mkdir()
+    return write_manifest(tmp_path / 'state' / 'manifest.json')
+
+def test_missing_state_is_a_full_run(tmp_path):
+    manifest = write_manifest(tmp_path / 'manifest.json')
+    assert select_changed_models(manifest, tmp_path / 'missing.json') is None
+
+def test_quiet_night_rebuilds_everything_fed_by_sources(tmp_path, state_path):
+    manifest = write_manifest(tmp_path / 'manifest.json')
+    selection = select_changed_models(manifest, state_path, ['incremental'])
+    assert selection == sorted([
+        'silver_weather_postal_summary',
+        'silver_customer_weather',
+        'gold_customer_kpi_partials',
+        'gold_customer_kpis',
+        'gold_region_view',
+    ])
+
+def test_changed_seed_model_brings_in_descendants(tmp_path, state_path):
+    manifest = write_manifest(tmp_path / 'manifest.json', {'region_names': 'edited'})
+    selection = select_changed_models(manifest, state_path)
+    assert 'region_names' in selection
+    assert {'gold_customer_kpis', 'gold_region_view'} <= set(selection)
+
+def test_changed_view_brings_in_descendants(tmp_path, state_path):
+    manifest = write_manifest(tmp_path / 'manifest.json', {'bronze_customers': 'edited'})
+    selection = select_changed_models(manifest, state_path)
+    assert 'bronze_customers' in selection
+    assert 'bronze_weather' not in selection
+    assert {'silver_customer_weather', 'gold_customer_kpis'} <= set(selection)
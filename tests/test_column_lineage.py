@@ -0,0 +1,87 @@
+"""Tests for the stored column graph in scv/column_lineage.py"""
+
+import json
+import os
+
+import pytest
+
+import column_lineage
+from column_lineage import GRAPH_FILENAME, load_column_graph, read_column_graph, synthetic_sql_manifest
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    """Write a small synthetic compiled manifest and return its path"""
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(synthetic_sql_manifest(12, columns_per_model=6)))
+    return path
+
+def no_rebuild(*args, **kwargs):
+    pytest.fail("column graph was rebuilt")
+
+def test_query_loads_stored_graph(manifest_path, monkeypatch):
+    cold = load_column_graph(manifest_path, max_workers=1)
+    assert read_column_graph(manifest_path.with_name(GRAPH_FILENAME)) is not None
+
+    monkeypatch.setattr(column_lineage, 'build_column_graph', no_rebuild)
+    warm = load_column_graph(manifest_path, max_workers=1)
+    assert warm.to_dict() == cold.to_dict()
+    assert warm.origins('gold_model_0.col_1') == cold.origins('gold_model_0.col_1')
+
+def test_touched_manifest_with_same_content_hits(manifest_path, monkeypatch):
+    load_column_graph(manifest_path, max_workers=1)
+    stat = manifest_path.stat()
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    monkeypatch.setattr(column_lineage, 'build_column_graph', no_rebuild)
+    load_column_graph(manifest_path, max_workers=1)
+    fingerprint, _ = read_column_graph(manifest_path.with_name(GRAPH_FILENAME))
+    assert fingerprint['mtime_ns'] == manifest_path.stat().st_mtime_ns
+
+def test_changed_manifest_rebuilds(manifest_path):
+    load_column_graph(manifest_path, max_workers=1)
+    manifest = json.loads(manifest_path.read_text())
+    manifest['nodes']['model.scv.gold_model_0']['compiled_code'] = (
+        "SELECT col_0, col_1 + 1 AS col_extra FROM SCV_DB.SILVER.silver_model_0"
+    )
+    manifest_path.write_text(json.dumps(manifest))
+
+    changed = load_column_graph(manifest_path, max_workers=1)
+    assert changed.resolve('gold_model_0.col_extra')
+    _, stored = read_column_graph(manifest_path.with_name(GRAPH_FILENAME))
+    assert stored.resolve('gold_model_0.col_extra')
+
+@pytest.mark.parametrize('content', ['', '{"nodes": ', '[]', '{"parser_version": 0}'])
+def test_unreadable_graph_is_a_miss(manifest_path, content):
+    cold = load_column_graph(manifest_path, max_workers=1)
+    graph_path = manifest_path.with_name(GRAPH_FILENAME)
+    graph_path.write_text(content)
+
+    assert read_column_graph(graph_path) is None
+    assert load_column_graph(manifest_path, max_workers=1).to_dict() == cold.to_dict()
+    assert read_column_graph(graph_path) is not None
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_concurrent_writers_leave_a_valid_graph(manifest_path):
+    graph, _ = column_lineage.build_column_graph(manifest_path, use_cache=False, max_workers=1)
+    graph_path = manifest_path.with_name(GRAPH_FILENAME)
+    fingerprint = {'size': 0, 'mtime_ns': 0, 'sha256': ''}
+
+    pids = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                for _ in range(25):
+                    column_lineage.save_column_graph(graph, graph_path, fingerprint)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    statuses = [os.waitpid(pid, 0)[1] for pid in pids]
+    assert statuses == [0] * len(pids)
+    _, stored = read_column_graph(graph_path)
+    assert stored.to_dict() == graph.to_dict()
+    assert not list(graph_path.parent.glob('*.tmp'))
@@ -0,0 +1,48 @@
+"""Tests for the legacy export validation in scv/legacy_validation.py"""
+
+import pyarrow.parquet as pq
+
+from legacy_validation import input_columns, validate_exports
+
+def write_csv(path, header, rows):
+    path.write_text('\n'.join([','.join(header)] + [','.join(row) for row in rows]) + '\n')
+    return path
+
+def clean_rows(output_dir):
+    return pq.ParquetDataset(output_dir / 'clean').read().to_pylist()
+
+def test_export_without_customer_id_is_quarantined(tmp_path):
+    export = write_csv(
+        tmp_path / 'export.csv',
+        ['First Name', 'Last Name', 'Email', 'Postal Code', 'Region'],
+        [['Ada', 'Lovelace', 'ada@example.com', '02139', 'MA']],
+    )
+    summary = validate_exports([export], tmp_path / 'out', buckets=2, max_workers=1)
+
+    counts = summary['counts']
+    assert counts['rows_read'] == 1
+    assert counts['missing_customer_id'] == 1
+    assert counts['clean_rows'] == 0
+    quarantined = pq.read_table(tmp_path / 'out' / 'quarantine' / 'quarantine.parquet').to_pylist()
+    assert [row['_quarantine_reason'] for row in quarantined] == ['missing_customer_id']
+
+def test_exports_with_different_headers_share_one_schema(tmp_path):
+    first = write_csv(
+        tmp_path / 'first.csv',
+        ['Customer ID', 'First Name', 'Last Name', 'Email', 'Postal Code', 'Region', 'Phone'],
+        [['C1', 'Ada', 'Lovelace', 'ada@example.com', '02139', 'MA', '555-0100']],
+    )
+    second = write_csv(
+        tmp_path / 'second.csv',
+        ['customer_id', 'email', 'first_name', 'last_name', 'postal_code', 'region', 'loyalty_tier'],
+        [['C2', 'grace@example.com', 'Grace', 'Hopper', '10001', 'NY', 'gold']],
+    )
+    assert input_columns([first, second]) == [
+        'customer_id', 'first_name', 'last_name', 'email', 'postal_code', 'region', 'phone', 'loyalty_tier',
+    ]
+
+    summary = validate_exports([first, second], tmp_path / 'out', buckets=2, max_workers=1)
+    assert summary['counts']['clean_rows'] == 2
+    rows = {row['customer_id']: row for row in clean_rows(tmp_path / 'out')}
+    assert rows['C1']['phone'] == '555-0100' and rows['C1']['loyalty_tier'] is None
+    assert rows['C2']['loyalty_tier'] == 'gold' and rows['C2']['phone'] is None
@@ -0,0 +1,97 @@
+"""Tests for the binary lineage cache in scv/lineage_analysis.py"""
+
+import json
+import os
+
+import pytest
+
+import lineage_analysis
+from lineage_analysis import cache_path_for, load_graph, read_graph_cache, synthetic_manifest
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    """Write a small synthetic manifest and return its path"""
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(synthetic_manifest(60)))
+    return path
+
+def test_warm_load_is_served_from_cache(manifest_path, monkeypatch):
+    cold = load_graph(manifest_path)
+    assert read_graph_cache(cache_path_for(manifest_path)) is not None
+
+    monkeypatch.setattr(lineage_analysis, 'load_manifest', lambda *args: pytest.fail("manifest was reparsed"))
+    warm = load_graph(manifest_path)
+    assert warm.nodes == cold.nodes
+    assert warm.parents == cold.parents
+    assert warm.name_index == cold.name_index
+
+def test_touched_manifest_with_same_content_hits(manifest_path, monkeypatch):
+    load_graph(manifest_path)
+    stat = manifest_path.stat()
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    monkeypatch.setattr(lineage_analysis, 'load_manifest', lambda *args: pytest.fail("manifest was reparsed"))
+    load_graph(manifest_path)
+    header, _ = read_graph_cache(cache_path_for(manifest_path))
+    assert header['fingerprint']['mtime_ns'] == manifest_path.stat().st_mtime_ns
+
+def test_changed_manifest_rebuilds(manifest_path):
+    cold = load_graph(manifest_path)
+    manifest = json.loads(manifest_path.read_text())
+    gold = sorted(cold.models('gold'))[0]
+    manifest['nodes'][gold]['depends_on']['nodes'].append('model.scv.bronze_model_0')
+    manifest_path.write_text(json.dumps(manifest))
+
+    changed = load_graph(manifest_path)
+    assert 'model.scv.bronze_model_0' in changed.parents[gold]
+    _, cached = read_graph_cache(cache_path_for(manifest_path))
+    assert 'model.scv.bronze_model_0' in cached.parents[gold]
+
+@pytest.mark.parametrize('keep', [0.1, 0.5, 0.9, 0.999])
+def test_truncated_cache_is_a_miss(manifest_path, keep):
+    cold = load_graph(manifest_path)
+    cache_path = cache_path_for(manifest_path)
+    data = cache_path.read_bytes()
+    cache_path.write_bytes(data[:int(len(data) * keep)])
+
+    assert read_graph_cache(cache_path) is None
+    rebuilt = load_graph(manifest_path)
+    assert rebuilt.parents == cold.parents
+    assert read_graph_cache(cache_path) is not None
+
+def test_corrupt_cache_is_a_miss(manifest_path):
+    cold = load_graph(manifest_path)
+    cache_path = cache_path_for(manifest_path)
+    data = bytearray(cache_path.read_bytes())
+    magic = len(lineage_analysis.CACHE_MAGIC)
+    data[magic:magic + 4] = b'\xff\xff\xff\x7f'  # header length past the end of the file
+    cache_path.write_bytes(bytes(data))
+
+    assert read_graph_cache(cache_path) is None
+    assert load_graph(manifest_path).parents == cold.parents
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_concurrent_writers_leave_a_valid_cache(manifest_path):
+    graph = load_graph(manifest_path, use_cache=False)
+    cache_path = cache_path_for(manifest_path)
+    fingerprint = {'size': 0, 'mtime_ns': 0, 'sha256': ''}
+
+    pids = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                for _ in range(25):
+                    lineage_analysis.save_graph_cache(graph, cache_path, fingerprint)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    statuses = [os.waitpid(pid, 0)[1] for pid in pids]
+    assert statuses == [0] * len(pids)
+    _, cached = read_graph_cache(cache_path)
+    assert cached.parents == graph.parents
+    assert not list(cache_path.parent.glob('*.tmp'))
@@ -0,0 +1,57 @@
+"""Tests for the metric cache helpers in dags/metric_cache.py"""
+
+import calendar
+
+from metric_cache import MetricCache, clock_period, identifier_name, table_metadata
+
+class RecordingPool:
+    """Pool stand-in answering information_schema queries from a fixed table list"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def get_records(self, query):
+        self.queries.append(query)
+        return self.rows
+
+def test_identifier_case():
+    assert identifier_name('raw') == 'RAW'
+    assert identifier_name('"forecast_day"') == 'forecast_day'
+    assert identifier_name('"Mixed""Quote"') == 'Mixed"Quote'
+
+def test_table_metadata_keeps_quoted_case():
+    pool = RecordingPool([
+        ('ONPOINT_ID', 'forecast_day', 120, '2026-10-01'),
+        ('RAW', 'D365_CUSTOMERS', 40, '2026-10-02'),
+    ])
+    weather = 'WEATHER_SOURCE_LLC_FROSTBYTE.ONPOINT_ID."forecast_day"'
+    customers = 'db.raw.D365_CUSTOMERS'
+    metadata = table_metadata(pool, [weather])
+    assert metadata == {weather: {'row_count': 120, 'last_altered': '2026-10-01'}}
+    assert "table_name = 'forecast_day'" in pool.queries[0]
+
+    metadata = table_metadata(pool, [customers])
+    assert metadata[customers]['row_count'] == 40
+
+def test_clock_reading_queries_are_keyed_by_period():
+    hour = calendar.timegm((2026, 10, 17, 9, 30, 0))
+    assert clock_period("SELECT DATEDIFF('hour', MAX(updated_at), CURRENT_TIMESTAMP()) FROM t", hour) == '2026-10-17T09'
+    assert clock_period("SELECT COUNT(*) FROM t WHERE d >= current_date()", hour) == '2026-10-17'
+    assert clock_period("SELECT COUNT(*) FROM t", hour) == ''
+
+def test_cache_misses_for_clock_queries_after_the_period(tmp_path, monkeypatch):
+    import metric_cache
+
+    now = [calendar.timegm((2026, 10, 17, 9, 0, 0))]
+    monkeypatch.setattr(metric_cache, 'clock_period', lambda query: clock_period(query, now[0]))
+    cache = MetricCache(str(tmp_path / 'cache.sqlite'))
+    clock_query = "SELECT DATEDIFF('hour', MAX(updated_at), CURRENT_TIMESTAMP()) FROM t"
+    plain_query = "SELECT COUNT(*) FROM t"
+    cache.put(clock_query, 'v1', (1,))
+    cache.put(plain_query, 'v1', (5,))
+    assert cache.get(clock_query, 'v1') == (True, (1,))
+
+    now[0] += 3600
+    assert cache.get(clock_query, 'v1') == (False, None)
+    assert cache.get(plain_query, 'v1') == (True, (5,))
@@ -0,0 +1,58 @@
+"""Tests for the query metric exports in dags/query_metrics.py"""
+
+import json
+import os
+import time
+
+import pytest
+
+import query_metrics
+
+@pytest.fixture
+def exports(monkeypatch):
+    """Capture every export batch instead of writing to a sink"""
+    batches = []
+    monkeypatch.setattr(query_metrics, 'SINKS', ['capture'])
+    monkeypatch.setitem(query_metrics.SINK_WRITERS, 'capture', lambda records: batches.append(list(records)))
+    monkeypatch.setattr(query_metrics, '_pending', [])
+    monkeypatch.setattr(query_metrics, '_unexported', [])
+    return batches
+
+@pytest.fixture
+def run_results(tmp_path):
+    path = tmp_path / 'run_results.json'
+    path.write_text(json.dumps({
+        'args': {'which': 'run'},
+        'results': [
+            {'unique_id': f'model.scv.model_{i}', 'status': 'success', 'execution_time': 1.5,
+             'adapter_response': {'rows_affected': i, 'query_id': f'q{i}'}}
+            for i in range(25)
+        ],
+    }))
+    return path
+
+def test_dbt_results_are_exported_in_one_batch(exports, run_results):
+    records = query_metrics.record_dbt_results(run_results)
+    assert len(records) == 25
+    assert [len(batch) for batch in exports] == [25]
+
+def test_pool_queries_are_batched_until_flushed(exports, monkeypatch):
+    monkeypatch.setattr(query_metrics, 'EXPORT_BATCH_SIZE', 10)
+    for i in range(12):
+        query_metrics.record_pool_query('SELECT 1', 0.1, rows=1)
+    assert [len(batch) for batch in exports] == [10]
+
+    query_metrics.flush_queries()
+    assert [len(batch) for batch in exports] == [10, 2]
+    query_metrics.flush_queries()
+    assert len(exports) == 2
+
+def test_stale_run_results_are_not_recorded_again(exports, run_results, capsys):
+    started = time.time()
+    os.utime(run_results, (started - 3600, started - 3600))
+    query_metrics.main(['dbt-results', str(run_results), '--since', str(started)])
+    assert exports == []
+    assert 'predates this dbt invocation' in capsys.readouterr().out
+
+    query_metrics.main(['dbt-results', str(run_results), '--since', str(started - 7200)])
+    assert [len(batch) for batch in exports] == [25]
@@ -0,0 +1,73 @@
+"""Tests for the runtime history in dags/run_history.py"""
+
+import json
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import run_history
+from run_history import check_node, detect_regressions, ingest_run_results
+
+def write_run_results(path, invocation_id, seconds=10.0, generated_at='2026-10-16T02:00:00Z'):
+    path.write_text(json.dumps({
+        'metadata': {'invocation_id': invocation_id, 'generated_at': generated_at},
+        'args': {'which': 'run'},
+        'elapsed_time': seconds,
+        'results': [
+            {'unique_id': 'model.scv.silver_customer_weather', 'status': 'success',
+             'execution_time': seconds, 'adapter_response': {'rows_affected': 100}},
+        ],
+    }))
+    return path
+
+@pytest.fixture
+def history_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_history, 'RETENTION_DAYS', 100_000)
+    return tmp_path / 'run_history.sqlite'
+
+def dag_run_of(history_path, invocation_id):
+    with closing(sqlite3.connect(history_path)) as db:
+        return db.execute('SELECT dag_run_id FROM invocations WHERE invocation_id = ?', (invocation_id,)).fetchone()[0]
+
+def test_reingesting_an_artifact_keeps_its_dag_run(tmp_path, history_path, monkeypatch):
+    path = write_run_results(tmp_path / 'run_results.json', 'inv-yesterday')
+    monkeypatch.setenv('AIRFLOW_CTX_DAG_RUN_ID', 'run_yesterday')
+    assert ingest_run_results(path, history_path, revision='abc') == 1
+
+    # dbt failed before writing a new file, so yesterday's is ingested again
+    monkeypatch.setenv('AIRFLOW_CTX_DAG_RUN_ID', 'run_today')
+    assert ingest_run_results(path, history_path, revision='abc') == 0
+
+    assert dag_run_of(history_path, 'inv-yesterday') == 'run_yesterday'
+    assert detect_regressions(history_path, dag_run_id='run_today')['invocations'] == []
+
+def history(times, revision='abc'):
+    return [(seconds, 100, revision) for seconds in times]
+
+def test_short_baseline_is_not_judged():
+    assert check_node(100.0, 100, 'abc', history([10.0] * (run_history.MIN_BASELINE_RUNS - 1))) is None
+
+def test_jitter_on_a_stable_baseline_is_not_a_regression():
+    result = check_node(10.4, 100, 'abc', history([10.0] * 10))
+    assert result['baseline_seconds'] == 10.0
+    assert not result['regressed']
+
+def test_large_slowdown_is_a_regression():
+    result = check_node(30.0, 100, 'def', history([10.0, 10.5, 9.5, 10.2, 9.8]))
+    assert result['regressed']
+    assert result['slowdown'] == pytest.approx(2.0)
+    assert result['new_revision']
+
+def test_slowdown_under_the_seconds_floor_is_not_a_regression():
+    # Doubling a 2s model is significant but under MIN_SLOWDOWN_SECONDS
+    result = check_node(4.0, 100, 'abc', history([2.0] * 10))
+    assert result['slowdown'] >= run_history.MIN_SLOWDOWN
+    assert result['z_score'] > run_history.Z_THRESHOLD
+    assert not result['regressed']
+
+def test_noisy_baseline_raises_the_bar():
+    result = check_node(16.0, 100, 'abc', history([5.0, 15.0, 8.0, 14.0, 6.0, 12.0, 9.0]))
+    assert result['slowdown'] >= run_history.MIN_SLOWDOWN
+    assert result['z_score'] < run_history.Z_THRESHOLD
+    assert not result['regressed']
@@ -0,0 +1,163 @@
+"""Tests for ConnectionPool in dags/snowflake_pool.py against a stand-in DB-API driver"""
+
+import os
+import time
+
+import pytest
+
+from snowflake_pool import ConnectionPool
+
+class OperationalError(Exception):
+    """Stand-in for the driver's DB-API OperationalError"""
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+
+    def execute(self, query):
+        if not self.connection.healthy:
+            raise OperationalError("session expired")
+        self.connection.queries.append(query)
+        self.result = (1,)
+
+    def fetchone(self):
+        return self.result
+
+    def fetchall(self):
+        return [self.result]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.closed = False
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+class FakeDriver:
+    """Zero-argument connect callable that numbers the connections it opens"""
+
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self):
+        connection = FakeConnection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+def test_released_connection_is_reused(driver):
+    pool = ConnectionPool(driver)
+    assert pool.get_first('SELECT 1') == (1,)
+    assert pool.get_records('SELECT 2') == [(1,)]
+
+    assert len(driver.connections) == 1
+    stats = pool.stats()
+    assert stats['handshakes'] == 1
+    assert stats['reused'] == 1
+    assert stats['queries'] == 2
+
+def test_idle_connection_is_evicted(driver):
+    pool = ConnectionPool(driver, max_idle_seconds=0.01)
+    first = pool.acquire()
+    pool.release(first)
+    time.sleep(0.05)
+
+    second = pool.acquire()
+    assert second is not first
+    assert first.closed
+    assert pool.stats()['evicted'] == 1
+    assert pool.stats()['open'] == 1
+
+def test_failed_health_check_replaces_connection(driver):
+    pool = ConnectionPool(driver, health_check_interval=0)
+    first = pool.acquire()
+    pool.release(first)
+    first.healthy = False
+    time.sleep(0.01)
+
+    second = pool.acquire()
+    assert second is not first
+    assert first.closed
+    stats = pool.stats()
+    assert stats['health_check_failures'] == 1
+    assert stats['handshakes'] == 2
+    assert stats['open'] == 1
+
+def test_healthy_connection_is_pinged_and_reused(driver):
+    pool = ConnectionPool(driver, health_check_interval=0)
+    first = pool.acquire()
+    pool.release(first)
+    time.sleep(0.01)
+
+    assert pool.acquire() is first
+    assert first.queries == [pool.health_check_query]
+    assert pool.stats()['health_check_failures'] == 0
+
+def test_connection_error_discards_connection(driver):
+    pool = ConnectionPool(driver)
+    with pytest.raises(OperationalError):
+        with pool.connection() as connection:
+            raise OperationalError("lost connection")
+    assert connection.closed
+    assert pool.stats()['open'] == 0
+
+    with pytest.raises(ValueError):
+        with pool.connection() as connection:
+            raise ValueError("bad SQL")
+    assert not connection.closed
+    assert pool.stats()['idle'] == 1
+
+def test_full_pool_times_out(driver):
+    pool = ConnectionPool(driver, max_size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+def test_failed_connect_frees_its_slot():
+    def connect():
+        raise OperationalError("bad credentials")
+
+    pool = ConnectionPool(connect, max_size=1)
+    for _ in range(2):
+        with pytest.raises(OperationalError):
+            pool.acquire(timeout=0.05)
+    assert pool.stats()['open'] == 0
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_child_does_not_reuse_parent_connections(driver):
+    pool = ConnectionPool(driver)
+    parent_connection = pool.acquire()
+    pool.release(parent_connection)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            connection = pool.acquire()
+            stats = pool.stats()
+            ok = connection is not parent_connection and stats['open'] == 1 and stats['idle'] == 0
+            pool.release(connection)
+            os.write(write_fd, b'ok' if ok else b'reused')
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 16)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert result == b'ok'
+    # The parent's idle connection is untouched by the child
+    assert pool.acquire() is parent_connection